@@ -0,0 +1,192 @@
+"""
+Deterministic synthetic inputs for the benchmark suite.
+
+Writes the same files the pipeline reads, in the same formats:
+
+    aws_key_vault/secrets_full_audit.csv          (QUOTE_ALL, like the collector)
+    choreo_app_db/38516-3.log                     psql dumps
+    choreo_cloud_manager_db/38516-4.log
+    choreo_configuration_service_db/38516-6.log
+    choreo_rudder_db/38516-8.log
+    benchmark_dataset.json                        row counts and the expected stale count
+
+Proportions follow the 2026/02/02 production run documented in the
+READMEs. The stale share is 354 of 3720 secrets, and every active secret is
+referenced by exactly one of the app / configuration service / rudder DBs
+(1219 / 1491 / 656). Cloud Manager holds about 5.2 non-UUID reference
+tokens per secret, and a few percent of Rudder's vault IDs appear three
+times. The same seed and scale always produce byte-identical files.
+"""
+
+import argparse
+import csv
+import json
+import random
+from pathlib import Path
+
+SCALES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+DEFAULT_SEED = 38516
+DATASET_MANIFEST = 'benchmark_dataset.json'
+
+STALE_RATE = 354 / 3720
+SOURCE_WEIGHTS = {
+    'choreo_app_db': 1219,
+    'choreo_configuration_service_db': 1491,
+    'choreo_rudder_db': 656,
+}
+# AWS names that are not UUIDs (sent to non_uuid_secret_names.csv)
+NON_UUID_RATE = 0.05
+# DB references to secrets that no longer exist in AWS
+DANGLING_RATE = 0.02
+RUDDER_DUPLICATE_RATE = 18 / 692
+RUDDER_EMPTY_RATE = 0.02
+CLOUD_MANAGER_TOKENS_PER_SECRET = 19488 / 3720
+# Cloud Manager tokens with an AWS UUID embedded (for match_embedded_secret_refs.py)
+EMBEDDED_TOKEN_RATE = 0.01
+# Versions per secret: mostly AWSCURRENT only (368 audit rows for 354 stale secrets)
+VERSION_WEIGHTS = [(1, 0.90), (2, 0.08), (3, 0.02)]
+NEVER_ACCESSED_RATE = 0.30
+NEVER_CHANGED_RATE = 0.20
+TAG_VALUES = ['', '', 'team=integration; env=prod', 'team=integration; env=dev',
+              'team=mediation; env=prod', 'team=platform; env=prod; owner=choreo']
+
+DUMPS = {
+    'choreo_app_db': ('38516-3.log', 'organization_handle  value_ref  secret_uuid  key_vault_name'),
+    'choreo_cloud_manager_db': ('38516-4.log', 'source_table  secret_name  organization_id  '
+                                               'credential_name  type  created_at'),
+    'choreo_configuration_service_db': ('38516-6.log', 'value_ref'),
+    'choreo_rudder_db': ('38516-8.log', 'vault_id  name  source_table  created_at'),
+}
+AUDIT_FIELDNAMES = ['SecretName', 'LastAccessedDate', 'LastChangedDate', 'Tags',
+                    'VersionId', 'VersionStages', 'VersionCreatedDate']
+CLOUD_MANAGER_TABLES = ['common_credentials', 'git_credentials', 'docker_credentials',
+                        'user_apps_credentials', 'third_party_registry_credentials']
+
+
+def _uuid(rng):
+    h = f'{rng.getrandbits(128):032x}'
+    return f'{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}'
+
+
+def _timestamp(rng):
+    return (f'{rng.randint(2021, 2026)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}'
+            f'T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}+00:00')
+
+
+def _versions(rng):
+    draw = rng.random()
+    for count, weight in VERSION_WEIGHTS:
+        if draw < weight:
+            return count
+        draw -= weight
+    return VERSION_WEIGHTS[-1][0]
+
+
+class _Dump:
+    """One psql dump being written; the row count goes in the footer."""
+
+    def __init__(self, path, header):
+        self.file = open(path, 'w', encoding='utf-8')
+        self.file.write(header + '\n' + '-' * len(header) + '\n')
+        self.rows = 0
+
+    def write(self, line):
+        self.file.write(line + '\n')
+        self.rows += 1
+
+    def close(self):
+        self.file.write(f'({self.rows} rows)\n')
+        self.file.close()
+
+
+def generate(base_dir, secrets, seed=DEFAULT_SEED):
+    """Write a synthetic dataset with `secrets` AWS secrets into base_dir; returns its manifest."""
+    rng = random.Random(seed)
+    base_dir = Path(base_dir)
+    for folder in ['aws_key_vault'] + list(DUMPS):
+        (base_dir / folder).mkdir(parents=True, exist_ok=True)
+
+    dumps = {name: _Dump(base_dir / name / file_name, header)
+             for name, (file_name, header) in DUMPS.items()}
+    sources = list(SOURCE_WEIGHTS)
+    weights = list(SOURCE_WEIGHTS.values())
+    counts = {'aws_secrets': 0, 'non_uuid_secrets': 0, 'audit_rows': 0, 'stale': 0,
+              'stale_audit_rows': 0}
+
+    def write_reference(source, name):
+        if source == 'choreo_app_db':
+            dumps[source].write(f'uoe  kv/uoe/{name}/value  {name}  choreo-kv')
+        elif source == 'choreo_configuration_service_db':
+            dumps[source].write(name)
+        else:
+            copies = 3 if rng.random() < RUDDER_DUPLICATE_RATE else 1
+            for copy in range(copies):
+                table = 'secrets' if copy == 0 else 'config_maps'
+                dumps[source].write(f'{name}  svc-{copy}  {table}  2026-01-01')
+
+    with open(base_dir / 'aws_key_vault' / 'secrets_full_audit.csv', 'w', encoding='utf-8') as file:
+        writer = csv.writer(file, quoting=csv.QUOTE_ALL, lineterminator='\n')
+        writer.writerow(AUDIT_FIELDNAMES)
+        for index in range(secrets):
+            if rng.random() < NON_UUID_RATE:
+                name = f'mediation-api-{index}-{rng.getrandbits(32)}'
+                counts['non_uuid_secrets'] += 1
+            else:
+                name = _uuid(rng)
+            counts['aws_secrets'] += 1
+
+            stale = rng.random() < STALE_RATE
+            uuid_name = not name.startswith('mediation-')
+            if not stale and uuid_name:
+                write_reference(rng.choices(sources, weights)[0], name)
+            if rng.random() < DANGLING_RATE:
+                write_reference(rng.choices(sources, weights)[0], _uuid(rng))
+
+            # Cloud Manager tokens never equal an AWS name
+            tokens = int(CLOUD_MANAGER_TOKENS_PER_SECRET)
+            tokens += rng.random() < CLOUD_MANAGER_TOKENS_PER_SECRET - tokens
+            for _ in range(tokens):
+                token = f'cm_{rng.getrandbits(96):024x}'
+                if rng.random() < EMBEDDED_TOKEN_RATE and uuid_name:
+                    token = f'ref-{name}-{rng.getrandbits(16)}'
+                dumps['choreo_cloud_manager_db'].write(
+                    f'{rng.choice(CLOUD_MANAGER_TABLES)}  {token}  11307  cred-{index}  basic  2025-06-01'
+                )
+            if rng.random() < RUDDER_EMPTY_RATE:
+                dumps['choreo_rudder_db'].write(f'{"":36}  unset  config_maps  2026-01-01')
+
+            accessed = 'Never' if rng.random() < NEVER_ACCESSED_RATE else _timestamp(rng)
+            changed = 'N/A' if rng.random() < NEVER_CHANGED_RATE else _timestamp(rng)
+            tags = rng.choice(TAG_VALUES)
+            versions = _versions(rng)
+            for version in range(versions):
+                stage = ['AWSCURRENT', 'AWSPREVIOUS', ''][version]
+                writer.writerow([name, accessed, changed, tags, _uuid(rng), stage, _timestamp(rng)])
+            counts['audit_rows'] += versions
+            if stale and uuid_name:
+                counts['stale'] += 1
+                counts['stale_audit_rows'] += versions
+
+    for name, dump in dumps.items():
+        dump.close()
+        counts[name] = dump.rows
+
+    manifest = {'secrets': secrets, 'seed': seed, 'counts': counts}
+    with open(base_dir / DATASET_MANIFEST, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic benchmark dataset.")
+    parser.add_argument('output_dir', help="A process_secrets-style directory to write into")
+    parser.add_argument('--scale', choices=SCALES, default='10k')
+    parser.add_argument('--secrets', type=int, default=None, help="Override the scale's secret count")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    args = parser.parse_args()
+    manifest = generate(args.output_dir, args.secrets or SCALES[args.scale], args.seed)
+    print(json.dumps(manifest['counts'], indent=2))
+
+
+if __name__ == '__main__':
+    main()
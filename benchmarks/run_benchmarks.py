@@ -0,0 +1,308 @@
+"""
+Benchmark every pipeline stage on a synthetic dataset.
+
+The process_secrets code is copied into a work directory next to a
+generated dataset (see generate_synthetic.py), and each stage script runs
+there in its own process exactly as it would by hand. For every stage the
+suite records wall time, input rows per second and peak RSS (ru_maxrss of
+the stage process and the children it waited for, read with os.wait4). The
+results are compared against baseline.json. A stage regresses when it is
+slower or larger than its baseline by more than the tolerance, and by more
+than a small absolute noise floor. Stages with a throughput target also
+report input MB/s per core and regress when they fall below the target in
+baseline.json. Any regression gives exit status 1.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from generate_synthetic import DATASET_MANIFEST, DEFAULT_SEED, SCALES, generate
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+PROCESS_SECRETS_DIR = BENCHMARKS_DIR.parent / 'process_secrets'
+DEFAULT_BASELINE = BENCHMARKS_DIR / 'baseline.json'
+DEFAULT_WALL_TOLERANCE = 0.25
+DEFAULT_RSS_TOLERANCE = 0.20
+# Differences below these are noise, whatever the percentage
+WALL_NOISE_SECONDS = 0.1
+RSS_NOISE_MB = 5.0
+
+# (name, folder, script and arguments, dataset count used for rows/sec), in pipeline
+# order. Each default stage is followed by its alternative paths; the _scol
+# detection stages read the .scol files the _scol extraction stages write.
+STAGES = [
+    ('extract_aws_key_vault', 'aws_key_vault', ['extract_aws_key_vault_secret_refs.py'], 'audit_rows'),
+    ('extract_aws_key_vault_scol', 'aws_key_vault',
+     ['extract_aws_key_vault_secret_refs.py', '--format', 'scol'], 'audit_rows'),
+    ('extract_choreo_app_db', 'choreo_app_db', ['extract_app_db_secret_refs.py'], 'choreo_app_db'),
+    ('extract_choreo_app_db_scol', 'choreo_app_db',
+     ['extract_app_db_secret_refs.py', '--format', 'scol'], 'choreo_app_db'),
+    ('extract_choreo_cloud_manager_db', 'choreo_cloud_manager_db',
+     ['extract_cloud_manager_db_secret_refs.py'], 'choreo_cloud_manager_db'),
+    ('extract_choreo_cloud_manager_db_chunked', 'choreo_cloud_manager_db',
+     ['extract_cloud_manager_db_secret_refs.py', '--workers', '0'], 'choreo_cloud_manager_db'),
+    ('extract_choreo_cloud_manager_db_scol', 'choreo_cloud_manager_db',
+     ['extract_cloud_manager_db_secret_refs.py', '--format', 'scol'], 'choreo_cloud_manager_db'),
+    ('extract_choreo_configuration_service_db', 'choreo_configuration_service_db',
+     ['extract_config_svc_db_secret_refs.py'], 'choreo_configuration_service_db'),
+    ('extract_choreo_configuration_service_db_scol', 'choreo_configuration_service_db',
+     ['extract_config_svc_db_secret_refs.py', '--format', 'scol'], 'choreo_configuration_service_db'),
+    ('extract_choreo_rudder_db', 'choreo_rudder_db', ['extract_rudder_db_secret_refs.py'], 'choreo_rudder_db'),
+    ('extract_choreo_rudder_db_scol', 'choreo_rudder_db',
+     ['extract_rudder_db_secret_refs.py', '--format', 'scol'], 'choreo_rudder_db'),
+    ('detect_stale_secrets', 'stale_secrets', ['detect_stale_secrets.py'], 'aws_secrets'),
+    ('detect_stale_secrets_compact', 'stale_secrets',
+     ['detect_stale_secrets.py', '--backend', 'compact'], 'aws_secrets'),
+    ('detect_stale_secrets_numpy', 'stale_secrets',
+     ['detect_stale_secrets.py', '--backend', 'numpy'], 'aws_secrets'),
+    ('detect_stale_secrets_scol', 'stale_secrets',
+     ['detect_stale_secrets.py', '--input-format', 'scol'], 'aws_secrets'),
+    ('detect_stale_secrets_partitioned', 'stale_secrets', ['detect_stale_secrets_partitioned.py'], 'audit_rows'),
+    ('detect_stale_secrets_detailed', 'stale_secrets', ['detect_stale_secrets_detailed.py'], 'audit_rows'),
+    ('detect_stale_secrets_detailed_scol', 'stale_secrets',
+     ['detect_stale_secrets_detailed.py', '--output-format', 'scol'], 'audit_rows'),
+    ('sort_stale_secrets', 'stale_secrets', ['sort_stale_secrets.py'], 'stale_audit_rows'),
+    ('sort_stale_secrets_external', 'stale_secrets', ['sort_stale_secrets.py', '--external'], 'stale_audit_rows'),
+]
+
+# Stages that need an optional module; without it they are reported as skipped
+REQUIRES = {'detect_stale_secrets_numpy': 'numpy'}
+
+# Files a stage writes in stale_secrets/ and the dataset count of rows each must hold
+EXPECTED_ROWS = {
+    'detect_stale_secrets': [('stale_secrets.csv', 'stale')],
+    'detect_stale_secrets_compact': [('stale_secrets.csv', 'stale')],
+    'detect_stale_secrets_numpy': [('stale_secrets.csv', 'stale')],
+    'detect_stale_secrets_scol': [('stale_secrets.csv', 'stale')],
+    'detect_stale_secrets_partitioned': [('stale_secrets.csv', 'stale'),
+                                         ('stale_secrets_detailed.csv', 'stale_audit_rows')],
+    'detect_stale_secrets_detailed': [('stale_secrets_detailed.csv', 'stale_audit_rows')],
+}
+
+# Stages with a throughput target: the input file (in the stage folder) whose size
+# per wall second and per CPU is checked against baseline.json thresholds.throughput
+THROUGHPUT_INPUTS = {'extract_choreo_cloud_manager_db_chunked': '38516-4.log'}
+
+# Per-stage values stored in the baseline
+BASELINE_KEYS = ('wall_seconds', 'rows_per_second', 'peak_rss_mb', 'mb_per_second_per_core')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on synthetic data.")
+    parser.add_argument('--scale', choices=SCALES, default='10k')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--work-dir', default=None,
+                        help="Dataset and code copy (default: benchmarks/.work/<scale>); "
+                             "the dataset is reused across runs")
+    parser.add_argument('--regenerate', action='store_true', help="Regenerate the dataset")
+    parser.add_argument('--stages', default=None,
+                        help="Comma-separated stage names (default: all, in pipeline order)")
+    parser.add_argument('--baseline', default=str(DEFAULT_BASELINE))
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="Store these results as the baseline for the scale")
+    parser.add_argument('--wall-tolerance', type=float, default=None,
+                        help=f"Allowed slowdown (default: baseline file or {DEFAULT_WALL_TOLERANCE})")
+    parser.add_argument('--rss-tolerance', type=float, default=None,
+                        help=f"Allowed peak RSS growth (default: baseline file or {DEFAULT_RSS_TOLERANCE})")
+    parser.add_argument('--results', default=None, help="Also write the results as JSON")
+    return parser.parse_args()
+
+
+def prepare_work_dir(work_dir, scale, seed, regenerate):
+    """Copy the current code into work_dir and generate the dataset unless it is already there."""
+    target = work_dir / 'process_secrets'
+    manifest_path = target / DATASET_MANIFEST
+    manifest = None
+    if manifest_path.exists() and not regenerate:
+        with open(manifest_path, 'r', encoding='utf-8') as file:
+            manifest = json.load(file)
+        if manifest['secrets'] != SCALES[scale] or manifest['seed'] != seed:
+            manifest = None
+
+    # Code only; data files in the source tree are never copied over the dataset
+    shutil.copytree(PROCESS_SECRETS_DIR, target, dirs_exist_ok=True,
+                    ignore=shutil.ignore_patterns('*.csv', '*.log', '*.scol', '*.sqlite', '*.refs',
+                                                  '__pycache__', '.pipeline_cache'))
+    if manifest is None:
+        print(f"Generating the {scale} dataset in {target} ...")
+        start = time.perf_counter()
+        manifest = generate(target, SCALES[scale], seed)
+        print(f"Generated in {time.perf_counter() - start:.1f}s")
+    return target, manifest
+
+
+def measure(command, cwd, log_path):
+    """Run command; return (exit status, wall seconds, peak RSS in MB)."""
+    with open(log_path, 'w', encoding='utf-8') as log:
+        start = time.perf_counter()
+        process = subprocess.Popen(command, cwd=cwd, stdout=log, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(process.pid, 0)
+        wall = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return process.returncode, wall, usage.ru_maxrss / divisor
+
+
+def run_stages(base_dir, manifest, stage_names, log_dir):
+    """Run the selected stages; returns (results, output problems)."""
+    results = {}
+    problems = []
+    for name, folder, command, rows_key in STAGES:
+        if name not in stage_names:
+            continue
+        module = REQUIRES.get(name)
+        if module and importlib.util.find_spec(module) is None:
+            print(f"  {name:<46} skipped ({module} is not installed)")
+            continue
+        status, wall, rss = measure([sys.executable] + command, base_dir / folder, log_dir / f'{name}.log')
+        rows = manifest['counts'][rows_key]
+        results[name] = {
+            'status': status,
+            'wall_seconds': round(wall, 3),
+            'rows': rows,
+            'rows_per_second': round(rows / wall) if wall else None,
+            'peak_rss_mb': round(rss, 1),
+        }
+        state = 'ok' if status == 0 else f'FAILED (exit {status}, see {log_dir / f"{name}.log"})'
+        print(f"  {name:<46} {wall:>8.2f}s {results[name]['rows_per_second'] or 0:>12,} rows/s "
+              f"{rss:>8.1f} MB  {state}")
+        if name in THROUGHPUT_INPUTS:
+            # --workers 0 runs one worker per CPU
+            cpus = os.cpu_count() or 1
+            input_mb = os.path.getsize(base_dir / folder / THROUGHPUT_INPUTS[name]) / (1024 * 1024)
+            results[name]['input_mb'] = round(input_mb, 1)
+            results[name]['mb_per_second_per_core'] = round(input_mb / wall / cpus, 1) if wall else None
+            print(f"  {'':<46} {results[name]['mb_per_second_per_core']:>8} MB/s per core "
+                  f"({input_mb:.0f} MB input, {cpus} CPUs)")
+        if status == 0:
+            # Checked right away: later stages rewrite the same files
+            problems += check_outputs(base_dir, manifest, name)
+    return results, problems
+
+
+def check_outputs(base_dir, manifest, stage):
+    """The stale counts a stage wrote must match what the generator planted."""
+    problems = []
+    for file_name, count_key in EXPECTED_ROWS.get(stage, []):
+        count = manifest['counts'][count_key]
+        with open(base_dir / 'stale_secrets' / file_name, 'rb') as file:
+            rows = sum(1 for _ in file) - 1
+        if rows != count:
+            problems.append(f"{stage}: {file_name} has {rows} rows, expected {count}")
+    return problems
+
+
+def compare(results, baseline, wall_tolerance, rss_tolerance):
+    """Return the regression messages of results against a baseline scale entry."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        wall_limit = base['wall_seconds'] * (1 + wall_tolerance)
+        if result['wall_seconds'] > wall_limit and \
+                result['wall_seconds'] - base['wall_seconds'] > WALL_NOISE_SECONDS:
+            regressions.append(f"{name}: {result['wall_seconds']:.2f}s vs baseline "
+                               f"{base['wall_seconds']:.2f}s (+{wall_tolerance:.0%} allowed)")
+        rss_limit = base['peak_rss_mb'] * (1 + rss_tolerance)
+        if result['peak_rss_mb'] > rss_limit and result['peak_rss_mb'] - base['peak_rss_mb'] > RSS_NOISE_MB:
+            regressions.append(f"{name}: {result['peak_rss_mb']:.1f} MB vs baseline "
+                               f"{base['peak_rss_mb']:.1f} MB (+{rss_tolerance:.0%} allowed)")
+    return regressions
+
+
+def check_throughput(results, targets):
+    """Stages below their MB/s-per-core target; small inputs measure process startup and are not checked."""
+    regressions = []
+    for name, target in targets.items():
+        result = results.get(name)
+        if result is None or result['status'] != 0 or result['input_mb'] < target['min_input_mb']:
+            continue
+        if result['mb_per_second_per_core'] < target['min_mb_per_second_per_core']:
+            regressions.append(f"{name}: {result['mb_per_second_per_core']} MB/s per core, target "
+                               f"{target['min_mb_per_second_per_core']} MB/s per core")
+    return regressions
+
+
+def load_baseline(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {'thresholds': {'wall': DEFAULT_WALL_TOLERANCE, 'rss': DEFAULT_RSS_TOLERANCE}, 'scales': {}}
+
+
+def main():
+    args = parse_args()
+    work_dir = Path(args.work_dir) if args.work_dir else BENCHMARKS_DIR / '.work' / args.scale
+    stage_names = args.stages.split(',') if args.stages else [stage[0] for stage in STAGES]
+    unknown = set(stage_names) - {stage[0] for stage in STAGES}
+    if unknown:
+        raise SystemExit(f"Unknown stages: {', '.join(sorted(unknown))}")
+
+    base_dir, manifest = prepare_work_dir(work_dir, args.scale, args.seed, args.regenerate)
+    log_dir = work_dir / 'logs'
+    log_dir.mkdir(parents=True, exist_ok=True)
+
+    print("=" * 80)
+    print(f"Benchmarking {len(stage_names)} stages at scale {args.scale} "
+          f"({manifest['secrets']:,} secrets, {manifest['counts']['audit_rows']:,} audit rows)")
+    print("=" * 80)
+    results, problems = run_stages(base_dir, manifest, stage_names, log_dir)
+    print()
+
+    failures = [f"{name}: exit status {result['status']}" for name, result in results.items()
+                if result['status'] != 0]
+    failures += problems
+
+    baseline = load_baseline(args.baseline)
+    wall_tolerance = args.wall_tolerance if args.wall_tolerance is not None else baseline['thresholds']['wall']
+    rss_tolerance = args.rss_tolerance if args.rss_tolerance is not None else baseline['thresholds']['rss']
+    scale_baseline = baseline['scales'].get(args.scale)
+    regressions = []
+    if scale_baseline is None:
+        print(f"No baseline for scale {args.scale} in {args.baseline}")
+    else:
+        regressions = compare(results, scale_baseline['stages'], wall_tolerance, rss_tolerance)
+    regressions += check_throughput(results, baseline['thresholds'].get('throughput', {}))
+
+    if args.results:
+        with open(args.results, 'w', encoding='utf-8') as file:
+            json.dump({'scale': args.scale, 'stages': results}, file, indent=2)
+
+    if args.update_baseline:
+        if failures:
+            print("Baseline not updated: some stages failed")
+        else:
+            previous = (scale_baseline or {}).get('stages', {})
+            baseline['scales'][args.scale] = {
+                'machine': f"{platform.machine()} {platform.system()} {os.cpu_count()} CPUs, "
+                           f"Python {platform.python_version()}",
+                'stages': {**previous, **{name: {key: result[key] for key in BASELINE_KEYS if key in result}
+                                          for name, result in results.items()}},
+            }
+            with open(args.baseline, 'w', encoding='utf-8') as file:
+                json.dump(baseline, file, indent=2)
+                file.write('\n')
+            print(f"Baseline for scale {args.scale} written to {args.baseline}")
+
+    for message in failures:
+        print(f"FAILED: {message}")
+    for message in regressions:
+        print(f"REGRESSION: {message}")
+    if not failures and not regressions:
+        print("No regressions")
+    return 1 if failures or regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
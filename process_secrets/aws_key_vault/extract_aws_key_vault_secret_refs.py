@@ -1,80 +1,54 @@
-import csv
-import re
+import argparse
+import sys
 from collections import Counter
+from pathlib import Path
 
-input_file = "secrets_full_audit.csv"
-valid_output_file = "key_vault_secrets.csv"
-invalid_output_file = "non_uuid_secret_names.csv"
-
-# Strict UUID regex
-UUID_REGEX = re.compile(
-    r"^[0-9a-fA-F]{8}-"
-    r"[0-9a-fA-F]{4}-"
-    r"[0-9a-fA-F]{4}-"
-    r"[0-9a-fA-F]{4}-"
-    r"[0-9a-fA-F]{12}$"
-)
-
-valid_secrets = []
-invalid_secrets = []
-
-total_rows = 0
-skipped_non_current = 0
-
-with open(input_file, newline="") as f:
-    reader = csv.DictReader(f)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-    for row in reader:
-        total_rows += 1
+from common.aws_refs import read_aws_secret_refs, write_aws_secret_refs
+from common.metrics import add_metrics_arguments, stage_metrics
 
-        # Only AWSCURRENT versions
-        if row["VersionStages"] != "AWSCURRENT":
-            skipped_non_current += 1
-            continue
+parser = argparse.ArgumentParser(description="Extract AWSCURRENT UUID secret names from the audit.")
+# secrets_full_audit.csv, or the names-only secrets_inventory.csv (one row per secret);
+# a .scol input or normalized audit store directory is read column by column
+parser.add_argument("input_file", nargs="?", default="secrets_full_audit.csv")
+parser.add_argument("--format", choices=["csv", "scol"], default="csv",
+                    help="scol writes key_vault_secrets.scol for the columnar detectors")
+add_metrics_arguments(parser)
+args = parser.parse_args()
 
-        secret_name = row["SecretName"]
-
-        if UUID_REGEX.match(secret_name):
-            valid_secrets.append(secret_name)
-        else:
-            invalid_secrets.append({
-                "SecretName": secret_name,
-                "VersionId": row["VersionId"],
-                "VersionStages": row["VersionStages"]
-            })
-
-# Write valid UUID SecretNames
-with open(valid_output_file, "w", newline="") as f:
-    writer = csv.writer(f)
-    writer.writerow(["key_vault_secret_name"])
-    for s in valid_secrets:
-        writer.writerow([s])
+input_file = args.input_file
+valid_output_file = "key_vault_secrets.scol" if args.format == "scol" else "key_vault_secrets.csv"
+invalid_output_file = "non_uuid_secret_names.csv"
 
-# Write non-UUID SecretNames
-with open(invalid_output_file, "w", newline="") as f:
-    writer = csv.DictWriter(
-        f,
-        fieldnames=["SecretName", "VersionId", "VersionStages"]
-    )
-    writer.writeheader()
-    for row in invalid_secrets:
-        writer.writerow(row)
+with stage_metrics('aws_key_vault', args) as metrics:
+    with metrics.timer('parse'):
+        result = read_aws_secret_refs(input_file)
+    with metrics.timer('io'):
+        write_aws_secret_refs(result, valid_output_file, invalid_output_file)
 
-# Duplicate detection (UUID SecretNames only)
-counter = Counter(valid_secrets)
-duplicates = {k: v for k, v in counter.items() if v > 1}
+    # Duplicate detection (UUID SecretNames only)
+    counter = Counter(result.valid_secrets)
+    duplicates = {k: v for k, v in counter.items() if v > 1}
+    metrics.set(rows_in=result.total_rows, rows_out=len(result.valid_secrets),
+                skipped=result.skipped_non_current + len(result.invalid_secrets),
+                duplicates=len(duplicates))
 
 # Reporting
 print("AWS Secrets (AWSCURRENT) – SecretName UUID Validation")
 print("----------------------------------------------------")
-print(f"Total rows processed          : {total_rows}")
-print(f"Skipped non-AWSCURRENT rows   : {skipped_non_current}")
-print(f"Valid UUID SecretNames        : {len(valid_secrets)}")
-print(f"Non-UUID SecretNames detected : {len(invalid_secrets)}")
-
-if duplicates:
+print(f"Total rows processed          : {result.total_rows}")
+print(f"Skipped non-AWSCURRENT rows   : {result.skipped_non_current}")
+print(f"Valid UUID SecretNames        : {len(result.valid_secrets)}")
+print(f"Non-UUID SecretNames detected : {len(result.invalid_secrets)}")
+
+if duplicates and args.quiet:
+    print(f"\nDuplicate UUID SecretNames found: {len(duplicates)}")
+elif duplicates:
     print("\nDuplicate UUID SecretNames found:")
     for secret, count in duplicates.items():
+        if result.tagged:
+            secret = f"{secret[0]} ({secret[1]}, {secret[2]})"
         print(f"{secret} -> {count} times")
 else:
     print("\nNo duplicate UUID SecretNames found.")
@@ -0,0 +1,123 @@
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+from common.audit_collector import (
+    collect_full_audit,
+    collect_inventory,
+    collect_targets,
+    default_checkpoint_path,
+    parse_target,
+    target_account,
+)
+from common.audit_store import audit_csv_to_store
+from common.aws_secrets import DEFAULT_REGION, DEFAULT_WORKERS, create_secretsmanager_client
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Collect secrets_full_audit.csv from AWS Secrets Manager."
+    )
+    parser.add_argument('--region', default=DEFAULT_REGION)
+    parser.add_argument('--target', action='append', default=[], metavar='REGION[:PROFILE]',
+                        help="Scan several region/account targets concurrently into one "
+                             "inventory tagged with Region and Account (repeatable)")
+    parser.add_argument('--profile', default=None, help="AWS profile to use")
+    parser.add_argument('--output', default=None,
+                        help="Output CSV (default: secrets_full_audit.csv, or "
+                             "secrets_inventory.csv with --names-only)")
+    parser.add_argument('--names-only', action='store_true',
+                        help="Only list secrets (no version history); see enrich_stale_secrets.py")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help="Concurrent list-secret-version-ids calls")
+    parser.add_argument('--endpoint-url', default=None,
+                        help="Secrets Manager endpoint (e.g. a local stub)")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue an interrupted scan from its checkpoint")
+    parser.add_argument('--checkpoint', default=None,
+                        help="Checkpoint file (default: <output>.checkpoint.json)")
+    parser.add_argument('--normalized-store', default=None, metavar='DIR',
+                        help="Also write the audit as a normalized store (secrets, versions "
+                             "and dictionary-encoded tags tables) into DIR")
+    args = parser.parse_args()
+    if args.target and args.resume:
+        parser.error("--resume is not supported together with --target")
+    if args.normalized_store and (args.target or args.names_only):
+        parser.error("--normalized-store needs a single-target full audit")
+    return args
+
+
+def scan_targets(args):
+    """Multi-region/multi-account scan into a single tagged inventory."""
+    targets = [parse_target(spec) for spec in args.target]
+
+    def client_factory(region, profile):
+        return create_secretsmanager_client(region, args.endpoint_url, profile)
+
+    labels = ', '.join(f"{region} ({target_account(profile)})" for region, profile in targets)
+    print(f"Starting concurrent scan of {len(targets)} targets: {labels}")
+    results = collect_targets(targets, args.output, client_factory,
+                              names_only=args.names_only, workers=args.workers)
+
+    print("------------------------------------------------")
+    failed = False
+    for (region, profile), stats in results.items():
+        status = f"ERROR: {stats['error']}" if 'error' in stats else (
+            f"{stats['secrets']} secrets, {stats['rows']} rows"
+        )
+        print(f"  {region} ({target_account(profile)}): {status}")
+        failed = failed or 'error' in stats or bool(stats['failed'])
+    print(f"Scan Complete. Results saved to {args.output}")
+    return 1 if failed else 0
+
+
+def main():
+    args = parse_args()
+
+    if args.target:
+        default_output = 'secrets_inventory.csv' if args.names_only else 'secrets_full_audit.csv'
+        args.output = args.output or default_output
+        return scan_targets(args)
+
+    client = create_secretsmanager_client(args.region, args.endpoint_url, args.profile)
+
+    if args.names_only:
+        args.output = args.output or 'secrets_inventory.csv'
+        print(f"Starting names-only inventory scan in {args.region}...")
+        stats = collect_inventory(client, args.output)
+        print("------------------------------------------------")
+        print(f"Secrets listed    : {stats['secrets']}")
+        print(f"Throttled calls   : {stats['throttled_calls']}")
+        print(f"Scan Complete. Results saved to {args.output}")
+        return 0
+
+    args.output = args.output or 'secrets_full_audit.csv'
+    checkpoint_path = args.checkpoint or default_checkpoint_path(args.output)
+
+    print(f"Starting full audit scan in {args.region} with {args.workers} workers...")
+    stats = collect_full_audit(client, args.output, workers=args.workers,
+                               checkpoint_path=checkpoint_path, resume=args.resume)
+    if stats['resumed']:
+        print(f"Resumed from checkpoint {checkpoint_path}")
+
+    print("------------------------------------------------")
+    print(f"Secrets scanned   : {stats['secrets']}")
+    print(f"Version rows      : {stats['rows']}")
+    print(f"Throttled calls   : {stats['throttled_calls']}")
+    if stats['failed']:
+        print(f"Failed secrets    : {len(stats['failed'])}")
+        for name in stats['failed']:
+            print(f"  - {name}")
+        print(f"Re-run with --resume to retry them (checkpoint: {checkpoint_path})")
+    print(f"Scan Complete. Results saved to {args.output}")
+    if args.normalized_store:
+        secrets, versions, tags = audit_csv_to_store(args.output, args.normalized_store)
+        print(f"Normalized store  : {args.normalized_store} "
+              f"({secrets} secrets, {versions} versions, {tags} distinct tags)")
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,48 +1,13 @@
-import csv
-from collections import Counter
+import sys
+from pathlib import Path
 
-input_file = "38516-4.log"
-output_file = "key_vault_secrets.csv"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-secrets = []
+from common.extraction import run_extractor
+from common.sources import SOURCES
 
-with open(input_file, "r") as f:
-    for line in f:
-        line = line.strip()
+# Input log, column and validation rules live in common/sources.py
+SPEC = SOURCES["choreo_cloud_manager_db"]
 
-        # Skip headers, separators, footers
-        if (
-            not line
-            or line.startswith("source_table")
-            or line.startswith("-")
-            or line.startswith("(")
-        ):
-            continue
-
-        # Split by whitespace (fixed-width table)
-        parts = line.split()
-
-        # secret_name is the 2nd column
-        if len(parts) >= 2:
-            secrets.append(parts[1])
-
-# Write CSV
-with open(output_file, "w", newline="") as csvfile:
-    writer = csv.writer(csvfile)
-    writer.writerow(["key_vault_secret_name"])
-    for s in secrets:
-        writer.writerow([s])
-
-# Detect duplicates
-counter = Counter(secrets)
-duplicates = {k: v for k, v in counter.items() if v > 1}
-
-# Print duplicates
-if duplicates:
-    print("Duplicate secret_name values found:")
-    for secret, count in duplicates.items():
-        print(f"{secret} -> {count} times")
-else:
-    print("No duplicate secret_name values found.")
-
-print(f"\nExtracted {len(secrets)} secrets into {output_file}")
+if __name__ == "__main__":
+    run_extractor(SPEC)
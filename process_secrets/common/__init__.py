@@ -0,0 +1 @@
+"""Shared helpers for the process_secrets scripts."""
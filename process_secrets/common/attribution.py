@@ -0,0 +1,110 @@
+"""
+Single-pass source attribution with per-secret bitmasks.
+
+Every source (the AWS inventory and each DB folder) gets one bit. Walking
+each source's names once ORs its bit into the name's mask, so afterwards a
+single dict holds, for every name seen anywhere, the set of sources that
+contain it. The stale set, the per-source active counts and the full
+source-by-source overlap matrix all come from the masks (the matrix from
+the histogram of distinct masks, at most one entry per combination of
+sources) without further set operations. Python ints are unbounded, so the
+number of sources is not limited.
+"""
+
+import csv
+from collections import Counter
+
+
+class Attribution:
+    """Bitmask of sources per secret name."""
+
+    def __init__(self, sources):
+        self.sources = list(sources)
+        self.bits = {source: 1 << index for index, source in enumerate(self.sources)}
+        self.masks = {}
+
+    def add(self, source, names):
+        """OR the source's bit into the mask of every name."""
+        bit = self.bits[source]
+        masks = self.masks
+        get = masks.get
+        for name in names:
+            masks[name] = get(name, 0) | bit
+
+    def mask(self, name):
+        return self.masks.get(name, 0)
+
+    def sources_of(self, mask):
+        return [source for source in self.sources if mask & self.bits[source]]
+
+    def histogram(self):
+        """Counter of distinct masks (one entry per combination of sources seen)."""
+        return Counter(self.masks.values())
+
+    def names_with(self, required, excluded=()):
+        """Names in every required source and in none of the excluded ones."""
+        required_mask = sum(self.bits[source] for source in required)
+        excluded_mask = sum(self.bits[source] for source in excluded)
+        return {name for name, mask in self.masks.items()
+                if mask & required_mask == required_mask and not mask & excluded_mask}
+
+    def count_any(self, sources, histogram=None):
+        """Number of names in at least one of the sources (pass histogram() to reuse it)."""
+        any_mask = sum(self.bits[source] for source in sources)
+        histogram = histogram if histogram is not None else self.histogram()
+        return sum(count for mask, count in histogram.items() if mask & any_mask)
+
+    def overlap_matrix(self, histogram=None):
+        """matrix[i][j] = names in both sources[i] and sources[j] (the diagonal is each source's size)."""
+        histogram = histogram if histogram is not None else self.histogram()
+        size = len(self.sources)
+        matrix = [[0] * size for _ in range(size)]
+        for mask, count in histogram.items():
+            present = [index for index in range(size) if mask >> index & 1]
+            for i in present:
+                row = matrix[i]
+                for j in present:
+                    row[j] += count
+        return matrix
+
+
+def attribute(sources):
+    """Build an Attribution from {source: iterable of names}, visiting each source once."""
+    attribution = Attribution(sources)
+    for source, names in sources.items():
+        attribution.add(source, names)
+    return attribution
+
+
+def write_overlap_matrix(attribution, output_path, matrix=None):
+    matrix = matrix if matrix is not None else attribution.overlap_matrix()
+    with open(output_path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(['source'] + attribution.sources)
+        for source, row in zip(attribution.sources, matrix):
+            writer.writerow([source] + row)
+
+
+def print_overlap_matrix(attribution, matrix=None):
+    matrix = matrix if matrix is not None else attribution.overlap_matrix()
+    width = max(len(source) for source in attribution.sources)
+    print("Source overlap matrix (secrets present in both):")
+    for index, (source, row) in enumerate(zip(attribution.sources, matrix)):
+        print(f"  [{index}] {source:<{width}}  " + ' '.join(f"{count:>8}" for count in row))
+
+
+def write_provenance(attribution, names, output_path, stale_source=None):
+    """
+    Write one row per name with a 0/1 column per source; with stale_source,
+    a Stale column marks names found in that source only.
+    """
+    with open(output_path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(['SecretName'] + attribution.sources + (['Stale'] if stale_source else []))
+        only = attribution.bits.get(stale_source)
+        for name in sorted(names):
+            mask = attribution.mask(name)
+            row = [name] + [1 if mask & attribution.bits[source] else 0 for source in attribution.sources]
+            if stale_source:
+                row.append(1 if mask == only else 0)
+            writer.writerow(row)
@@ -0,0 +1,342 @@
+"""Concurrent, paginated collection of secrets_full_audit.csv from AWS Secrets Manager."""
+
+import csv
+import json
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from common.aws_secrets import (
+    AUDIT_FIELDNAMES,
+    DEFAULT_WORKERS,
+    INVENTORY_FIELDNAMES,
+    AdaptiveThrottle,
+    fetch_versions_concurrently,
+    iter_secret_pages,
+    iter_secrets,
+    secret_metadata,
+    version_rows,
+)
+
+
+# Extra columns tagging each row with the scan target in multi-region mode
+TARGET_FIELDNAMES = ['Region', 'Account']
+
+
+def open_audit_writer(file):
+    """Return a csv writer producing the same quoting as the jq @csv based script."""
+    return csv.writer(file, quoting=csv.QUOTE_ALL, lineterminator='\n')
+
+
+def read_inventory_csv(csv_path):
+    """Read secrets_inventory.csv into {SecretName: (name, accessed, changed, tags)}."""
+    inventory = {}
+    with open(csv_path, 'r', encoding='utf-8', newline='') as file:
+        for row in csv.DictReader(file):
+            name = row['SecretName'].strip()
+            if name:
+                inventory[name] = tuple(row[field] for field in INVENTORY_FIELDNAMES)
+    return inventory
+
+
+def fetch_version_rows(client, metadata_by_name, workers=DEFAULT_WORKERS, throttle=None):
+    """
+    Fetch version history for the given secrets only.
+
+    metadata_by_name maps secret names to their inventory metadata. Returns
+    ({name: audit rows}, {name: error}) for the secrets that succeeded and
+    failed respectively.
+    """
+    throttle = throttle or AdaptiveThrottle()
+    rows_by_name = {}
+    errors = {}
+    secrets = ({'Name': name} for name in metadata_by_name)
+    for secret, versions, error in fetch_versions_concurrently(client, secrets, throttle, workers):
+        name = secret['Name']
+        if error is not None:
+            errors[name] = error
+        else:
+            rows_by_name[name] = version_rows(metadata_by_name[name], versions)
+    return rows_by_name, errors
+
+
+def default_checkpoint_path(output_path):
+    """Checkpoint file kept next to the audit CSV."""
+    return Path(str(output_path) + '.checkpoint.json')
+
+
+class AuditCheckpoint:
+    """
+    Durable progress record of an audit scan.
+
+    `page_token` is the NextToken of the oldest list-secrets page that is not
+    fully written yet, `completed` holds the secrets from that page onwards
+    whose rows are already in the output, and `output_bytes` is the size of
+    the output at the time the checkpoint was taken. Anything written after
+    that offset is truncated on resume and fetched again.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.page_token = None
+        self.completed = set()
+        self.failed = []
+        self.listing_done = False
+        self.output_bytes = 0
+
+    @classmethod
+    def load(cls, path):
+        """Load a checkpoint, or return None if there is none."""
+        checkpoint = cls(path)
+        try:
+            with open(checkpoint.path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return None
+        checkpoint.page_token = data['page_token']
+        checkpoint.completed = set(data['completed'])
+        checkpoint.failed = data.get('failed', [])
+        checkpoint.listing_done = data.get('listing_done', False)
+        checkpoint.output_bytes = data['output_bytes']
+        return checkpoint
+
+    def save(self):
+        """Atomically replace the checkpoint file."""
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump({
+                'page_token': self.page_token,
+                'completed': sorted(self.completed),
+                'failed': self.failed,
+                'listing_done': self.listing_done,
+                'output_bytes': self.output_bytes,
+            }, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.path)
+
+    def remove(self):
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _sync(file):
+    file.flush()
+    os.fsync(file.fileno())
+    return file.tell()
+
+
+def collect_inventory(client, output_path, throttle=None, page_size=100):
+    """
+    Write the secret-level inventory (no version history) to output_path.
+
+    This is phase 1 of the lazy mode: it only costs one list-secrets call per
+    page. Version history is fetched later, for stale secrets only.
+    """
+    throttle = throttle or AdaptiveThrottle()
+    stats = {'secrets': 0}
+    with open(output_path, 'w', newline='', encoding='utf-8') as file:
+        file.write(','.join(INVENTORY_FIELDNAMES) + '\n')
+        writer = open_audit_writer(file)
+        for _, secrets, _ in iter_secret_pages(client, throttle, page_size=page_size):
+            writer.writerows(secret_metadata(secret) for secret in secrets)
+            file.flush()
+            stats['secrets'] += len(secrets)
+    stats['throttled_calls'] = throttle.throttled_calls
+    return stats
+
+
+def collect_full_audit(client, output_path, workers=DEFAULT_WORKERS, throttle=None,
+                       page_size=100, checkpoint_path=None, resume=False,
+                       checkpoint_every=100):
+    """
+    Write every version of every secret to output_path.
+
+    Rows are streamed to disk as soon as a secret's versions arrive. When
+    checkpoint_path is given, progress is checkpointed every
+    `checkpoint_every` secrets; with resume=True an existing checkpoint is
+    picked up so that secrets already in the output are neither written nor
+    fetched again. Returns a dict with the number of secrets, rows and the
+    secrets whose versions could not be fetched.
+    """
+    throttle = throttle or AdaptiveThrottle()
+    stats = {'secrets': 0, 'rows': 0, 'failed': [], 'resumed': False}
+
+    checkpoint = None
+    if checkpoint_path is not None:
+        if resume:
+            checkpoint = AuditCheckpoint.load(checkpoint_path)
+            if checkpoint is not None and not os.path.exists(output_path):
+                raise ValueError(f"{output_path} is missing but has a checkpoint; cannot resume")
+            if checkpoint is not None and os.path.getsize(output_path) < checkpoint.output_bytes:
+                raise ValueError(f"{output_path} is shorter than its checkpoint; cannot resume")
+        stats['resumed'] = checkpoint is not None
+        checkpoint = checkpoint or AuditCheckpoint(checkpoint_path)
+
+    # Pages whose secrets are still being fetched, oldest first:
+    # [token, names still to write, next token, all names on the page]
+    pages = deque()
+    page_of = {}
+    retry = list(checkpoint.failed) if stats['resumed'] else []
+
+    def pending_secrets():
+        # Secrets that failed in the previous run only have their metadata in the checkpoint
+        for name, accessed, changed, tags in retry:
+            yield {'Name': name, '_metadata': (name, accessed, changed, tags)}
+        if stats['resumed'] and checkpoint.listing_done:
+            return
+        start_token = checkpoint.page_token if stats['resumed'] else None
+        for token, secrets, next_token in iter_secret_pages(client, throttle, start_token, page_size):
+            done = checkpoint.completed if checkpoint is not None else ()
+            todo = [secret for secret in secrets if secret['Name'] not in done]
+            names = {secret['Name'] for secret in secrets}
+            page = [token, {secret['Name'] for secret in todo}, next_token, names]
+            pages.append(page)
+            advance_pages()
+            for secret in todo:
+                page_of[secret['Name']] = page
+                yield secret
+
+    def advance_pages():
+        # Move the checkpoint past every leading page that is fully written
+        while pages and not pages[0][1]:
+            token, _, next_token, names = pages.popleft()
+            if checkpoint is not None:
+                checkpoint.page_token = next_token
+                checkpoint.listing_done = next_token is None
+                checkpoint.completed -= names
+            for name in names:
+                page_of.pop(name, None)
+
+    mode = 'r+' if stats['resumed'] else 'w'
+    with open(output_path, mode, newline='', encoding='utf-8') as file:
+        if stats['resumed']:
+            file.truncate(checkpoint.output_bytes)
+            file.seek(checkpoint.output_bytes)
+        else:
+            file.write(','.join(AUDIT_FIELDNAMES) + '\n')
+        writer = open_audit_writer(file)
+
+        unsaved = 0
+        results = fetch_versions_concurrently(client, pending_secrets(), throttle, workers)
+        try:
+            for secret, versions, error in results:
+                retried = '_metadata' in secret
+                metadata = secret['_metadata'] if retried else secret_metadata(secret)
+                name = secret['Name']
+                if error is not None:
+                    print(f"Error: could not list versions of {name}: {error}")
+                    stats['failed'].append(name)
+                    if checkpoint is not None and not retried:
+                        checkpoint.failed.append(list(metadata))
+                else:
+                    if retried:
+                        checkpoint.failed = [entry for entry in checkpoint.failed if entry[0] != name]
+                    rows = version_rows(metadata, versions)
+                    writer.writerows(rows)
+                    file.flush()
+                    stats['secrets'] += 1
+                    stats['rows'] += len(rows)
+                    if stats['secrets'] % 500 == 0:
+                        print(f"Scanned {stats['secrets']} secrets ({stats['rows']} version rows)...")
+
+                if name in page_of:
+                    page_of[name][1].discard(name)
+                    if checkpoint is not None:
+                        checkpoint.completed.add(name)
+                    advance_pages()
+
+                unsaved += 1
+                if checkpoint is not None and unsaved >= checkpoint_every:
+                    checkpoint.output_bytes = _sync(file)
+                    checkpoint.save()
+                    unsaved = 0
+        finally:
+            results.close()
+            if checkpoint is not None:
+                checkpoint.output_bytes = _sync(file)
+                checkpoint.save()
+
+    if checkpoint is not None and not checkpoint.failed:
+        checkpoint.remove()
+
+    stats['throttled_calls'] = throttle.throttled_calls
+    return stats
+
+
+def parse_target(spec):
+    """Parse a 'region' or 'region:profile' scan target into (region, profile)."""
+    region, _, profile = spec.partition(':')
+    return region.strip(), profile.strip() or None
+
+
+def target_account(profile):
+    """Account label written to the Account column for a target's profile."""
+    return profile or 'default'
+
+
+def collect_targets(targets, output_path, client_factory, names_only=False,
+                    workers=DEFAULT_WORKERS, page_size=100):
+    """
+    Scan several (region, profile) targets concurrently into one CSV.
+
+    Every row gets the Region and Account columns appended. Each target has
+    its own client, throttle and worker pool, and a failing target does not
+    stop the others. Returns {target: stats}; the stats of a failed target
+    carry an 'error' entry.
+    """
+    fieldnames = (INVENTORY_FIELDNAMES if names_only else AUDIT_FIELDNAMES) + TARGET_FIELDNAMES
+    write_lock = threading.Lock()
+    results = {}
+
+    with open(output_path, 'w', newline='', encoding='utf-8') as file:
+        file.write(','.join(fieldnames) + '\n')
+        writer = open_audit_writer(file)
+
+        def write(rows):
+            with write_lock:
+                writer.writerows(rows)
+                file.flush()
+
+        def scan(target):
+            region, profile = target
+            client = client_factory(region, profile)
+            throttle = AdaptiveThrottle()
+            tag = [region, target_account(profile)]
+            stats = {'secrets': 0, 'rows': 0, 'failed': []}
+
+            if names_only:
+                for _, secrets, _ in iter_secret_pages(client, throttle, page_size=page_size):
+                    write([list(secret_metadata(secret)) + tag for secret in secrets])
+                    stats['secrets'] += len(secrets)
+                    stats['rows'] += len(secrets)
+            else:
+                secrets = iter_secrets(client, throttle, page_size=page_size)
+                for secret, versions, error in fetch_versions_concurrently(client, secrets, throttle, workers):
+                    if error is not None:
+                        print(f"Error: [{region}] could not list versions of {secret['Name']}: {error}")
+                        stats['failed'].append(secret['Name'])
+                        continue
+                    rows = [row + tag for row in version_rows(secret_metadata(secret), versions)]
+                    write(rows)
+                    stats['secrets'] += 1
+                    stats['rows'] += len(rows)
+
+            stats['throttled_calls'] = throttle.throttled_calls
+            return stats
+
+        with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+            futures = {executor.submit(scan, target): target for target in targets}
+            for future in as_completed(futures):
+                target = futures[future]
+                try:
+                    results[target] = future.result()
+                except Exception as e:
+                    print(f"Error: scan of {target[0]} ({target_account(target[1])}) failed: {e}")
+                    results[target] = {'secrets': 0, 'rows': 0, 'failed': [], 'error': str(e)}
+
+    return results
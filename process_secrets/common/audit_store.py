@@ -0,0 +1,169 @@
+"""
+Normalized audit store: secrets_full_audit.csv split into three .scol tables.
+
+    secrets.scol   one row per secret: SecretName, LastAccessedDate,
+                   LastChangedDate and tag_id
+    tags.scol      the distinct Tags strings (tag_id is a row number here)
+    versions.scol  one row per version, in audit order: secret_id,
+                   VersionId, VersionStages, VersionCreatedDate
+
+The secret-level fields and the (often long) tag strings are stored once
+instead of on every version row. AuditStore.iter_rows() joins the tables
+lazily: only the requested columns are decoded, secret-level values are
+looked up by secret_id, and a secret_names filter is applied on the small
+secrets table before any version column is touched.
+"""
+
+import csv
+import os
+from pathlib import Path
+
+from common.aws_secrets import AUDIT_FIELDNAMES
+from common.columnar import INT64, STR, TableWriter, open_table, write_table
+
+SECRETS_TABLE = 'secrets.scol'
+TAGS_TABLE = 'tags.scol'
+VERSIONS_TABLE = 'versions.scol'
+
+SECRET_FIELDS = ['SecretName', 'LastAccessedDate', 'LastChangedDate', 'Tags']
+VERSION_FIELDS = ['VersionId', 'VersionStages', 'VersionCreatedDate']
+
+
+def is_audit_store(path):
+    return path is not None and (Path(path) / VERSIONS_TABLE).is_file()
+
+
+def write_audit_store(rows, store_dir):
+    """
+    Normalize audit rows (tuples in AUDIT_FIELDNAMES order) into store_dir.
+
+    Rows are streamed into the tables; only the distinct tags are kept in
+    memory. Consecutive rows with the same secret-level fields share one
+    secret row (the collector writes a secret's versions together), so
+    converting back reproduces every row even if two rows of one name
+    disagree. Returns (secrets, versions, distinct tags).
+    """
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    tag_ids = {}
+    previous_key = None
+    secret_id = -1
+
+    # The versions table is finished last: is_audit_store() only sees a complete store
+    with TableWriter(store_dir / VERSIONS_TABLE,
+                     [('secret_id', INT64)] + [(field, STR) for field in VERSION_FIELDS]) as versions:
+        with TableWriter(store_dir / SECRETS_TABLE,
+                         [(field, STR) for field in SECRET_FIELDS[:3]] + [('tag_id', INT64)]) as secrets:
+            for row in rows:
+                key = tuple(row[:4])
+                if key != previous_key:
+                    previous_key = key
+                    secret_id += 1
+                    secrets.append((*key[:3], tag_ids.setdefault(row[3], len(tag_ids))))
+                versions.append((secret_id, *row[4:7]))
+        write_table(store_dir / TAGS_TABLE, [('Tags', STR, list(tag_ids))])
+    return secrets.num_rows, versions.num_rows, len(tag_ids)
+
+
+def audit_csv_to_store(csv_path, store_dir):
+    """Normalize a secrets_full_audit.csv into store_dir."""
+    with open(csv_path, 'r', newline='', encoding='utf-8') as file:
+        reader = csv.reader(file)
+        header = next(reader, [])
+        extra = [name for name in header if name not in AUDIT_FIELDNAMES]
+        if extra or 'SecretName' not in header:
+            # Region/Account tagged audits would lose their tags
+            raise ValueError(f"{csv_path} is not a single-target audit CSV (columns: {header})")
+        indexes = [header.index(name) if name in header else None for name in AUDIT_FIELDNAMES]
+        rows = (tuple(row[index] if index is not None and index < len(row) else ''
+                      for index in indexes) for row in reader)
+        return write_audit_store(rows, store_dir)
+
+
+def write_audit_csv(store, output_path):
+    """Export a store as the denormalized secrets_full_audit.csv."""
+    with open(output_path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(AUDIT_FIELDNAMES)
+        writer.writerows(store.iter_rows())
+
+
+class AuditStore:
+    """The three mapped tables of a normalized audit store."""
+
+    def __init__(self, store_dir):
+        store_dir = Path(store_dir)
+        self.secrets = open_table(store_dir / SECRETS_TABLE)
+        self.versions = open_table(store_dir / VERSIONS_TABLE)
+        self._tags_path = store_dir / TAGS_TABLE
+        self._tags = None
+
+    @property
+    def num_secrets(self):
+        return self.secrets.num_rows
+
+    @property
+    def num_versions(self):
+        return self.versions.num_rows
+
+    def tags(self):
+        """Distinct tag strings, read on first use."""
+        if self._tags is None:
+            with open_table(self._tags_path) as table:
+                self._tags = list(table.column('Tags'))
+        return self._tags
+
+    def secret_values(self, field):
+        """Per-secret values of a secret-level field (Tags resolved through the dictionary)."""
+        if field == 'Tags':
+            tags = self.tags()
+            return [tags[tag_id] for tag_id in self.secrets.column('tag_id')]
+        return list(self.secrets.column(field))
+
+    def iter_rows(self, fields=AUDIT_FIELDNAMES, secret_names=None):
+        """
+        Yield audit rows as tuples of fields, in audit order.
+
+        With secret_names, only the versions of those secrets are yielded and
+        only their version values are decoded.
+        """
+        secret_ids = self.versions.column('secret_id')
+        secret_values = {field: self.secret_values(field) for field in fields if field in SECRET_FIELDS}
+
+        if secret_names is not None:
+            names = secret_values.get('SecretName') or self.secret_values('SecretName')
+            wanted = bytearray(name in secret_names for name in names)
+            version_columns = {field: self.versions.column(field)
+                               for field in fields if field in VERSION_FIELDS}
+            for row_number, secret_id in enumerate(secret_ids):
+                if wanted[secret_id]:
+                    yield tuple(secret_values[field][secret_id] if field in secret_values
+                                else version_columns[field][row_number] for field in fields)
+            return
+
+        version_iters = [iter(self.versions.column(field)) if field in VERSION_FIELDS else None
+                         for field in fields]
+        lookups = [secret_values.get(field) for field in fields]
+        for secret_id in secret_ids:
+            yield tuple(next(values) if values is not None else lookups[index][secret_id]
+                        for index, values in enumerate(version_iters))
+
+    def close(self):
+        self.secrets.close()
+        self.versions.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_audit_store(store_dir):
+    return AuditStore(store_dir)
+
+
+def store_size(store_dir):
+    """Bytes used by the store's tables."""
+    return sum(os.path.getsize(Path(store_dir) / name)
+               for name in (SECRETS_TABLE, TAGS_TABLE, VERSIONS_TABLE))
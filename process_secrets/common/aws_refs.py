@@ -0,0 +1,150 @@
+"""Extraction of AWSCURRENT secret names from secrets_full_audit.csv / secrets_inventory.csv."""
+
+import csv
+
+from common.audit_store import is_audit_store, open_audit_store
+from common.aws_secrets import AUDIT_FIELDNAMES
+from common.columnar import STR, is_columnar, open_table, write_table
+from common.sources import UUID_REGEX
+
+NON_UUID_FIELDNAMES = ["SecretName", "VersionId", "VersionStages"]
+
+
+class AwsRefsResult:
+    """UUID and non-UUID AWSCURRENT secret names of one audit file."""
+
+    def __init__(self):
+        self.total_rows = 0
+        self.skipped_non_current = 0
+        # Names, or (name, region, account) tuples for region-tagged inventories
+        self.valid_secrets = []
+        self.invalid_secrets = []
+        self.tagged = False
+
+    def references(self):
+        """Set of UUID secret names, regardless of region tags."""
+        if self.tagged:
+            return {secret[0] for secret in self.valid_secrets}
+        return set(self.valid_secrets)
+
+
+def _collect_aws_secret_refs(rows, result):
+    """Classify the rows (dicts) of an audit or inventory into result."""
+    for row in rows:
+        result.total_rows += 1
+
+        # Only AWSCURRENT versions (the names-only inventory has no version columns)
+        if row.get("VersionStages", "AWSCURRENT") != "AWSCURRENT":
+            result.skipped_non_current += 1
+            continue
+
+        secret_name = row["SecretName"]
+
+        if UUID_REGEX.match(secret_name):
+            if result.tagged:
+                result.valid_secrets.append((secret_name, row["Region"], row["Account"]))
+            else:
+                result.valid_secrets.append(secret_name)
+        else:
+            result.invalid_secrets.append({
+                "SecretName": secret_name,
+                "VersionId": row.get("VersionId", ""),
+                "VersionStages": row.get("VersionStages", "")
+            })
+
+
+def read_aws_secret_refs(input_path):
+    """Split the AWSCURRENT rows of an audit or inventory CSV into UUID and non-UUID names."""
+    result = AwsRefsResult()
+
+    if is_audit_store(input_path):
+        # Secret names and version columns only; tags and dates are never decoded
+        names = ["SecretName", "VersionId", "VersionStages"]
+        with open_audit_store(input_path) as store:
+            rows = (dict(zip(names, values)) for values in store.iter_rows(names))
+            _collect_aws_secret_refs(rows, result)
+        return result
+
+    if is_columnar(input_path):
+        with open_table(input_path) as table:
+            result.tagged = "Region" in table
+            # Only the columns used below are decoded
+            names = [name for name in ["SecretName", "VersionId", "VersionStages", "Region", "Account"]
+                     if name in table]
+            rows = (dict(zip(names, values)) for values in table.iter_rows(names))
+            _collect_aws_secret_refs(rows, result)
+        return result
+
+    with open(input_path, newline="") as f:
+        reader = csv.DictReader(f)
+        # Multi-region inventories carry Region/Account columns; keep them on the output
+        result.tagged = "Region" in (reader.fieldnames or [])
+        _collect_aws_secret_refs(reader, result)
+
+    return result
+
+
+def iter_audit_rows(input_path, secret_names=None):
+    """
+    Yield every row of an audit CSV as a tuple in AUDIT_FIELDNAMES order.
+
+    SecretName is stripped; columns missing from the file or the row are ''.
+    The audit may also be a .scol table or a normalized audit store; a
+    store applies the secret_names filter before decoding version columns
+    (other formats yield every row and leave filtering to the caller).
+    """
+    if is_audit_store(input_path):
+        with open_audit_store(input_path) as store:
+            for values in store.iter_rows(AUDIT_FIELDNAMES, secret_names):
+                yield (values[0].strip(),) + values[1:]
+        return
+
+    if is_columnar(input_path):
+        with open_table(input_path) as table:
+            if "SecretName" not in table:
+                raise ValueError(f"{input_path} has no SecretName column")
+            for values in table.iter_rows(AUDIT_FIELDNAMES):
+                yield (values[0].strip(),) + values[1:]
+        return
+
+    with open(input_path, "r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        if "SecretName" not in header:
+            raise ValueError(f"{input_path} has no SecretName column")
+        indexes = [header.index(name) if name in header else None for name in AUDIT_FIELDNAMES]
+        for row in reader:
+            values = tuple(row[i] if i is not None and i < len(row) else "" for i in indexes)
+            yield (values[0].strip(),) + values[1:]
+
+
+def _write_valid_csv(result, valid_output_file):
+    with open(valid_output_file, "w", newline="") as f:
+        writer = csv.writer(f)
+        if result.tagged:
+            writer.writerow(["key_vault_secret_name", "region", "account"])
+            writer.writerows(result.valid_secrets)
+        else:
+            writer.writerow(["key_vault_secret_name"])
+            for s in result.valid_secrets:
+                writer.writerow([s])
+
+
+def write_aws_secret_refs(result, valid_output_file, invalid_output_file):
+    """Write key_vault_secrets.csv (or .scol) and non_uuid_secret_names.csv."""
+    if is_columnar(valid_output_file):
+        if result.tagged:
+            names, regions, accounts = zip(*result.valid_secrets) if result.valid_secrets else ((), (), ())
+            columns = [("key_vault_secret_name", STR, names), ("region", STR, regions),
+                       ("account", STR, accounts)]
+        else:
+            columns = [("key_vault_secret_name", STR, result.valid_secrets)]
+        write_table(valid_output_file, columns)
+    else:
+        _write_valid_csv(result, valid_output_file)
+
+    with open(invalid_output_file, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=NON_UUID_FIELDNAMES)
+        writer.writeheader()
+        for row in result.invalid_secrets:
+            writer.writerow(row)
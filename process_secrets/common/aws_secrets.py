@@ -0,0 +1,206 @@
+"""AWS Secrets Manager helpers shared by the collector and the stale secret scripts."""
+
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+DEFAULT_REGION = 'eu-west-2'
+DEFAULT_WORKERS = 8
+
+# Column layout of secrets_full_audit.csv (same as extract_secrets_from_aws_key_vault.sh)
+AUDIT_FIELDNAMES = ['SecretName', 'LastAccessedDate', 'LastChangedDate',
+                    'Tags', 'VersionId', 'VersionStages', 'VersionCreatedDate']
+
+# Secret-level columns only, written by the names-only (lazy) collection mode
+INVENTORY_FIELDNAMES = AUDIT_FIELDNAMES[:4]
+
+THROTTLING_ERROR_CODES = {
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'TooManyRequestsException',
+    'RequestLimitExceeded',
+    'RequestThrottled',
+    'RequestThrottledException',
+    'SlowDown',
+}
+
+
+def create_secretsmanager_client(region=DEFAULT_REGION, endpoint_url=None, profile=None):
+    """Create a boto3 Secrets Manager client, optionally against a local stub endpoint."""
+    try:
+        import boto3
+        from botocore.config import Config
+    except ImportError:
+        raise SystemExit("boto3 is required to talk to AWS: pip install boto3")
+
+    session = boto3.session.Session(profile_name=profile)
+    # Retries are handled by AdaptiveThrottle so that all workers back off together
+    config = Config(retries={'max_attempts': 1, 'mode': 'standard'})
+    return session.client('secretsmanager', region_name=region,
+                          endpoint_url=endpoint_url, config=config)
+
+
+def is_throttling_error(error):
+    """Return True if the exception is an AWS throttling error."""
+    response = getattr(error, 'response', None)
+    if not isinstance(response, dict):
+        return False
+    return response.get('Error', {}).get('Code') in THROTTLING_ERROR_CODES
+
+
+class AdaptiveThrottle:
+    """Delay shared by all workers: grows when AWS throttles us and decays on success."""
+
+    def __init__(self, min_delay=0.05, max_delay=20.0, backoff=2.0, decay=0.8,
+                 max_retries=10, sleep=time.sleep):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.decay = decay
+        self.max_retries = max_retries
+        self.delay = 0.0
+        self.throttled_calls = 0
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+    def call(self, fn, **kwargs):
+        """Call fn(**kwargs), retrying throttled calls with the shared backoff."""
+        attempt = 0
+        while True:
+            delay = self.delay
+            if delay:
+                # Full jitter keeps the workers from retrying in lockstep
+                self._sleep(delay * random.uniform(0.5, 1.0))
+            try:
+                result = fn(**kwargs)
+            except Exception as e:
+                if not is_throttling_error(e) or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                self._on_throttle()
+                continue
+            self._on_success()
+            return result
+
+    def _on_throttle(self):
+        with self._lock:
+            self.throttled_calls += 1
+            self.delay = min(self.max_delay, max(self.min_delay, self.delay * self.backoff))
+
+    def _on_success(self):
+        with self._lock:
+            if self.delay:
+                self.delay = self.delay * self.decay
+                if self.delay < self.min_delay:
+                    self.delay = 0.0
+
+
+def format_timestamp(value):
+    """Render an AWS timestamp the way the AWS CLI does (ISO 8601)."""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def secret_metadata(secret):
+    """Return (name, last accessed, last changed, tags) for a list-secrets entry."""
+    last_accessed = secret.get('LastAccessedDate')
+    last_changed = secret.get('LastChangedDate')
+    tags = '; '.join(f"{tag['Key']}={tag['Value']}" for tag in secret.get('Tags') or [])
+    return (
+        secret['Name'],
+        format_timestamp(last_accessed) if last_accessed else 'Never',
+        format_timestamp(last_changed) if last_changed else 'N/A',
+        tags,
+    )
+
+
+def version_rows(metadata, versions):
+    """Build secrets_full_audit.csv rows for one secret and its versions."""
+    rows = []
+    for version in versions:
+        rows.append(list(metadata) + [
+            version['VersionId'],
+            ';'.join(version.get('VersionStages') or []),
+            format_timestamp(version.get('CreatedDate', '')),
+        ])
+    return rows
+
+
+def iter_secret_pages(client, throttle, next_token=None, page_size=100):
+    """
+    Yield (page token, secrets, next token) for every list-secrets page.
+
+    The page token is the NextToken used to fetch the page (None for the
+    first page), so a scan can be restarted from any page.
+    """
+    while True:
+        kwargs = {'MaxResults': page_size}
+        if next_token:
+            kwargs['NextToken'] = next_token
+        response = throttle.call(client.list_secrets, **kwargs)
+        following = response.get('NextToken') or None
+        yield next_token, response.get('SecretList', []), following
+        next_token = following
+        if not next_token:
+            return
+
+
+def iter_secrets(client, throttle, page_size=100):
+    """Yield every secret in the account/region, one list-secrets page at a time."""
+    for _, secrets, _ in iter_secret_pages(client, throttle, page_size=page_size):
+        yield from secrets
+
+
+def list_secret_versions(client, throttle, secret_id):
+    """Return every version of a secret, following NextToken."""
+    versions = []
+    next_token = None
+    while True:
+        kwargs = {'SecretId': secret_id, 'MaxResults': 100}
+        if next_token:
+            kwargs['NextToken'] = next_token
+        response = throttle.call(client.list_secret_version_ids, **kwargs)
+        versions.extend(response.get('Versions', []))
+        next_token = response.get('NextToken')
+        if not next_token:
+            return versions
+
+
+def fetch_versions_concurrently(client, secrets, throttle, workers=DEFAULT_WORKERS):
+    """
+    Fetch version lists for secrets through a bounded thread pool.
+
+    Yields (secret, versions, error) in completion order. Only a couple of
+    requests per worker are kept in flight, so `secrets` may be a lazy
+    generator over list-secrets pages.
+    """
+    def fetch(secret):
+        return list_secret_versions(client, throttle, secret['Name'])
+
+    secrets = iter(secrets)
+    max_in_flight = workers * 2
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < max_in_flight:
+                secret = next(secrets, None)
+                if secret is None:
+                    exhausted = True
+                    break
+                pending[executor.submit(fetch, secret)] = secret
+
+            if not pending:
+                return
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                secret = pending.pop(future)
+                error = future.exception()
+                if error is not None:
+                    yield secret, None, error
+                else:
+                    yield secret, future.result(), None
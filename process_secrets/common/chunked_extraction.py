@@ -0,0 +1,204 @@
+"""
+Parallel extraction of very large psql dumps.
+
+The dump is memory-mapped and split into newline-aligned byte ranges that
+are parsed in a process pool. Workers read their range from the map in
+newline-aligned blocks of BLOCK_BYTES, operate on raw bytes and only decode
+the unique values they return. The few lines that bytes.split() would
+split differently from the serial engine's str.split() (non-ASCII
+whitespace such as NBSP, \x1c-\x1f, a lone \r) are decoded and parsed by
+the serial engine itself. The per-range results are merged in file order,
+so for UTF-8 dumps the output is identical to the serial engine in
+extraction.py.
+"""
+
+import csv
+import io
+import mmap
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from common.columnar import is_columnar
+from common.extraction import (
+    OUTPUT_HEADER,
+    ExtractionResult,
+    iter_references,
+    write_references_table,
+)
+
+DEFAULT_CHUNK_BYTES = 64 * 1024 * 1024
+# Bytes a worker copies out of the map at a time; a range is never copied whole
+BLOCK_BYTES = 1024 * 1024
+
+# ASCII bytes that str.split()/strip() treat as whitespace and bytes.split() does not
+_STR_ONLY_SEPARATORS = (b'\x1c', b'\x1d', b'\x1e', b'\x1f')
+
+# Per worker process cache of the byte-level patterns of a spec
+_byte_specs = {}
+
+
+def split_ranges(mm, size, chunk_bytes):
+    """Split [0, size) into ranges of about chunk_bytes that end right after a newline."""
+    ranges = []
+    start = 0
+    while start < size:
+        end = start + chunk_bytes
+        if end >= size:
+            end = size
+        else:
+            newline = mm.find(b'\n', end)
+            end = size if newline == -1 else newline + 1
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def _byte_spec(spec):
+    cached = _byte_specs.get(spec.name)
+    if cached is None:
+        validator = spec.validator
+        if validator is not None:
+            validator = re.compile(validator.pattern.encode(), validator.flags & ~re.UNICODE)
+        cached = (spec.header_prefix.encode(), validator)
+        _byte_specs[spec.name] = cached
+    return cached
+
+
+def _iter_blocks(mm, start, end, block_bytes=BLOCK_BYTES):
+    """mm[start:end] copied out one newline-aligned block at a time."""
+    pos = start
+    while pos < end:
+        stop = pos + block_bytes
+        if stop >= end:
+            stop = end
+        else:
+            newline = mm.rfind(b'\n', pos, stop)
+            if newline == -1:
+                # A line longer than a block
+                newline = mm.find(b'\n', stop, end)
+            stop = end if newline == -1 else newline + 1
+        yield mm[pos:stop]
+        pos = stop
+
+
+def _needs_text_parse(data):
+    """Whether data may split differently as bytes than as the serial engine's text lines."""
+    if not data.isascii() or any(separator in data for separator in _STR_ONLY_SEPARATORS):
+        return True
+    # A lone \r ends a line in text mode; trailing ones are stripped either way
+    return b'\r' in data.replace(b'\r\n', b'').rstrip(b'\r')
+
+
+def parse_range(path, start, end, spec):
+    """Parse one byte range of a dump; returns (rows_in, skipped, {value bytes: count})."""
+    header, validator = _byte_spec(spec)
+    column = spec.column
+    strip_leading = spec.strip_leading
+    rows_in = 0
+    skipped = 0
+    counts = {}
+
+    with open(path, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for block in _iter_blocks(mm, start, end):
+                check_lines = _needs_text_parse(block)
+                for line in block.split(b'\n'):
+                    if check_lines and _needs_text_parse(line):
+                        # Parse exactly as the serial engine reads the text
+                        line_result = ExtractionResult(spec)
+                        text = io.StringIO(line.decode('utf-8', 'replace'), newline=None)
+                        for value in iter_references(text, spec, line_result):
+                            value = value.encode('utf-8')
+                            counts[value] = counts.get(value, 0) + 1
+                        rows_in += line_result.rows_in
+                        skipped += line_result.skipped
+                        continue
+                    line = line.strip() if strip_leading else line.rstrip()
+                    if (
+                        not line
+                        or line.startswith(header)
+                        or line.startswith(b'-')
+                        or line.startswith(b'(')
+                    ):
+                        continue
+                    rows_in += 1
+                    if column is None:
+                        value = line
+                    else:
+                        parts = line.split()
+                        if len(parts) <= column:
+                            skipped += 1
+                            continue
+                        value = parts[column]
+                    if validator is not None and not validator.match(value):
+                        skipped += 1
+                        continue
+                    counts[value] = counts.get(value, 0) + 1
+
+    return rows_in, skipped, counts
+
+
+def _parse_range_task(task):
+    return parse_range(*task)
+
+
+def collect_references_parallel(spec, input_path, workers=None, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """Parse a dump in parallel and return an ExtractionResult with merged counts."""
+    result = ExtractionResult(spec)
+    size = os.path.getsize(input_path)
+    if size == 0:
+        return result
+
+    with open(input_path, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            ranges = split_ranges(mm, size, chunk_bytes)
+
+    tasks = [(str(input_path), start, end, spec) for start, end in ranges]
+    counts = result.counts
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map() yields in submission order, which keeps first occurrences in file order
+        for rows_in, skipped, chunk_counts in executor.map(_parse_range_task, tasks):
+            result.rows_in += rows_in
+            result.skipped += skipped
+            chunk_counts = _decode_counts(chunk_counts)
+            # Only values seen in an earlier range are summed one by one; update()
+            # keeps their first position and appends the new values in range order
+            for value in chunk_counts.keys() & counts.keys():
+                chunk_counts[value] += counts[value]
+            counts.update(chunk_counts)
+    return result
+
+
+def _decode_counts(chunk_counts):
+    """Decode one range's byte values; values never contain a newline, so one joined decode splits back exactly."""
+    if not chunk_counts:
+        return {}
+    values = b'\n'.join(chunk_counts).decode('utf-8', 'replace').split('\n')
+    decoded = dict(zip(values, chunk_counts.values()))
+    if len(decoded) < len(chunk_counts):
+        # Invalid UTF-8 sequences decoded to the same text: sum them like the serial engine
+        decoded = {}
+        for value, count in zip(values, chunk_counts.values()):
+            decoded[value] = decoded.get(value, 0) + count
+    return decoded
+
+
+def extract_references_parallel(spec, input_path=None, output_path=None, workers=None,
+                                chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """Parallel counterpart of extraction.extract_references."""
+    input_path = input_path or spec.input_file
+    output_path = spec.output_file if output_path is None else output_path
+    result = collect_references_parallel(spec, input_path, workers, chunk_bytes)
+    if output_path is False:
+        return result
+    if is_columnar(output_path):
+        write_references_table(result, output_path)
+        return result
+
+    with open(output_path, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(OUTPUT_HEADER)
+        # Values are already unique and in first-seen order
+        writer.writerows(zip(result.counts))
+    return result
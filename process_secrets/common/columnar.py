@@ -0,0 +1,393 @@
+"""
+Columnar binary intermediate files (.scol).
+
+A .scol file holds one table:
+
+    8 bytes   magic b'SCOL\\x01\\0\\0\\0'
+    8 bytes   little-endian length of the JSON header
+    N bytes   JSON header: {"rows": n, "metadata": {...}, "columns": [...]}
+    ...       column data, every block aligned to 8 bytes
+
+A 'str' column is n + 1 uint64 offsets followed by the concatenated UTF-8
+values; an 'int64' column is n int64 values. Readers mmap the file and
+slice values straight out of the mapping, so loading a table costs neither
+a parse nor a copy of the file; only the values actually used are decoded.
+
+write_table() takes whole columns. TableWriter takes rows one at a time and
+spills every column to temporary files as it goes, so tables larger than
+memory can be written.
+"""
+
+import csv
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+from itertools import repeat
+
+MAGIC = b'SCOL\x01\x00\x00\x00'
+SUFFIX = '.scol'
+STR = 'str'
+INT64 = 'int64'
+
+_ALIGN = 8
+# Rows buffered per column before their offsets or values are spilled
+_SPILL_ROWS = 65536
+
+
+def is_columnar(path):
+    return path is not None and path is not False and str(path).endswith(SUFFIX)
+
+
+def _padding(size):
+    return -size % _ALIGN
+
+
+def _little_endian(values):
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def _encode_column(kind, values):
+    """Return the data blocks of one column, its row count and whether it is ASCII."""
+    if kind == INT64:
+        data = _little_endian(array('q', values))
+        return [data.tobytes()], len(data), False
+    if kind != STR:
+        raise ValueError(f"Unknown column type: {kind}")
+    offsets = array('Q', [0])
+    chunks = []
+    position = 0
+    for value in values:
+        encoded = value.encode('utf-8')
+        chunks.append(encoded)
+        position += len(encoded)
+        offsets.append(position)
+    data = b''.join(chunks)
+    return [_little_endian(offsets).tobytes(), data], len(offsets) - 1, data.isascii()
+
+
+def _write_header(file, rows, metadata, columns):
+    """
+    Write the magic and header for columns of (name, type, first block
+    length, data length, ascii); the blocks follow in the same order.
+    """
+    header = {'rows': rows, 'metadata': metadata or {}, 'columns': []}
+    # Offsets are relative to the end of the header, which is only known once it is encoded
+    position = 0
+    for name, kind, first_length, data_length, ascii in columns:
+        entry = {'name': name, 'type': kind}
+        if kind == STR:
+            entry['ascii'] = ascii
+            entry['offsets'] = position
+            position += first_length
+            entry['data'] = position
+            entry['data_length'] = data_length
+            position += data_length + _padding(data_length)
+        else:
+            entry['data'] = position
+            position += first_length
+        header['columns'].append(entry)
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    header_bytes += b' ' * _padding(len(MAGIC) + 8 + len(header_bytes))
+    file.write(MAGIC)
+    file.write(struct.pack('<Q', len(header_bytes)))
+    file.write(header_bytes)
+
+
+def write_table(path, columns, metadata=None):
+    """
+    Write columns, a list of (name, type, values), to a .scol file.
+
+    The file is written next to its destination and renamed into place.
+    """
+    encoded = []
+    rows = None
+    for name, kind, values in columns:
+        blocks, count, ascii = _encode_column(kind, values)
+        if rows is not None and count != rows:
+            raise ValueError(f"Column {name} has {count} rows, expected {rows}")
+        rows = count
+        encoded.append((name, kind, blocks, ascii))
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as file:
+        _write_header(file, rows or 0, metadata,
+                      [(name, kind, len(blocks[0]), len(blocks[-1]), ascii)
+                       for name, kind, blocks, ascii in encoded])
+        for _, _, blocks, _ in encoded:
+            for block in blocks:
+                file.write(block)
+            file.write(b'\0' * _padding(len(blocks[-1])))
+    os.replace(tmp_path, path)
+
+
+class _ColumnSpill:
+    """The blocks of one column, appended to anonymous temporary files."""
+
+    def __init__(self, name, kind, directory):
+        if kind not in (STR, INT64):
+            raise ValueError(f"Unknown column type: {kind}")
+        self.name = name
+        self.kind = kind
+        self.ascii = True
+        # Offsets of a str column, values of an int64 column
+        self.first = tempfile.TemporaryFile(dir=directory)
+        self.first_length = 0
+        self.data = tempfile.TemporaryFile(dir=directory) if kind == STR else None
+        self.data_length = 0
+        self.buffer = array('Q', [0]) if kind == STR else array('q')
+
+    def append(self, value):
+        if self.kind == INT64:
+            self.buffer.append(value)
+            return
+        encoded = value.encode('utf-8')
+        if self.ascii and not encoded.isascii():
+            self.ascii = False
+        self.data.write(encoded)
+        self.data_length += len(encoded)
+        self.buffer.append(self.data_length)
+
+    def spill(self):
+        block = _little_endian(self.buffer).tobytes()
+        self.first.write(block)
+        self.first_length += len(block)
+        self.buffer = array(self.buffer.typecode)
+
+    def copy_to(self, file):
+        for block in (self.first, self.data):
+            if block is not None:
+                block.seek(0)
+                shutil.copyfileobj(block, file)
+        file.write(b'\0' * _padding(self.data_length if self.kind == STR else self.first_length))
+
+    def close(self):
+        self.first.close()
+        if self.data is not None:
+            self.data.close()
+
+
+class TableWriter:
+    """
+    Write a .scol file row by row in bounded memory.
+
+    columns is a list of (name, type); rows are sequences in that order.
+    Every column is spilled to temporary files next to the destination.
+    close() concatenates them behind the header and renames the result into
+    place. Used as a context manager, an exception discards the table.
+    """
+
+    def __init__(self, path, columns, metadata=None):
+        self.path = path
+        self.metadata = metadata
+        self.num_rows = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        self._columns = []
+        try:
+            for name, kind in columns:
+                self._columns.append(_ColumnSpill(name, kind, directory))
+        except BaseException:
+            self.abort()
+            raise
+
+    def append(self, row):
+        if len(row) != len(self._columns):
+            raise ValueError(f"Row {self.num_rows} has {len(row)} values, expected {len(self._columns)}")
+        for column, value in zip(self._columns, row):
+            column.append(value)
+        self.num_rows += 1
+        if self.num_rows % _SPILL_ROWS == 0:
+            for column in self._columns:
+                column.spill()
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def close(self):
+        """Write the table to path (once; later calls do nothing)."""
+        if self._columns is None:
+            return
+        try:
+            for column in self._columns:
+                column.spill()
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'wb') as file:
+                _write_header(file, self.num_rows, self.metadata,
+                              [(column.name, column.kind, column.first_length, column.data_length,
+                                column.ascii) for column in self._columns])
+                for column in self._columns:
+                    column.copy_to(file)
+            os.replace(tmp_path, self.path)
+        finally:
+            self.abort()
+
+    def abort(self):
+        """Drop the spilled columns without writing the table."""
+        for column in self._columns or ():
+            column.close()
+        self._columns = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class StringColumn:
+    """
+    Read-only sequence of str values backed by the mapped file.
+
+    ASCII columns (byte offsets equal character offsets) are decoded in one
+    call on first iteration and sliced; others decode value by value.
+    """
+
+    def __init__(self, data, offsets, ascii=False):
+        self._data = data
+        self._offsets = offsets
+        self._ascii = ascii
+        self._text = None
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def raw(self, index):
+        """The UTF-8 bytes of one value as a memoryview (no copy)."""
+        return self._data[self._offsets[index]:self._offsets[index + 1]]
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        return str(self._data[self._offsets[index]:self._offsets[index + 1]], 'utf-8')
+
+    def __iter__(self):
+        offsets = self._offsets
+        if self._ascii:
+            if self._text is None:
+                self._text = str(self._data, 'ascii')
+            return map(self._text.__getitem__, map(slice, offsets[:-1], offsets[1:]))
+        return self._iter_decoded()
+
+    def _iter_decoded(self):
+        data = self._data
+        offsets = self._offsets
+        start = offsets[0]
+        for index in range(1, len(offsets)):
+            end = offsets[index]
+            yield str(data[start:end], 'utf-8')
+            start = end
+
+
+class Table:
+    """A mapped .scol file; columns are views into the mapping until close()."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._mmap = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ) if size else b''
+        self._views = []
+        view = self._view(memoryview(self._mmap))
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a columnar .scol file")
+        (header_length,) = struct.unpack('<Q', view[len(MAGIC):len(MAGIC) + 8])
+        body = len(MAGIC) + 8 + header_length
+        header = json.loads(bytes(view[len(MAGIC) + 8:body]))
+        self.num_rows = header['rows']
+        self.metadata = header['metadata']
+        self._columns = {entry['name']: entry for entry in header['columns']}
+        self._body = self._view(view[body:])
+        self._cache = {}
+
+    def _view(self, view):
+        self._views.append(view)
+        return view
+
+    @property
+    def column_names(self):
+        return list(self._columns)
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def column(self, name):
+        """StringColumn or int64 memoryview of a column."""
+        if name in self._cache:
+            return self._cache[name]
+        entry = self._columns[name]
+        rows = self.num_rows
+        if entry['type'] == INT64:
+            column = self._view(self._body[entry['data']:entry['data'] + rows * 8].cast('q'))
+            if sys.byteorder != 'little':
+                column = _little_endian(array('q', column))
+        else:
+            offsets = self._view(self._body[entry['offsets']:entry['offsets'] + (rows + 1) * 8].cast('Q'))
+            if sys.byteorder != 'little':
+                offsets = _little_endian(array('Q', offsets))
+            data = self._view(self._body[entry['data']:entry['data'] + entry['data_length']])
+            column = StringColumn(data, offsets, entry.get('ascii', False))
+        self._cache[name] = column
+        return column
+
+    def iter_rows(self, names):
+        """Tuples of the given columns; unknown columns read as ''."""
+        return zip(*(iter(self.column(name)) if name in self else repeat('', self.num_rows)
+                     for name in names))
+
+    def close(self):
+        self._cache.clear()
+        try:
+            for view in reversed(self._views):
+                view.release()
+            if isinstance(self._mmap, mmap.mmap):
+                self._mmap.close()
+        except BufferError:
+            # A value slice is still alive (e.g. an abandoned iterator); the
+            # mapping is unmapped once it is garbage collected
+            pass
+        self._views.clear()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_table(path):
+    return Table(path)
+
+
+def write_csv(table, output_path, names=None):
+    """Export (some columns of) a table as CSV for humans."""
+    names = names or table.column_names
+    with open(output_path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(names)
+        writer.writerows(table.iter_rows(names))
+
+
+def csv_to_table(csv_path, output_path, metadata=None):
+    """Convert a CSV file (all columns as str) to a .scol file, streaming its rows."""
+    with open(csv_path, 'r', newline='', encoding='utf-8') as file:
+        reader = csv.reader(file)
+        header = next(reader, [])
+        width = len(header)
+        with TableWriter(output_path, [(name, STR) for name in header], metadata) as table:
+            for row in reader:
+                if len(row) != width:
+                    row = (row + [''] * width)[:width]
+                table.append(row)
@@ -0,0 +1,212 @@
+"""
+Direct database extraction of secret references.
+
+Runs the UNION queries documented in each DB folder's README and streams the
+rows with a server-side cursor into the same dedup/count engine the psql log
+extractors use, so no intermediate text dump is needed.
+"""
+
+import csv
+from collections import namedtuple
+
+from common.columnar import is_columnar
+from common.extraction import (
+    OUTPUT_HEADER,
+    ExtractionResult,
+    count_references,
+    write_references_table,
+)
+from common.sources import SOURCES
+
+DEFAULT_FETCH_SIZE = 5000
+
+# query     - SQL with {org} placeholders for the organization filter
+# transform - optional function applied to the first column of each row
+DbQuerySpec = namedtuple('DbQuerySpec', ['name', 'query', 'transform'], defaults=[None])
+
+
+def parsename_secret_uuid(value_ref):
+    """Python equivalent of PARSENAME(REPLACE(value_ref, '/', '.'), 2) used by the App DB query."""
+    parts = value_ref.replace('/', '.').split('.')
+    if len(parts) > 4 or len(parts) < 2:
+        return None
+    return parts[-2] or None
+
+
+DB_QUERIES = {
+    'choreo_app_db': DbQuerySpec(
+        name='choreo_app_db',
+        query="""
+            SELECT DISTINCT cv.value_ref
+            FROM configuration_value cv
+            JOIN configuration_mount cm ON cv.config_mount_id = cm.id
+            JOIN component_data cd ON cm.component_data_uuid = cd.uuid
+            WHERE cd.organization_handle = {org}
+              AND cv.value_ref IS NOT NULL
+              AND cv.value_ref != ''
+        """,
+        transform=parsename_secret_uuid,
+    ),
+    'choreo_cloud_manager_db': DbQuerySpec(
+        name='choreo_cloud_manager_db',
+        query="""
+            SELECT reference_token FROM common_credentials
+            WHERE reference_token IS NOT NULL AND organization_id = {org}
+            UNION ALL
+            SELECT reference_token FROM git_credentials
+            WHERE reference_token IS NOT NULL AND organization_id = {org}
+            UNION ALL
+            SELECT reference_token FROM docker_credentials
+            WHERE reference_token IS NOT NULL AND organization_id = {org}
+            UNION ALL
+            SELECT reference_token FROM user_apps_credentials
+            WHERE reference_token IS NOT NULL
+            UNION ALL
+            SELECT reference_token FROM third_party_registry_credentials
+            WHERE reference_token IS NOT NULL AND organization_id = {org}
+        """,
+    ),
+    'choreo_configuration_service_db': DbQuerySpec(
+        name='choreo_configuration_service_db',
+        query="""
+            SELECT DISTINCT cv.value_ref
+            FROM configuration_values cv
+            INNER JOIN configuration_keys ck ON cv.key_id = ck.id
+            INNER JOIN configuration_groups cg ON ck.group_id = cg.id
+            INNER JOIN configuration_scopes cs ON cg.id = cs.group_id
+            WHERE cs.organization_uuid = {org}
+              AND cv.value_ref != ''
+              AND cv.value_ref IS NOT NULL
+        """,
+    ),
+    'choreo_rudder_db': DbQuerySpec(
+        name='choreo_rudder_db',
+        query="""
+            SELECT vault_id FROM secrets
+            WHERE vault_id IS NOT NULL AND organization_id = {org}
+            UNION ALL
+            SELECT vault_id FROM config_maps
+            WHERE vault_id IS NOT NULL AND organization_id = {org}
+        """,
+    ),
+}
+
+
+def bind_query(query, org, paramstyle):
+    """Substitute the {org} placeholders for the driver's DB-API paramstyle."""
+    count = query.count('{org}')
+    if paramstyle == 'qmark':
+        return query.replace('{org}', '?'), (org,) * count
+    if paramstyle in ('format', 'pyformat'):
+        return query.replace('{org}', '%s'), (org,) * count
+    if paramstyle == 'named':
+        return query.replace('{org}', ':org'), {'org': org}
+    if paramstyle == 'numeric':
+        return query.replace('{org}', ':1'), (org,)
+    raise ValueError(f"Unsupported DB-API paramstyle: {paramstyle}")
+
+
+def connect(dsn):
+    """
+    Open a DB-API connection for a DSN.
+
+    Returns (connection, paramstyle, cursor factory). postgresql:// uses
+    psycopg2 with a named (server-side) cursor, mysql:// uses PyMySQL with an
+    unbuffered SSCursor, odbc:<connection string> uses pyodbc (e.g. for the
+    SQL Server App DB), and sqlite:///path (or a plain file path) uses sqlite3.
+    """
+    if dsn.startswith(('postgres://', 'postgresql://')):
+        try:
+            import psycopg2
+        except ImportError:
+            raise SystemExit("psycopg2 is required for PostgreSQL sources: pip install psycopg2-binary")
+        connection = psycopg2.connect(dsn)
+        return connection, psycopg2.paramstyle, lambda: connection.cursor(name='secret_refs')
+
+    if dsn.startswith('mysql://'):
+        try:
+            import pymysql
+            import pymysql.cursors
+        except ImportError:
+            raise SystemExit("PyMySQL is required for MySQL sources: pip install pymysql")
+        from urllib.parse import unquote, urlparse
+        url = urlparse(dsn)
+        connection = pymysql.connect(
+            host=url.hostname, port=url.port or 3306, user=unquote(url.username or ''),
+            password=unquote(url.password or ''), database=url.path.lstrip('/'),
+        )
+        return connection, pymysql.paramstyle, lambda: connection.cursor(pymysql.cursors.SSCursor)
+
+    if dsn.startswith('odbc:'):
+        try:
+            import pyodbc
+        except ImportError:
+            raise SystemExit("pyodbc is required for ODBC sources: pip install pyodbc")
+        connection = pyodbc.connect(dsn[len('odbc:'):])
+        return connection, pyodbc.paramstyle, connection.cursor
+
+    import sqlite3
+    path = dsn[len('sqlite:///'):] if dsn.startswith('sqlite:///') else dsn
+    connection = sqlite3.connect(path)
+    return connection, sqlite3.paramstyle, connection.cursor
+
+
+def iter_db_references(cursor, db_spec, org, paramstyle, result, fetch_size=DEFAULT_FETCH_SIZE):
+    """Execute the source query and yield its reference values, fetch_size rows at a time."""
+    query, params = bind_query(db_spec.query, org, paramstyle)
+    if hasattr(cursor, 'itersize'):
+        cursor.itersize = fetch_size
+    cursor.execute(query, params)
+
+    transform = db_spec.transform
+    validator = SOURCES[db_spec.name].validator
+    while True:
+        rows = cursor.fetchmany(fetch_size)
+        if not rows:
+            return
+        for row in rows:
+            result.rows_in += 1
+            value = row[0]
+            if value is not None and transform is not None:
+                value = transform(value)
+            if value is not None:
+                value = str(value).strip()
+            if not value or (validator is not None and not validator.match(value)):
+                result.skipped += 1
+                continue
+            yield value
+
+
+def extract_references_from_db(name, dsn, org, output_path=None, fetch_size=DEFAULT_FETCH_SIZE,
+                               batch_size=1000, connection=None):
+    """
+    Extract a source's references straight from its database.
+
+    Pass output_path=False to only collect the references in memory, and
+    connection=(connection, paramstyle, cursor factory) to reuse a connection.
+    """
+    spec = SOURCES[name]
+    output_path = spec.output_file if output_path is None else output_path
+    result = ExtractionResult(spec)
+
+    owned = connection is None
+    connection, paramstyle, cursor_factory = connection or connect(dsn)
+    try:
+        cursor = cursor_factory()
+        try:
+            values = iter_db_references(cursor, DB_QUERIES[name], org, paramstyle, result, fetch_size)
+            if output_path is False:
+                count_references(values, result)
+            elif is_columnar(output_path):
+                write_references_table(count_references(values, result), output_path)
+            else:
+                with open(output_path, 'w', newline='') as csvfile:
+                    writer = csv.writer(csvfile)
+                    writer.writerow(OUTPUT_HEADER)
+                    count_references(values, result, writer, batch_size)
+        finally:
+            cursor.close()
+    finally:
+        if owned:
+            connection.close()
+    return result
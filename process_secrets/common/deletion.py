@@ -0,0 +1,296 @@
+"""Rate-limited, resumable deletion of stale secrets from AWS Secrets Manager."""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from common.aws_secrets import DEFAULT_WORKERS, AdaptiveThrottle
+from common.secret_sets import iter_secret_names
+
+DEFAULT_RECOVERY_WINDOW_DAYS = 30
+MIN_RECOVERY_WINDOW_DAYS = 7
+MAX_RECOVERY_WINDOW_DAYS = 30
+DEFAULT_RATE = 5.0
+DEFAULT_RETRIES = 3
+
+# Journal statuses; a resumed run skips the terminal ones
+DELETED = 'deleted'
+NOT_FOUND = 'not_found'
+REFERENCED = 'referenced'
+FAILED = 'failed'
+DRY_RUN = 'dry_run'
+TERMINAL_STATUSES = {DELETED, NOT_FOUND}
+
+# Errors worth retrying after a pause (throttling is retried by AdaptiveThrottle)
+TRANSIENT_ERROR_CODES = {'InternalServiceError', 'ServiceUnavailable', 'RequestTimeout'}
+
+
+def error_code(error):
+    response = getattr(error, 'response', None)
+    if not isinstance(response, dict):
+        return None
+    return response.get('Error', {}).get('Code')
+
+
+def _error_message(error):
+    return getattr(error, 'response', {}).get('Error', {}).get('Message') or str(error)
+
+
+def read_candidates(path):
+    """
+    Candidate names in file order, without duplicates.
+
+    A .csv file (stale_secrets.csv) is read from its key_vault_secret_name
+    column; anything else (delete_candidates_list.txt) has one name per
+    line, with blank lines and '#' comments ignored.
+    """
+    path = Path(path)
+    if path.suffix == '.csv':
+        names = iter_secret_names(path)
+    else:
+        with open(path, 'r', encoding='utf-8') as file:
+            names = [line.strip() for line in file]
+        names = [name for name in names if name and not name.startswith('#')]
+    return list(dict.fromkeys(names))
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, with bursts of up to `burst`."""
+
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(1.0, burst if burst is not None else rate)
+        self.tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available and take it."""
+        while True:
+            with self._lock:
+                now = self._clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_seconds = (1 - self.tokens) / self.rate
+            self._sleep(wait_seconds)
+
+
+class DeletionJournal:
+    """
+    Append-only JSON lines record of every deletion attempt.
+
+    Each line is flushed and fsynced before the next candidate is counted
+    as done, so after a crash the journal holds every completed deletion
+    and at most one torn last line, which is cut off when the journal is
+    reopened. Resuming skips the names whose latest entry is terminal.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.latest = {}
+        self._lock = threading.Lock()
+        self._file = None
+        if self.path.exists():
+            complete = 0
+            with open(self.path, 'rb') as file:
+                for line in file:
+                    if not line.endswith(b'\n'):
+                        break
+                    complete += len(line)
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.latest[entry['name']] = entry['status']
+            # Drop a torn last line so the next entry starts on a line of its own
+            if self.path.stat().st_size != complete:
+                os.truncate(self.path, complete)
+
+    def done(self):
+        """Names already deleted (or found missing) by an earlier run."""
+        return {name for name, status in self.latest.items() if status in TERMINAL_STATUSES}
+
+    def record(self, name, status, **details):
+        entry = {'name': name, 'status': status,
+                 'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'), **details}
+        line = json.dumps(entry) + '\n'
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.latest[name] = status
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ReferenceGuard:
+    """
+    The latest DB reference sets, re-read whenever a file changes on disk.
+
+    Every candidate is checked just before its deletion. References only
+    accumulate during a run, so a reference file caught half-rewritten by an
+    extractor can never make a secret look unreferenced.
+    """
+
+    def __init__(self, paths_by_source):
+        self.paths = {source: Path(path) for source, path in paths_by_source.items()}
+        self.references = {source: set() for source in self.paths}
+        self.reloads = 0
+        self._versions = {}
+        self._lock = threading.Lock()
+        missing = [str(path) for path in self.paths.values() if not path.exists()]
+        if missing:
+            raise FileNotFoundError(f"Reference files not found: {', '.join(missing)}")
+        self.refresh()
+
+    def refresh(self):
+        """Re-read every reference file whose size or mtime changed."""
+        with self._lock:
+            for source, path in self.paths.items():
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                version = (stat.st_size, stat.st_mtime_ns)
+                if self._versions.get(source) == version:
+                    continue
+                self.references[source].update(iter_secret_names(path))
+                self._versions[source] = version
+                self.reloads += 1
+
+    def sources_of(self, name):
+        """Sources that reference name, after picking up changed files."""
+        self.refresh()
+        return [source for source, names in self.references.items() if name in names]
+
+
+def delete_secret(client, throttle, name, recovery_window_days=DEFAULT_RECOVERY_WINDOW_DAYS,
+                  force=False, retries=DEFAULT_RETRIES, sleep=time.sleep):
+    """
+    Delete one secret; returns DELETED or NOT_FOUND.
+
+    A secret that is already scheduled for deletion (a crash between the
+    call and its journal entry) counts as deleted. Transient service errors
+    are retried with exponential backoff; anything else is raised.
+    """
+    kwargs = {'SecretId': name}
+    if force:
+        kwargs['ForceDeleteWithoutRecovery'] = True
+    else:
+        kwargs['RecoveryWindowInDays'] = recovery_window_days
+    attempt = 0
+    while True:
+        try:
+            throttle.call(client.delete_secret, **kwargs)
+            return DELETED
+        except Exception as e:
+            code = error_code(e)
+            if code == 'ResourceNotFoundException':
+                return NOT_FOUND
+            if code == 'InvalidRequestException' and 'marked for deletion' in _error_message(e):
+                return DELETED
+            transient = code in TRANSIENT_ERROR_CODES or isinstance(e, (ConnectionError, TimeoutError))
+            if not transient or attempt >= retries:
+                raise
+            sleep(0.5 * 2 ** attempt)
+            attempt += 1
+
+
+def delete_candidates(client, candidates, journal, guard=None,
+                      recovery_window_days=DEFAULT_RECOVERY_WINDOW_DAYS, force=False,
+                      dry_run=False, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE, burst=None,
+                      throttle=None, retries=DEFAULT_RETRIES, sleep=time.sleep):
+    """
+    Delete candidates through a bounded worker pool sharing one rate limiter.
+
+    Names the journal already records as deleted are skipped. Each remaining
+    name is checked against guard right before its delete call and kept if
+    any source references it. With dry_run nothing is deleted or journaled;
+    the stats show what a real run would do. Returns a dict of
+    {'skipped': n, DELETED: [...], NOT_FOUND: [...], DRY_RUN: [...],
+    REFERENCED: {name: sources}, FAILED: {name: error}}.
+    """
+    if not force and not MIN_RECOVERY_WINDOW_DAYS <= recovery_window_days <= MAX_RECOVERY_WINDOW_DAYS:
+        raise ValueError(f"recovery window must be {MIN_RECOVERY_WINDOW_DAYS}-"
+                         f"{MAX_RECOVERY_WINDOW_DAYS} days, got {recovery_window_days}")
+    throttle = throttle or AdaptiveThrottle(sleep=sleep)
+    bucket = TokenBucket(rate, burst, sleep=sleep)
+    done = journal.done()
+    stats = {'skipped': 0, DELETED: [], NOT_FOUND: [], DRY_RUN: [], REFERENCED: {}, FAILED: {}}
+    details = {'force': True} if force else {'recovery_window_days': recovery_window_days}
+
+    def process(name):
+        if not dry_run:
+            # Wait for the rate limit first so the re-check directly precedes the delete
+            bucket.acquire()
+        sources = guard.sources_of(name) if guard is not None else []
+        if sources:
+            if not dry_run:
+                journal.record(name, REFERENCED, sources=sources)
+            return REFERENCED, sources
+        if dry_run:
+            return DRY_RUN, None
+        try:
+            status = delete_secret(client, throttle, name, recovery_window_days, force, retries, sleep)
+        except Exception as e:
+            journal.record(name, FAILED, error=str(e))
+            return FAILED, str(e)
+        journal.record(name, status, **details)
+        return status, None
+
+    pending_names = []
+    for name in candidates:
+        if name in done:
+            stats['skipped'] += 1
+        else:
+            pending_names.append(name)
+
+    names = iter(pending_names)
+    max_in_flight = workers * 2
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < max_in_flight:
+                name = next(names, None)
+                if name is None:
+                    exhausted = True
+                    break
+                pending[executor.submit(process, name)] = name
+            if not pending:
+                break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = pending.pop(future)
+                status, detail = future.result()
+                if status in (REFERENCED, FAILED):
+                    stats[status][name] = detail
+                else:
+                    stats[status].append(name)
+                completed = len(stats[DELETED]) + len(stats[NOT_FOUND])
+                if completed and completed % 500 == 0 and status in (DELETED, NOT_FOUND):
+                    print(f"Deleted {completed} of {len(pending_names)} secrets...")
+
+    stats['throttled_calls'] = throttle.throttled_calls
+    return stats
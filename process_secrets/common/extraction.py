@@ -0,0 +1,244 @@
+"""Streaming extraction of secret references from psql fixed-width dumps."""
+
+import argparse
+import csv
+import time
+from collections import namedtuple
+
+from common.columnar import SUFFIX as COLUMNAR_SUFFIX, is_columnar
+from common.metrics import add_metrics_arguments, stage_metrics
+
+OUTPUT_HEADER = ['key_vault_secret_name']
+
+# Declarative description of one DB dump:
+#   name           - DB folder name, e.g. 'choreo_app_db'
+#   input_file     - default psql log to read
+#   header_prefix  - first word of the psql header row
+#   column         - index of the value in the whitespace-split row (None = whole line)
+#   validator      - optional compiled regex a value must match, others are skipped
+#   output_file    - CSV to write
+#   value_label    - how the values are called in the console report
+#   strip_leading  - strip leading whitespace before classifying a line
+SourceSpec = namedtuple(
+    'SourceSpec',
+    ['name', 'input_file', 'header_prefix', 'column', 'validator',
+     'output_file', 'value_label', 'strip_leading'],
+    defaults=[None, 'key_vault_secrets.csv', 'values', True],
+)
+
+
+class ExtractionResult:
+    """Counters of one extraction run; `counts` maps each unique value to its occurrences."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.rows_in = 0
+        self.skipped = 0
+        self.counts = {}
+
+    @property
+    def extracted(self):
+        return sum(self.counts.values())
+
+    @property
+    def unique(self):
+        return len(self.counts)
+
+    def duplicates(self):
+        return {value: count for value, count in self.counts.items() if count > 1}
+
+    def references(self):
+        return set(self.counts)
+
+
+def iter_data_rows(lines, spec):
+    """Yield the data rows of a psql dump, dropping blank, header, separator and footer lines."""
+    header = spec.header_prefix
+    for line in lines:
+        line = line.strip() if spec.strip_leading else line.rstrip()
+        if (
+            not line
+            or line.startswith(header)
+            or line.startswith('-')
+            or line.startswith('(')
+        ):
+            continue
+        yield line
+
+
+def iter_references(lines, spec, result):
+    """Yield the reference value of every data row, counting rows and skips in result."""
+    column = spec.column
+    validator = spec.validator
+    for line in iter_data_rows(lines, spec):
+        result.rows_in += 1
+        if column is None:
+            value = line
+        else:
+            parts = line.split()
+            if len(parts) <= column:
+                result.skipped += 1
+                continue
+            value = parts[column]
+        if validator is not None and not validator.match(value):
+            result.skipped += 1
+            continue
+        yield value
+
+
+def count_references(values, result, writer=None, batch_size=1000):
+    """
+    Deduplicate and count values in a single pass.
+
+    First occurrences are handed to writer.writerows in batches, so memory is
+    bounded by the number of unique values, not the size of the dump.
+    """
+    counts = result.counts
+    batch = []
+    for value in values:
+        count = counts.get(value)
+        if count is None:
+            counts[value] = 1
+            if writer is not None:
+                batch.append((value,))
+                if len(batch) >= batch_size:
+                    writer.writerows(batch)
+                    batch.clear()
+        else:
+            counts[value] = count + 1
+    if writer is not None and batch:
+        writer.writerows(batch)
+    return result
+
+
+def write_references_table(result, output_path):
+    """Write the unique references, in first-seen order, as a columnar .scol file."""
+    from common.columnar import STR, write_table
+    write_table(output_path, [(OUTPUT_HEADER[0], STR, list(result.counts))],
+                {'source': result.spec.name})
+
+
+def extract_references(spec, input_path=None, output_path=None, batch_size=1000, metrics=None):
+    """
+    Extract the unique references of a psql dump into a key_vault_secrets.csv.
+
+    Pass output_path=False to only collect the references in memory; an
+    output path ending in .scol writes the columnar format instead of CSV.
+    With metrics (a StageMetrics), output writes are timed as 'io' and the
+    rest of the pass as 'parse'.
+    """
+    input_path = input_path or spec.input_file
+    output_path = spec.output_file if output_path is None else output_path
+    result = ExtractionResult(spec)
+    start = time.perf_counter()
+    io_before = metrics.timings.get('io', 0.0) if metrics is not None else 0.0
+
+    with open(input_path, 'r') as lines:
+        values = iter_references(lines, spec, result)
+        if output_path is False:
+            count_references(values, result)
+        elif is_columnar(output_path):
+            count_references(values, result)
+            write_table = write_references_table
+            if metrics is not None:
+                write_table = metrics.timed('io', write_table)
+            write_table(result, output_path)
+        else:
+            with open(output_path, 'w', newline='') as csvfile:
+                writer = csv.writer(csvfile)
+                writer.writerow(OUTPUT_HEADER)
+                if metrics is not None:
+                    writer = _TimedWriter(writer, metrics)
+                count_references(values, result, writer, batch_size)
+
+    if metrics is not None:
+        io_seconds = metrics.timings.get('io', 0.0) - io_before
+        metrics.add_time('parse', time.perf_counter() - start - io_seconds)
+    return result
+
+
+class _TimedWriter:
+    """csv writer proxy adding the time of every writerows batch to the 'io' timer."""
+
+    def __init__(self, writer, metrics):
+        self.writerows = metrics.timed('io', writer.writerows)
+
+
+def print_report(result, output_path, quiet=False):
+    """Print the extraction summary and duplicate report (only its size when quiet)."""
+    spec = result.spec
+    title = f"{spec.name} extraction summary"
+    print(title)
+    print("-" * len(title))
+    print(f"Data rows read               : {result.rows_in}")
+    print(f"Rows skipped                 : {result.skipped}")
+    print(f"References extracted         : {result.extracted}")
+    print(f"Unique references            : {result.unique}")
+
+    duplicates = result.duplicates()
+    if duplicates and quiet:
+        print(f"\n{len(duplicates)} duplicate {spec.value_label} found.")
+    elif duplicates:
+        print(f"\nDuplicate {spec.value_label} found:")
+        for value, count in duplicates.items():
+            print(f"{value} -> {count} times")
+    else:
+        print(f"\nNo duplicate {spec.value_label} found.")
+
+    print(f"\nExtracted {result.unique} unique secrets into {output_path}")
+
+
+def run_extractor(spec, argv=None):
+    """Command line entry point shared by the extract_*_db_secret_refs.py scripts."""
+    parser = argparse.ArgumentParser(
+        description=f"Extract key vault secret references from a {spec.name} psql dump."
+    )
+    parser.add_argument('--input', default=spec.input_file, help="psql output log")
+    parser.add_argument('--output', default=None,
+                        help=f"Default: {spec.output_file} (or .scol with --format scol)")
+    parser.add_argument('--format', choices=['csv', 'scol'], default='csv',
+                        help="scol writes the memory-mappable columnar format")
+    parser.add_argument('--batch-size', type=int, default=1000,
+                        help="Rows per buffered CSV write")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Parse the memory-mapped dump in N processes (0 = all CPUs)")
+    parser.add_argument('--chunk-mb', type=int, default=64,
+                        help="Size of the byte ranges handed to each worker")
+    parser.add_argument('--dsn', default=None,
+                        help="Query the database directly instead of reading a psql log "
+                             "(postgresql://..., mysql://... or sqlite:///path)")
+    parser.add_argument('--org', default=None,
+                        help="Organization filter of the source query (with --dsn)")
+    parser.add_argument('--fetch-size', type=int, default=5000,
+                        help="Rows fetched per server-side cursor round trip (with --dsn)")
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.output is None:
+        args.output = spec.output_file
+        if args.format == 'scol':
+            args.output = args.output.rsplit('.', 1)[0] + COLUMNAR_SUFFIX
+
+    if args.dsn and args.org is None:
+        parser.error("--org is required with --dsn")
+
+    with stage_metrics(spec.name, args) as metrics:
+        if args.dsn:
+            from common.db_sources import extract_references_from_db
+            with metrics.timer('query'):
+                result = extract_references_from_db(spec.name, args.dsn, args.org, args.output,
+                                                    fetch_size=args.fetch_size,
+                                                    batch_size=args.batch_size)
+        elif args.workers == 1:
+            result = extract_references(spec, args.input, args.output, args.batch_size, metrics)
+        else:
+            from common.chunked_extraction import extract_references_parallel
+            # Workers parse and the parent writes; the two overlap, so only the total is timed
+            with metrics.timer('parallel_extract'):
+                result = extract_references_parallel(
+                    spec, args.input, args.output, workers=args.workers or None,
+                    chunk_bytes=args.chunk_mb * 1024 * 1024,
+                )
+        metrics.set(rows_in=result.rows_in, rows_out=result.unique, extracted=result.extracted,
+                    duplicates=len(result.duplicates()), skipped=result.skipped)
+    print_report(result, args.output, args.quiet)
+    return result
@@ -0,0 +1,161 @@
+"""
+In-memory secret lookup index and its background reloader.
+
+The index holds one source bitmask per name (see attribution.py) for the
+AWS inventory and every DB folder, plus the latest audit dates per secret,
+so a lookup is two dict probes. The reloader polls the input files and
+builds a complete new index when one changes, then swaps it in with a
+single reference assignment. Readers that took the old index keep a
+consistent view until they finish.
+"""
+
+import threading
+import time
+from pathlib import Path
+
+from common.attribution import Attribution
+from common.aws_refs import iter_audit_rows
+from common.pipeline import AWS_SOURCE
+from common.secret_sets import iter_secret_names
+from common.stale_sort import date_key
+
+DEFAULT_POLL_INTERVAL = 2.0
+
+ACTIVE = 'active'
+STALE = 'stale'
+# Referenced by a DB but not in the AWS inventory
+DANGLING = 'dangling'
+# In the audit only: a non-UUID name, outside stale detection
+NOT_CHECKED = 'not_checked'
+UNKNOWN = 'unknown'
+
+
+class LookupIndex:
+    """Stale/active state, referencing sources and audit dates of every known name."""
+
+    def __init__(self, paths_by_source, audit_path=None):
+        """paths_by_source maps AWS_SOURCE and each DB folder to its key_vault_secrets file."""
+        self.attribution = Attribution(paths_by_source)
+        for source, path in paths_by_source.items():
+            self.attribution.add(source, iter_secret_names(path))
+        self.aws_bit = self.attribution.bits[AWS_SOURCE]
+        self.audit = {}
+        if audit_path is not None:
+            self._load_audit(audit_path)
+        self.loaded_at = time.strftime('%Y-%m-%dT%H:%M:%S%z')
+        self.counts = self._counts()
+
+    def _load_audit(self, audit_path):
+        # name -> (last accessed, last changed, latest version created, its stages, its key)
+        audit = self.audit
+        for name, accessed, changed, _, _, stages, created in iter_audit_rows(audit_path):
+            key = date_key(created)
+            entry = audit.get(name)
+            if entry is None or key > entry[4]:
+                audit[name] = (accessed, changed, created, stages, key)
+
+    def _counts(self):
+        counts = {'names': len(self.attribution.masks), 'audit_secrets': len(self.audit)}
+        histogram = self.attribution.histogram()
+        aws_bit = self.aws_bit
+        counts['inventory'] = sum(n for mask, n in histogram.items() if mask & aws_bit)
+        counts['stale'] = histogram.get(aws_bit, 0)
+        counts['active'] = counts['inventory'] - counts['stale']
+        for source, bit in self.attribution.bits.items():
+            if source != AWS_SOURCE:
+                counts[source] = sum(n for mask, n in histogram.items() if mask & bit)
+        return counts
+
+    def lookup(self, name):
+        mask = self.attribution.masks.get(name, 0)
+        sources = self.attribution.sources_of(mask & ~self.aws_bit)
+        audit = self.audit.get(name)
+        if mask & self.aws_bit:
+            state = ACTIVE if sources else STALE
+        elif sources:
+            state = DANGLING
+        else:
+            state = NOT_CHECKED if audit is not None else UNKNOWN
+        result = {'name': name, 'state': state, 'in_aws_inventory': bool(mask & self.aws_bit),
+                  'sources': sources}
+        if audit is not None:
+            result.update(last_accessed=audit[0], last_changed=audit[1],
+                          latest_version_created=audit[2], latest_version_stages=audit[3])
+        return result
+
+    def lookup_many(self, names):
+        return [self.lookup(name) for name in names]
+
+
+class IndexReloader:
+    """
+    Keeps `index` current with its input files.
+
+    check() compares every watched file's size and mtime with those of the
+    current index. A change is only loaded once the files have stayed the
+    same for one whole poll, so an extractor still writing its output is
+    not indexed half-written. A build that fails or races with another
+    change leaves the current index in place.
+    """
+
+    def __init__(self, build, paths, interval=DEFAULT_POLL_INTERVAL):
+        self.build = build
+        self.paths = [Path(path) for path in paths]
+        self.interval = interval
+        self.generation = 1
+        self.reload_errors = 0
+        self._versions = self._stat()
+        self.index = build()
+        self._pending = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _stat(self):
+        versions = []
+        for path in self.paths:
+            try:
+                stat = path.stat()
+                versions.append((stat.st_size, stat.st_mtime_ns))
+            except FileNotFoundError:
+                versions.append(None)
+        return versions
+
+    def check(self):
+        """Poll once; returns True if a new index was swapped in."""
+        versions = self._stat()
+        if versions == self._versions:
+            self._pending = None
+            return False
+        if versions != self._pending:
+            # Changed since the last poll; wait for it to settle
+            self._pending = versions
+            return False
+        try:
+            index = self.build()
+        except Exception as e:
+            self.reload_errors += 1
+            print(f"Error: reload failed, keeping generation {self.generation}: {e}")
+            self._pending = None
+            return False
+        if self._stat() != versions:
+            self._pending = None
+            return False
+        self.index = index
+        self._versions = versions
+        self._pending = None
+        self.generation += 1
+        print(f"Reloaded index (generation {self.generation}): {index.counts}")
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='index-reloader', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,191 @@
+"""
+Machine-readable per-stage metrics and opt-in profiling.
+
+Each stage run appends one JSON object to a JSON lines metrics file:
+
+    {"stage": "choreo_rudder_db", "started_at": "...", "status": "ok",
+     "wall_seconds": 1.02, "peak_rss_mb": 32.3, "children_peak_rss_mb": 0.0,
+     "rows_in": 700, "rows_out": 692, "duplicates": 18, "skipped": 14,
+     "timings": {"parse": 0.9, "io": 0.1}}
+
+Counters and timings depend on the stage. Reads are streamed together
+with parsing, so "parse" includes the read I/O of streamed inputs and "io"
+is the time spent writing outputs. peak_rss_mb is the process's ru_maxrss
+where the resource module exists, and children_peak_rss_mb that of its
+largest finished worker process (chunked extraction, partitioned detection).
+
+--profile cprofile writes a pstats file per stage; --profile sample
+records folded stacks (one "frame;frame;frame count" line per distinct
+stack, the input format of flamegraph.pl and speedscope) from a
+SIGPROF interval timer, at much lower overhead than cProfile.
+"""
+
+import json
+import os
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+METRICS_FILE_ENV = 'PROCESS_SECRETS_METRICS_FILE'
+PROFILE_MODES = ['cprofile', 'sample']
+SAMPLE_INTERVAL = 0.005
+
+
+def peak_rss_mb(children=False):
+    """ru_maxrss of this process, or of its largest waited-for child process."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+class SamplingProfiler:
+    """Counts the Python stacks seen on every SIGPROF tick."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        import signal
+        if not hasattr(signal, 'setitimer'):
+            raise SystemExit("--profile sample needs signal.setitimer (Unix)")
+        self._signal = signal
+        self.interval = interval
+        self.stacks = Counter()
+        self._previous = None
+
+    def _sample(self, signum, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._previous = self._signal.signal(self._signal.SIGPROF, self._sample)
+        self._signal.setitimer(self._signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        self._signal.setitimer(self._signal.ITIMER_PROF, 0, 0)
+        self._signal.signal(self._signal.SIGPROF, self._previous or self._signal.SIG_DFL)
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+
+
+class StageMetrics:
+    """
+    Counters, phase timers and optional profiler of one stage run.
+
+    Use as a context manager; on exit the record is appended to
+    metrics_file (if any) and the profile is written. Without a metrics
+    file or profile it only keeps the numbers, so library callers can
+    always pass one in.
+    """
+
+    def __init__(self, stage, metrics_file=None, profile=None, profile_output=None):
+        self.stage = stage
+        self.metrics_file = metrics_file
+        self.profile = profile
+        self.profile_output = profile_output
+        self.counters = {}
+        self.timings = {}
+        self._profiler = None
+        self._start = None
+        self._started_at = None
+
+    def set(self, **counters):
+        self.counters.update(counters)
+
+    def add_time(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def timed(self, name, function):
+        """Wrap function so the time spent in it is added to timer name."""
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.add_time(name, time.perf_counter() - start)
+        return wrapper
+
+    def __enter__(self):
+        self._started_at = time.strftime('%Y-%m-%dT%H:%M:%S%z')
+        self._start = time.perf_counter()
+        if self.profile == 'cprofile':
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        elif self.profile == 'sample':
+            self._profiler = SamplingProfiler()
+            self._profiler.start()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        wall = time.perf_counter() - self._start
+        if self._profiler is not None:
+            self._stop_profiler()
+        record = self.record(wall, 'ok' if exc_type is None else 'error')
+        if exc_type is not None:
+            record['error'] = f"{exc_type.__name__}: {exc}"
+        if self.metrics_file:
+            with open(self.metrics_file, 'a', encoding='utf-8') as file:
+                file.write(json.dumps(record) + '\n')
+        return False
+
+    def _stop_profiler(self):
+        if self.profile == 'cprofile':
+            self._profiler.disable()
+            path = self.profile_output or f'{self.stage}.prof'
+            self._profiler.dump_stats(path)
+        else:
+            self._profiler.stop()
+            path = self.profile_output or f'{self.stage}.folded'
+            self._profiler.write(path)
+        print(f"Profile of {self.stage} saved to: {path}")
+
+    def record(self, wall_seconds, status='ok'):
+        return {
+            'stage': self.stage,
+            'started_at': self._started_at,
+            'status': status,
+            'wall_seconds': round(wall_seconds, 4),
+            'peak_rss_mb': peak_rss_mb(),
+            'children_peak_rss_mb': peak_rss_mb(children=True),
+            **self.counters,
+            'timings': {name: round(seconds, 4) for name, seconds in self.timings.items()},
+        }
+
+
+def add_metrics_arguments(parser):
+    """--metrics-file, --profile, --profile-output and --quiet, shared by every stage script."""
+    parser.add_argument('--metrics-file', default=os.environ.get(METRICS_FILE_ENV),
+                        help=f"Append a JSON line of stage metrics here (default: ${METRICS_FILE_ENV})")
+    parser.add_argument('--profile', choices=PROFILE_MODES, default=None,
+                        help="Profile the stage with cProfile (.prof) or a sampling profiler "
+                             "(folded stacks)")
+    parser.add_argument('--profile-output', default=None,
+                        help="Profile path (default: <stage>.prof / <stage>.folded)")
+    parser.add_argument('--quiet', action='store_true',
+                        help="Print counts instead of listing every duplicate or sample")
+
+
+def stage_metrics(stage, args):
+    """A StageMetrics configured from add_metrics_arguments options."""
+    return StageMetrics(stage, args.metrics_file, args.profile, args.profile_output)
@@ -0,0 +1,124 @@
+"""
+Multi-pattern search for AWS secret names embedded in DB reference values.
+
+Reference values such as Cloud Manager's reference_token do not equal the
+AWS secret name; the name is somewhere inside them. Checking every name
+against every token is O(names x tokens). Instead:
+
+- UUID names: a regex finds every UUID-shaped substring of a token and each
+  one is looked up in a set (the regex scan runs in C).
+- Other names: an Aho-Corasick automaton over all names scans each token
+  once, in time linear in the token length plus the number of matches,
+  however many names there are.
+
+Names shorter than min_length are not searched for; short names such as
+'api' would match inside almost any token.
+"""
+
+import re
+from collections import deque
+
+from common.sources import UUID_REGEX
+
+DEFAULT_MIN_LENGTH = 8
+
+UUID_SEARCH = re.compile(
+    r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"
+)
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton; patterns are reported by index."""
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        goto = [{}]
+        outputs = [()]
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    outputs.append(())
+                state = next_state
+            outputs[state] += (index,)
+
+        # Breadth-first failure links; outputs absorb those of their failure state
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                link = fail[state]
+                while link and char not in goto[link]:
+                    link = fail[link]
+                target = goto[link].get(char, 0)
+                fail[next_state] = target if target != next_state else 0
+                if outputs[fail[next_state]]:
+                    outputs[next_state] += outputs[fail[next_state]]
+        self._goto = goto
+        self._fail = fail
+        self._outputs = outputs
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def iter_matches(self, text):
+        """Yield (end offset, pattern index) of every occurrence, overlapping ones included."""
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+        root = goto[0]
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0) if state else root.get(char, 0)
+            if outputs[state]:
+                for index in outputs[state]:
+                    yield position + 1, index
+
+    def search(self, text):
+        """Set of the indexes of the patterns occurring in text."""
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+        root = goto[0]
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0) if state else root.get(char, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+
+class EmbeddedNameMatcher:
+    """Finds which of a set of secret names occur inside arbitrary strings."""
+
+    def __init__(self, names, min_length=DEFAULT_MIN_LENGTH):
+        self.uuid_names = set()
+        other_names = set()
+        self.skipped = 0
+        for name in names:
+            if len(name) < min_length:
+                self.skipped += 1
+            elif UUID_REGEX.match(name):
+                self.uuid_names.add(name)
+            else:
+                other_names.add(name)
+        self.automaton = AhoCorasick(sorted(other_names)) if other_names else None
+
+    def match(self, value):
+        """Set of the names embedded in value."""
+        found = {candidate for candidate in UUID_SEARCH.findall(value) if candidate in self.uuid_names}
+        if self.automaton is not None:
+            patterns = self.automaton.patterns
+            found.update(patterns[index] for index in self.automaton.search(value))
+        return found
@@ -0,0 +1,225 @@
+"""
+Out-of-core stale detection by hash partitioning.
+
+The AWS names, every DB folder's key_vault_secrets.csv and the full audit
+CSV are split into N bucket files by crc32(SecretName) % N. A name always
+lands in the same bucket in every input, so the anti-join (AWS minus the
+union of the DB references) can run bucket by bucket in worker processes,
+each holding one bucket in memory. Every bucket writes its stale names and
+stale audit rows sorted by name; heapq.merge then streams them into the
+usual stale_secrets.csv / stale_secrets_detailed.csv.
+"""
+
+import csv
+import heapq
+import math
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from common.audit_store import is_audit_store, store_size
+from common.aws_refs import iter_audit_rows
+from common.aws_secrets import AUDIT_FIELDNAMES
+from common.secret_sets import iter_secret_names
+
+DEFAULT_MEMORY_BUDGET_MB = 512
+# Bytes of Python set / tuple overhead per byte of input text, measured on UUID names
+MEMORY_EXPANSION = 4
+# Every bucket is an open file while partitioning
+MAX_BUCKETS = 512
+
+_NA_ROW = ('N/A',) * 6
+
+
+def bucket_of(name, buckets):
+    return zlib.crc32(name.encode('utf-8')) % buckets
+
+
+def choose_bucket_count(input_paths, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, workers=1):
+    """
+    Smallest bucket count that keeps `workers` buckets in memory within the budget.
+
+    Raises ValueError when that takes more than MAX_BUCKETS buckets, rather
+    than running with fewer, larger buckets that would overrun the budget.
+    """
+    total = sum(store_size(path) if is_audit_store(path) else os.path.getsize(path)
+                for path in input_paths if os.path.exists(path))
+    budget = max(1, memory_budget_mb * 1024 * 1024 // max(1, workers))
+    buckets = math.ceil(total * MEMORY_EXPANSION / budget)
+    if buckets > MAX_BUCKETS:
+        raise ValueError(f"{total / (1024 * 1024):.0f} MB of input needs {buckets} buckets to stay within "
+                         f"{memory_budget_mb} MB with {workers} workers, more than the {MAX_BUCKETS} "
+                         "bucket files partitioning keeps open; raise the memory budget or use fewer workers")
+    return max(1, buckets)
+
+
+class _BucketWriters:
+    """One open text file per bucket."""
+
+    def __init__(self, work_dir, prefix, buckets):
+        self.files = [open(Path(work_dir) / f'{prefix}-{i}', 'w', newline='', encoding='utf-8')
+                      for i in range(buckets)]
+
+    def close(self):
+        for file in self.files:
+            file.close()
+
+
+def partition_names(csv_path, work_dir, prefix, buckets, column='key_vault_secret_name'):
+    """Write the names of a key_vault_secrets.csv into one-name-per-line bucket files."""
+    writers = _BucketWriters(work_dir, prefix, buckets)
+    count = 0
+    try:
+        if os.path.exists(csv_path):
+            for name in iter_secret_names(csv_path, column):
+                writers.files[bucket_of(name, buckets)].write(name + '\n')
+                count += 1
+    finally:
+        writers.close()
+    return count
+
+
+def partition_audit(csv_path, work_dir, buckets, prefix='audit'):
+    """Write the audit rows into bucket CSVs (AUDIT_FIELDNAMES order, no header)."""
+    writers = _BucketWriters(work_dir, prefix, buckets)
+    count = 0
+    try:
+        if csv_path is not None and os.path.exists(csv_path):
+            csv_writers = [csv.writer(file) for file in writers.files]
+            for row in iter_audit_rows(csv_path):
+                if row[0]:
+                    csv_writers[bucket_of(row[0], buckets)].writerow(row)
+                    count += 1
+    finally:
+        writers.close()
+    return count
+
+
+def _read_bucket_names(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        return {line.rstrip('\n') for line in file}
+
+
+def process_bucket(work_dir, bucket, folders, with_audit=True):
+    """
+    Anti-join one bucket and write its sorted stale names (and stale audit rows).
+
+    Returns the bucket's counts; only these small dicts go back to the parent.
+    """
+    work_dir = Path(work_dir)
+    aws = _read_bucket_names(work_dir / f'aws-{bucket}')
+    all_db = set()
+    active_by_folder = {}
+    for folder in folders:
+        db = _read_bucket_names(work_dir / f'{folder}-{bucket}')
+        active_by_folder[folder] = len(aws & db)
+        all_db |= db
+        del db
+
+    stale = aws - all_db
+    stats = {
+        'aws': len(aws),
+        'db': len(all_db),
+        'stale': len(stale),
+        'active': len(aws) - len(stale),
+        'active_by_folder': active_by_folder,
+        'with_audit': 0,
+        'without_audit': 0,
+        'rows': 0,
+    }
+    del aws, all_db
+
+    stale_names = sorted(stale)
+    with open(work_dir / f'stale-{bucket}', 'w', encoding='utf-8') as file:
+        file.writelines(name + '\n' for name in stale_names)
+
+    if with_audit:
+        rows_by_name = {}
+        with open(work_dir / f'audit-{bucket}', 'r', newline='', encoding='utf-8') as file:
+            for row in csv.reader(file):
+                if row[0] in stale:
+                    rows_by_name.setdefault(row[0], []).append(row)
+        with open(work_dir / f'detailed-{bucket}', 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            for name in stale_names:
+                rows = rows_by_name.pop(name, None)
+                if rows:
+                    stats['with_audit'] += 1
+                else:
+                    stats['without_audit'] += 1
+                    rows = [(name,) + _NA_ROW]
+                writer.writerows(rows)
+                stats['rows'] += len(rows)
+    return stats
+
+
+def _iter_lines(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        for line in file:
+            yield line.rstrip('\n')
+
+
+def _iter_rows(path):
+    with open(path, 'r', newline='', encoding='utf-8') as file:
+        yield from csv.reader(file)
+
+
+def merge_outputs(work_dir, buckets, stale_output, detailed_output=None):
+    """k-way merge the sorted bucket results into the final CSVs."""
+    work_dir = Path(work_dir)
+    with open(stale_output, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(['key_vault_secret_name'])
+        for name in heapq.merge(*(_iter_lines(work_dir / f'stale-{i}') for i in range(buckets))):
+            writer.writerow([name])
+
+    if detailed_output is not None:
+        # A name lives in exactly one bucket, so merging on the name keeps its versions in order
+        with open(detailed_output, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(AUDIT_FIELDNAMES)
+            rows = heapq.merge(*(_iter_rows(work_dir / f'detailed-{i}') for i in range(buckets)),
+                               key=lambda row: row[0])
+            writer.writerows(rows)
+
+
+def detect_stale_partitioned(aws_csv_path, db_csv_paths, work_dir, stale_output,
+                             audit_csv_path=None, detailed_output=None, buckets=None,
+                             workers=None, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+    """
+    Partition the inputs into work_dir, anti-join every bucket in a process
+    pool and merge the results. db_csv_paths maps folder name to CSV path.
+
+    Returns (bucket count, totals) where totals sums the per-bucket counts.
+    """
+    workers = workers or os.cpu_count() or 1
+    inputs = [aws_csv_path] + list(db_csv_paths.values())
+    if detailed_output is not None and audit_csv_path is not None:
+        inputs.append(audit_csv_path)
+    buckets = buckets or choose_bucket_count(inputs, memory_budget_mb, workers)
+
+    partition_names(aws_csv_path, work_dir, 'aws', buckets)
+    for folder, path in db_csv_paths.items():
+        partition_names(path, work_dir, folder, buckets)
+    with_audit = detailed_output is not None
+    if with_audit:
+        partition_audit(audit_csv_path, work_dir, buckets)
+
+    folders = list(db_csv_paths)
+    totals = {'aws': 0, 'db': 0, 'stale': 0, 'active': 0, 'with_audit': 0,
+              'without_audit': 0, 'rows': 0, 'active_by_folder': dict.fromkeys(folders, 0)}
+    with ProcessPoolExecutor(max_workers=min(workers, buckets)) as executor:
+        futures = [executor.submit(process_bucket, str(work_dir), i, folders, with_audit)
+                   for i in range(buckets)]
+        for future in futures:
+            stats = future.result()
+            for key, value in stats.items():
+                if key == 'active_by_folder':
+                    for folder, count in value.items():
+                        totals[key][folder] += count
+                else:
+                    totals[key] += value
+
+    merge_outputs(work_dir, buckets, stale_output, detailed_output)
+    return buckets, totals
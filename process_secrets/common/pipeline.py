@@ -0,0 +1,91 @@
+"""Concurrent orchestration of the Phase 1 extractions."""
+
+import multiprocessing
+import time
+from pathlib import Path
+
+from common.aws_refs import read_aws_secret_refs, write_aws_secret_refs
+from common.extraction import extract_references
+from common.sources import SOURCES
+
+AWS_SOURCE = 'aws_key_vault'
+PHASE1_SOURCES = [AWS_SOURCE] + list(SOURCES)
+
+
+def extract_source(name, base_dir, options):
+    """
+    Run one Phase 1 extraction and return (reference set, summary dict).
+
+    options may contain 'aws_input' (audit CSV name), 'dsns' / 'orgs' (per
+    source direct DB mode) and 'write_intermediate' (also write the
+    source's key_vault_secrets.csv).
+    """
+    folder = Path(base_dir) / name
+    write_intermediate = options.get('write_intermediate', False)
+
+    if name == AWS_SOURCE:
+        result = read_aws_secret_refs(folder / options.get('aws_input', 'secrets_full_audit.csv'))
+        if write_intermediate:
+            write_aws_secret_refs(result, folder / 'key_vault_secrets.csv',
+                                  folder / 'non_uuid_secret_names.csv')
+        references = result.references()
+        return references, {
+            'rows': result.total_rows,
+            'skipped': result.skipped_non_current + len(result.invalid_secrets),
+            'references': len(references),
+        }
+
+    spec = SOURCES[name]
+    output_path = folder / spec.output_file if write_intermediate else False
+    dsn = options.get('dsns', {}).get(name)
+    if dsn:
+        from common.db_sources import extract_references_from_db
+        result = extract_references_from_db(name, dsn, options['orgs'][name], output_path)
+    else:
+        result = extract_references(spec, folder / spec.input_file, output_path)
+    return result.references(), {
+        'rows': result.rows_in,
+        'skipped': result.skipped,
+        'references': result.unique,
+        'duplicates': len(result.duplicates()),
+    }
+
+
+def run_extractions(base_dir, sources=None, options=None, timeout=None, timeouts=None,
+                    processes=None):
+    """
+    Run the extractions concurrently in a process pool.
+
+    Each source gets `timeouts[name]` (or `timeout`) seconds from the start of
+    the run. A source that fails or times out is reported in the errors dict
+    and does not affect the others. Returns (references, summaries, errors),
+    each keyed by source name.
+    """
+    sources = sources or PHASE1_SOURCES
+    options = options or {}
+    timeouts = timeouts or {}
+    references, summaries, errors = {}, {}, {}
+
+    pool = multiprocessing.get_context().Pool(processes or len(sources))
+    try:
+        start = time.monotonic()
+        pending = {
+            name: pool.apply_async(extract_source, (name, str(base_dir), options))
+            for name in sources
+        }
+        for name, async_result in pending.items():
+            limit = timeouts.get(name, timeout)
+            remaining = None if limit is None else max(0.0, start + limit - time.monotonic())
+            try:
+                references[name], summaries[name] = async_result.get(remaining)
+                summaries[name]['seconds'] = round(time.monotonic() - start, 3)
+            except multiprocessing.TimeoutError:
+                errors[name] = f"timed out after {limit}s"
+            except Exception as e:
+                errors[name] = f"{type(e).__name__}: {e}"
+    finally:
+        # Kills workers still stuck on a timed-out source
+        pool.terminate()
+        pool.join()
+
+    return references, summaries, errors
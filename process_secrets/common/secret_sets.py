@@ -0,0 +1,439 @@
+"""
+Loading of key_vault_secrets.csv files into secret name sets.
+
+Besides plain Python sets, names can be loaded into a CompactSecretSet:
+canonical (lowercase) UUIDs are stored as sorted 128-bit keys in two
+array('Q') columns (16 bytes per secret instead of 100+ for a str in a set),
+and only the few non-UUID names are kept in a regular set.
+
+With NumPy installed, NumpySecretSet holds the same 128-bit keys in two
+sorted uint64 arrays, decoded from the raw bytes with array operations.
+Difference and intersection select with one boolean mask from a
+searchsorted membership test; union inserts the other set's new keys at
+their searchsorted positions, so sorted inputs are never re-sorted.
+"""
+
+import csv
+import heapq
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+
+from common.columnar import is_columnar, open_table
+
+BACKENDS = ['set', 'compact', 'numpy']
+
+# Only lowercase UUIDs round-trip exactly through the integer encoding
+CANONICAL_UUID_REGEX = re.compile(
+    r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$"
+)
+
+_MASK64 = (1 << 64) - 1
+
+
+def uuid_to_int(name):
+    return int(name.replace('-', ''), 16)
+
+
+def int_to_uuid(key):
+    h = f'{key:032x}'
+    return f'{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}'
+
+
+def _difference(a, b):
+    """Sorted keys of a that are not in b (both sorted, unique)."""
+    b = iter(b)
+    y = next(b, None)
+    for x in a:
+        while y is not None and y < x:
+            y = next(b, None)
+        if y != x:
+            yield x
+
+
+def _intersection(a, b):
+    """Sorted keys present in both a and b (both sorted, unique)."""
+    b = iter(b)
+    y = next(b, None)
+    for x in a:
+        while y is not None and y < x:
+            y = next(b, None)
+        if y is None:
+            return
+        if y == x:
+            yield x
+
+
+def _unique(keys):
+    previous = None
+    for key in keys:
+        if key != previous:
+            yield key
+            previous = key
+
+
+class CompactSecretSet:
+    """Immutable-style set of secret names with UUIDs stored as sorted 128-bit integers."""
+
+    __slots__ = ('_hi', '_lo', '_names')
+
+    def __init__(self, keys=(), names=()):
+        """Build from sorted unique integer keys and non-UUID names."""
+        self._hi = array('Q')
+        self._lo = array('Q')
+        for key in keys:
+            self._hi.append(key >> 64)
+            self._lo.append(key & _MASK64)
+        self._names = set(names)
+
+    @classmethod
+    def from_names(cls, names, run_size=1_000_000):
+        """
+        Build from any iterable of names.
+
+        UUID keys are sorted in runs of run_size and the runs are merged, so
+        no more than one run of Python ints exists at a time.
+        """
+        runs = []
+        run = []
+        others = set()
+        for name in names:
+            if CANONICAL_UUID_REGEX.match(name):
+                run.append(uuid_to_int(name))
+                if len(run) >= run_size:
+                    runs.append(cls(_unique(sorted(run))))
+                    run = []
+            else:
+                others.add(name)
+        if run or not runs:
+            runs.append(cls(_unique(sorted(run))))
+        if len(runs) == 1:
+            runs[0]._names = others
+            return runs[0]
+        return cls(_unique(heapq.merge(*(r._keys() for r in runs))), others)
+
+    @classmethod
+    def coerce(cls, other):
+        return other if isinstance(other, cls) else cls.from_names(other)
+
+    def _keys(self):
+        for hi, lo in zip(self._hi, self._lo):
+            yield (hi << 64) | lo
+
+    def __len__(self):
+        return len(self._hi) + len(self._names)
+
+    def __contains__(self, name):
+        if not CANONICAL_UUID_REGEX.match(name):
+            return name in self._names
+        key = uuid_to_int(name)
+        hi, lo = key >> 64, key & _MASK64
+        start = bisect_left(self._hi, hi)
+        end = bisect_right(self._hi, hi, start)
+        index = bisect_left(self._lo, lo, start, end)
+        return index < end and self._lo[index] == lo
+
+    def __iter__(self):
+        """Names in sorted order (same order as sorted() on the str names)."""
+        uuids = (int_to_uuid(key) for key in self._keys())
+        return heapq.merge(uuids, sorted(self._names))
+
+    def __sub__(self, other):
+        other = self.coerce(other)
+        return CompactSecretSet(_difference(self._keys(), other._keys()),
+                                self._names - other._names)
+
+    def __and__(self, other):
+        other = self.coerce(other)
+        return CompactSecretSet(_intersection(self._keys(), other._keys()),
+                                self._names & other._names)
+
+    def __or__(self, other):
+        other = self.coerce(other)
+        return CompactSecretSet(_unique(heapq.merge(self._keys(), other._keys())),
+                                self._names | other._names)
+
+    def update(self, *others):
+        for other in others:
+            other = self.coerce(other)
+            merged = CompactSecretSet(_unique(heapq.merge(self._keys(), other._keys())))
+            self._hi, self._lo = merged._hi, merged._lo
+            # In place: a copy of a large non-UUID set would double it at the peak
+            self._names.update(other._names)
+
+    def nbytes(self):
+        """Approximate memory used by the UUID keys."""
+        return self._hi.itemsize * len(self._hi) * 2
+
+
+# Columns of the dashes in a canonical UUID and (start, end) of the hex digit groups between them
+_UUID_DASH_COLUMNS = [8, 13, 18, 23]
+_UUID_HEX_GROUPS = [(0, 8), (9, 13), (14, 18), (19, 23), (24, 36)]
+
+
+def _split_uuid_bytes(np, values, others):
+    """
+    (hi, lo) of the canonical UUIDs in a NumPy bytes array, in input order.
+
+    The UUIDs are decoded to their two 64-bit halves with array operations;
+    every other name is added to the others set as UTF-8 bytes.
+    """
+    width = values.dtype.itemsize
+    chars = values.view(np.uint8).reshape(-1, width)
+    # uint8 arithmetic wraps, so anything below '0' or 'a' lands above 9 or 5
+    digits = chars[:, :36] - ord('0')
+    letters = chars[:, :36] - ord('a')
+    is_digit = digits < 10
+    valid = is_digit | (letters < 6)
+    valid[:, _UUID_DASH_COLUMNS] = chars[:, _UUID_DASH_COLUMNS] == ord('-')
+    canonical = valid.all(axis=1)
+    if width > 36:
+        # Fixed-width bytes are NUL padded: a longer name has a byte at 36
+        canonical &= chars[:, 36] == 0
+    # 'a' is 39 past ':', the byte after '9'
+    nibbles = digits - (~is_digit).view(np.uint8) * np.uint8(39)
+    packed = np.empty((len(values), 16), dtype=np.uint8)
+    column = 0
+    for start, end in _UUID_HEX_GROUPS:
+        packed[:, column:column + (end - start) // 2] = (
+            (nibbles[:, start:end:2] << 4) | nibbles[:, start + 1:end:2])
+        column += (end - start) // 2
+    words = packed.view('>u8')
+    hi, lo = words[:, 0].astype(np.uint64), words[:, 1].astype(np.uint64)
+    if canonical.all():
+        return hi, lo
+    others.update(values[~canonical].tolist())
+    return hi[canonical], lo[canonical]
+
+
+def _sort_unique_pairs(np, hi, lo):
+    """Sort (hi, lo) key pairs and drop duplicates; sorted unique input is returned as is."""
+    if hi.size > 1:
+        increasing = (hi[1:] > hi[:-1]) | ((hi[1:] == hi[:-1]) & (lo[1:] > lo[:-1]))
+        if increasing.all():
+            return hi, lo
+    order = np.argsort(hi)
+    hi, lo = hi[order], lo[order]
+    if hi.size > 1 and (hi[1:] == hi[:-1]).any():
+        # Only names sharing their first 16 hex digits need the second key
+        order = np.lexsort((lo, hi))
+        hi, lo = hi[order], lo[order]
+        keep = np.ones(hi.size, dtype=bool)
+        keep[1:] = (hi[1:] != hi[:-1]) | (lo[1:] != lo[:-1])
+        hi, lo = hi[keep], lo[keep]
+    return hi, lo
+
+
+def _pair_positions(np, hi, lo, key_hi, key_lo):
+    """Index where each (key_hi, key_lo) pair would be inserted into the sorted unique pairs."""
+    starts = np.searchsorted(hi, key_hi)
+    if hi.size == 0:
+        return starts
+    found = np.minimum(starts, hi.size - 1)
+    # Right for every key whose hi occurs at most once among the pairs
+    positions = starts + ((hi[found] == key_hi) & (lo[found] < key_lo))
+    if hi.size > 1 and (hi[1:] == hi[:-1]).any():
+        # A key whose hi is shared by several pairs is placed among their lo values
+        ends = np.searchsorted(hi, key_hi, side='right')
+        for i in np.flatnonzero(ends - starts > 1):
+            positions[i] = starts[i] + np.searchsorted(lo[starts[i]:ends[i]], key_lo[i])
+    return positions
+
+
+def _pair_members(np, hi, lo, key_hi, key_lo):
+    """Boolean mask: which (key_hi, key_lo) pairs are among the sorted unique pairs."""
+    if hi.size == 0:
+        return np.zeros(key_hi.size, dtype=bool)
+    positions = _pair_positions(np, hi, lo, key_hi, key_lo)
+    found = np.minimum(positions, hi.size - 1)
+    return (positions < hi.size) & (hi[found] == key_hi) & (lo[found] == key_lo)
+
+
+class NumpySecretSet:
+    """
+    Set of secret names with canonical UUIDs stored as sorted pairs of uint64 arrays.
+
+    The other names are kept as UTF-8 bytes and only decoded when iterating.
+    """
+
+    __slots__ = ('_hi', '_lo', '_names')
+
+    def __init__(self, hi=None, lo=None, names=()):
+        """Wrap sorted unique uint64 key columns and the non-UUID names (UTF-8 bytes)."""
+        np = _numpy()
+        self._hi = hi if hi is not None else np.empty(0, np.uint64)
+        self._lo = lo if lo is not None else np.empty(0, np.uint64)
+        self._names = set(names)
+
+    @classmethod
+    def _from_byte_chunks(cls, chunks):
+        """Build from lists of UTF-8 encoded names."""
+        np = _numpy()
+        his, los = [], []
+        names = set()
+        for chunk in chunks:
+            if max(map(len, chunk), default=0) < 36:
+                # No name is long enough to be a UUID
+                names.update(chunk)
+                continue
+            hi, lo = _split_uuid_bytes(np, np.array(chunk, dtype=bytes), names)
+            his.append(hi)
+            los.append(lo)
+        result = cls()
+        result._names = names
+        if his:
+            result._hi, result._lo = _sort_unique_pairs(np, np.concatenate(his), np.concatenate(los))
+        return result
+
+    @classmethod
+    def from_names(cls, names, chunk_size=1_000_000):
+        """Build from an iterable of str names, converting chunk_size names at a time."""
+        def chunks():
+            chunk = []
+            for name in names:
+                chunk.append(name.encode('utf-8'))
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+        return cls._from_byte_chunks(chunks())
+
+    @classmethod
+    def from_bytes_lines(cls, lines, chunk_size=1_000_000):
+        """Build from a list of raw UTF-8 encoded names."""
+        return cls._from_byte_chunks(lines[start:start + chunk_size]
+                                     for start in range(0, len(lines), chunk_size))
+
+    @classmethod
+    def coerce(cls, other):
+        return other if isinstance(other, cls) else cls.from_names(other)
+
+    def __len__(self):
+        return int(self._hi.size) + len(self._names)
+
+    def __contains__(self, name):
+        if not CANONICAL_UUID_REGEX.match(name):
+            return name.encode('utf-8') in self._names
+        np = _numpy()
+        key = uuid_to_int(name)
+        start = int(np.searchsorted(self._hi, np.uint64(key >> 64)))
+        end = int(np.searchsorted(self._hi, np.uint64(key >> 64), side='right'))
+        index = start + int(np.searchsorted(self._lo[start:end], np.uint64(key & _MASK64)))
+        return index < end and int(self._lo[index]) == key & _MASK64
+
+    def __iter__(self):
+        """Names in sorted order (same order as sorted() on the str names)."""
+        uuids = (int_to_uuid((hi << 64) | lo) for hi, lo in zip(self._hi.tolist(), self._lo.tolist()))
+        # UTF-8 byte order equals str code point order
+        return heapq.merge(uuids, (name.decode('utf-8') for name in sorted(self._names)))
+
+    def _members_of(self, other):
+        """Mask over self's UUID keys: which are also in other."""
+        return _pair_members(_numpy(), other._hi, other._lo, self._hi, self._lo)
+
+    def _merged_keys(self, other):
+        """Sorted unique key columns of self | other, inserting other's new keys in place."""
+        np = _numpy()
+        new = ~other._members_of(self)
+        new_hi, new_lo = other._hi[new], other._lo[new]
+        positions = _pair_positions(np, self._hi, self._lo, new_hi, new_lo)
+        return np.insert(self._hi, positions, new_hi), np.insert(self._lo, positions, new_lo)
+
+    def __sub__(self, other):
+        other = self.coerce(other)
+        kept = ~self._members_of(other)
+        return NumpySecretSet(self._hi[kept], self._lo[kept], self._names - other._names)
+
+    def __and__(self, other):
+        other = self.coerce(other)
+        kept = self._members_of(other)
+        return NumpySecretSet(self._hi[kept], self._lo[kept], self._names & other._names)
+
+    def __or__(self, other):
+        other = self.coerce(other)
+        return NumpySecretSet(*self._merged_keys(other), self._names | other._names)
+
+    def update(self, *others):
+        for other in others:
+            other = self.coerce(other)
+            self._hi, self._lo = self._merged_keys(other)
+            self._names.update(other._names)
+
+    def nbytes(self):
+        """Approximate memory used by the UUID keys."""
+        return int(self._hi.nbytes + self._lo.nbytes)
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise SystemExit("The numpy backend requires NumPy: pip install numpy")
+    return numpy
+
+
+def empty_secret_set(backend='set'):
+    if backend == 'compact':
+        return CompactSecretSet()
+    if backend == 'numpy':
+        return NumpySecretSet()
+    return set()
+
+
+def _read_name_column_bytes(csv_path):
+    """
+    Fast path for single-column key_vault_secrets.csv files: the raw names as bytes.
+
+    Returns None when the file needs the csv module (extra columns or quoting)
+    or holds non-ASCII bytes, which str.strip() may treat as whitespace.
+    """
+    if is_columnar(csv_path):
+        return None
+    with open(csv_path, 'rb') as file:
+        data = file.read()
+    lines = data.splitlines()
+    if (not lines or lines[0].strip() != b'key_vault_secret_name' or b'"' in data
+            or not data.isascii()):
+        return None
+    return [line for line in map(bytes.strip, lines[1:]) if line]
+
+
+def iter_secret_names(csv_path, column='key_vault_secret_name'):
+    """Yield the non-empty names of a key_vault_secrets.csv (or .scol) column."""
+    if is_columnar(csv_path):
+        with open_table(csv_path) as table:
+            for secret_name in table.column(column):
+                secret_name = secret_name.strip()
+                if secret_name:
+                    yield secret_name
+        return
+    with open(csv_path, 'r', encoding='utf-8') as file:
+        reader = csv.DictReader(file)
+        for row in reader:
+            secret_name = (row.get(column) or '').strip()
+            if secret_name:
+                yield secret_name
+
+
+def read_secrets_from_csv(csv_path, backend='set'):
+    """Read secret names from a CSV (or .scol) file and return as a set (or CompactSecretSet)."""
+    secrets = empty_secret_set(backend)
+    try:
+        if backend == 'compact':
+            secrets = CompactSecretSet.from_names(iter_secret_names(csv_path))
+        elif backend == 'numpy':
+            names = _read_name_column_bytes(csv_path)
+            if names is not None:
+                secrets = NumpySecretSet.from_bytes_lines(names)
+            else:
+                secrets = NumpySecretSet.from_names(iter_secret_names(csv_path))
+        else:
+            secrets = set(iter_secret_names(csv_path))
+        print(f"Loaded {len(secrets)} secrets from {csv_path}")
+    except FileNotFoundError:
+        print(f"Warning: File not found - {csv_path}")
+    except Exception as e:
+        print(f"Error reading {csv_path}: {e}")
+    return secrets
@@ -0,0 +1,252 @@
+"""
+Run-by-run history of the inventory, reference sets and stale set.
+
+A SQLite database stores every recorded run as deltas against the previous
+one:
+
+    runs       one row per run (time, label, set sizes)
+    names      every secret name ever seen, stored once (name -> id)
+    sets       one row per tracked set: ('inventory', ''), ('stale', '')
+               and ('refs', SOURCE) for every DB folder
+    intervals  (set, name, first run, last run) membership spans
+
+A name that enters a set opens an interval and leaving closes it (last_run
+is the last run it was a member of; NULL while it still is). A run with no
+changes adds just its runs row, so the database grows with the number of
+changes, not with the inventory size times the number of runs.
+
+Between two runs A < B, only the intervals that start or end in between
+can differ. A name whose membership spans both runs has a single interval
+covering [A, B]. The diff therefore reads just the changed rows through
+the (set, first_run) and (set, last_run) indexes.
+"""
+
+import json
+import sqlite3
+import time
+
+INVENTORY = 'inventory'
+STALE = 'stale'
+REFS = 'refs'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    recorded_at TEXT NOT NULL,
+    label TEXT NOT NULL DEFAULT '',
+    counts TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS names (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS sets (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    source TEXT NOT NULL DEFAULT '',
+    UNIQUE (kind, source)
+);
+CREATE TABLE IF NOT EXISTS intervals (
+    set_id INTEGER NOT NULL,
+    name_id INTEGER NOT NULL,
+    first_run INTEGER NOT NULL,
+    last_run INTEGER
+);
+CREATE INDEX IF NOT EXISTS intervals_open ON intervals (set_id, last_run, name_id);
+CREATE INDEX IF NOT EXISTS intervals_first ON intervals (set_id, first_run);
+"""
+
+
+class Snapshot:
+    """The sets of one run: the inventory, {source: references} and the stale set."""
+
+    def __init__(self, inventory, references, stale):
+        self.inventory = set(inventory)
+        self.references = {source: set(names) for source, names in references.items()}
+        self.stale = set(stale)
+
+    def sets(self):
+        yield (INVENTORY, ''), self.inventory
+        yield (STALE, ''), self.stale
+        for source, names in self.references.items():
+            yield (REFS, source), names
+
+
+class RunDiff:
+    """What changed between two recorded runs."""
+
+    def __init__(self, from_run, to_run):
+        self.from_run = from_run
+        self.to_run = to_run
+        # Stale in to_run and not in from_run
+        self.newly_stale = []
+        # Stale in from_run, still inventoried and no longer stale (referenced again)
+        self.resurrected = []
+        # Inventoried in from_run, gone from the inventory in to_run
+        self.deleted = []
+        # Inventoried in to_run only
+        self.added = []
+        # {source: names}: references in to_run that from_run did not have, and the reverse
+        self.new_references = {}
+        self.removed_references = {}
+
+    def rows(self):
+        """(change, source, name) rows for a CSV report."""
+        for change in ('newly_stale', 'resurrected', 'deleted', 'added'):
+            for name in getattr(self, change):
+                yield change, '', name
+        for change in ('new_references', 'removed_references'):
+            for source, names in sorted(getattr(self, change).items()):
+                for name in names:
+                    yield change, source, name
+
+
+class SnapshotHistory:
+    """Delta-encoded snapshots of every recorded run."""
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(_SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def runs(self):
+        """[(run id, recorded at, label, counts)], oldest first."""
+        return [(run_id, recorded_at, label, json.loads(counts)) for run_id, recorded_at, label, counts
+                in self.connection.execute('SELECT id, recorded_at, label, counts FROM runs ORDER BY id')]
+
+    def latest_runs(self, count=2):
+        ids = [run_id for (run_id,) in
+               self.connection.execute('SELECT id FROM runs ORDER BY id DESC LIMIT ?', (count,))]
+        return ids[::-1]
+
+    def _set_id(self, kind, source=''):
+        db = self.connection
+        row = db.execute('SELECT id FROM sets WHERE kind = ? AND source = ?', (kind, source)).fetchone()
+        if row is not None:
+            return row[0]
+        return db.execute('INSERT INTO sets (kind, source) VALUES (?, ?)', (kind, source)).lastrowid
+
+    def _name_ids(self, names):
+        """{name: id}, adding the names not seen before."""
+        db = self.connection
+        db.execute('CREATE TEMP TABLE IF NOT EXISTS incoming (name TEXT PRIMARY KEY)')
+        db.execute('DELETE FROM incoming')
+        db.executemany('INSERT OR IGNORE INTO incoming (name) VALUES (?)', ((name,) for name in names))
+        db.execute('INSERT OR IGNORE INTO names (name) SELECT name FROM incoming')
+        return dict(db.execute('SELECT names.name, names.id FROM incoming JOIN names USING (name)'))
+
+    def _open_members(self, set_id):
+        return {name_id for (name_id,) in self.connection.execute(
+            'SELECT name_id FROM intervals WHERE set_id = ? AND last_run IS NULL', (set_id,))}
+
+    def record(self, snapshot, label=''):
+        """Append a run; returns (run id, {set key: (added, removed)})."""
+        changes = {}
+        with self.connection:
+            db = self.connection
+            previous = db.execute('SELECT MAX(id) FROM runs').fetchone()[0]
+            counts = {'inventory': len(snapshot.inventory), 'stale': len(snapshot.stale),
+                      **{source: len(names) for source, names in snapshot.references.items()}}
+            run_id = db.execute(
+                'INSERT INTO runs (recorded_at, label, counts) VALUES (?, ?, ?)',
+                (time.strftime('%Y-%m-%dT%H:%M:%S%z'), label, json.dumps(counts)),
+            ).lastrowid
+
+            tracked = dict(snapshot.sets())
+            # Sets recorded before but missing from this snapshot are not closed:
+            # a source left out of a run keeps its last known references
+            name_ids = self._name_ids(set().union(*tracked.values()))
+            for (kind, source), names in tracked.items():
+                set_id = self._set_id(kind, source)
+                current = {name_ids[name] for name in names}
+                stored = self._open_members(set_id)
+                added = current - stored
+                removed = stored - current
+                db.executemany('INSERT INTO intervals (set_id, name_id, first_run) VALUES (?, ?, ?)',
+                               ((set_id, name_id, run_id) for name_id in added))
+                db.executemany('UPDATE intervals SET last_run = ? '
+                               'WHERE set_id = ? AND name_id = ? AND last_run IS NULL',
+                               ((previous, set_id, name_id) for name_id in removed))
+                changes[(kind, source)] = (len(added), len(removed))
+        return run_id, changes
+
+    def _changed(self, set_id, from_run, to_run):
+        """(names that joined, names that left) the set between the two runs."""
+        rows = self.connection.execute(
+            'SELECT name_id, first_run, last_run FROM intervals WHERE set_id = ? '
+            'AND ((first_run > ? AND first_run <= ?) OR (last_run >= ? AND last_run < ?))',
+            (set_id, from_run, to_run, from_run, to_run),
+        )
+        before = set()
+        after = set()
+        for name_id, first_run, last_run in rows:
+            if first_run <= from_run and (last_run is None or last_run >= from_run):
+                before.add(name_id)
+            if first_run <= to_run and (last_run is None or last_run >= to_run):
+                after.add(name_id)
+        return after - before, before - after
+
+    def _chunks(self, name_ids, size=500):
+        ids = list(name_ids)
+        for start in range(0, len(ids), size):
+            chunk = ids[start:start + size]
+            yield chunk, ','.join('?' * len(chunk))
+
+    def _member_at(self, set_id, name_ids, run):
+        members = set()
+        for chunk, placeholders in self._chunks(name_ids):
+            members.update(name_id for (name_id,) in self.connection.execute(
+                f'SELECT name_id FROM intervals WHERE set_id = ? AND name_id IN ({placeholders}) '
+                'AND first_run <= ? AND (last_run IS NULL OR last_run >= ?)',
+                (set_id, *chunk, run, run)))
+        return members
+
+    def _names(self, name_ids):
+        names = []
+        for chunk, placeholders in self._chunks(name_ids):
+            names += [name for (name,) in self.connection.execute(
+                f'SELECT name FROM names WHERE id IN ({placeholders})', chunk)]
+        return sorted(names)
+
+    def diff(self, from_run, to_run):
+        """RunDiff between two run ids (from_run must be the earlier one)."""
+        if from_run > to_run:
+            raise ValueError(f"run {from_run} is after run {to_run}")
+        known = {run_id for run_id, in self.connection.execute(
+            'SELECT id FROM runs WHERE id IN (?, ?)', (from_run, to_run))}
+        missing = {from_run, to_run} - known
+        if missing:
+            raise ValueError(f"unknown run: {', '.join(map(str, sorted(missing)))}")
+
+        result = RunDiff(from_run, to_run)
+        sets = {(kind, source): set_id for set_id, kind, source in
+                self.connection.execute('SELECT id, kind, source FROM sets')}
+        if (INVENTORY, '') not in sets:
+            return result
+        joined_inventory, left_inventory = self._changed(sets[(INVENTORY, '')], from_run, to_run)
+        joined_stale, left_stale = self._changed(sets[(STALE, '')], from_run, to_run)
+        # Resurrected: left the stale set but still in the inventory
+        still_inventoried = self._member_at(sets[(INVENTORY, '')], left_stale - left_inventory, to_run)
+        result.newly_stale = self._names(joined_stale)
+        result.resurrected = self._names(still_inventoried)
+        result.deleted = self._names(left_inventory)
+        result.added = self._names(joined_inventory)
+        for (kind, source), set_id in sorted(sets.items()):
+            if kind != REFS:
+                continue
+            joined, left = self._changed(set_id, from_run, to_run)
+            if joined:
+                result.new_references[source] = self._names(joined)
+            if left:
+                result.removed_references[source] = self._names(left)
+        return result
+
+
+def open_snapshot_history(path):
+    return SnapshotHistory(str(path))
@@ -0,0 +1,50 @@
+"""Declarative specs of the Choreo DB dumps the extractors read."""
+
+import re
+
+from common.extraction import SourceSpec
+
+# Strict UUID regex
+UUID_REGEX = re.compile(
+    r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"
+)
+
+SOURCES = {
+    # secret_uuid is the 3rd column
+    'choreo_app_db': SourceSpec(
+        name='choreo_app_db',
+        input_file='38516-3.log',
+        header_prefix='organization_handle',
+        column=2,
+        value_label='secret_uuids',
+    ),
+    # secret_name is the 2nd column
+    'choreo_cloud_manager_db': SourceSpec(
+        name='choreo_cloud_manager_db',
+        input_file='38516-4.log',
+        header_prefix='source_table',
+        column=1,
+        value_label='secret_name values',
+    ),
+    # value_ref is the only column
+    'choreo_configuration_service_db': SourceSpec(
+        name='choreo_configuration_service_db',
+        input_file='38516-6.log',
+        header_prefix='value_ref',
+        column=None,
+        value_label='value_ref entries',
+    ),
+    # If the vault_id column is empty, the first token won't be a UUID
+    'choreo_rudder_db': SourceSpec(
+        name='choreo_rudder_db',
+        input_file='38516-8.log',
+        header_prefix='vault_id',
+        column=0,
+        validator=UUID_REGEX,
+        value_label='vault_id values',
+        strip_leading=False,
+    ),
+}
+
+# DB folders compared against AWS Key Vault, in reporting order
+DB_FOLDERS = list(SOURCES)
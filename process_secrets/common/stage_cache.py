@@ -0,0 +1,111 @@
+"""
+Content-hash cache of pipeline stage results.
+
+A stage's fingerprint is the sha256 of its parameters, the contents of its
+input files (including the code that implements it) and the digests of its
+upstream stages' outputs. manifest.json in the cache directory records, per
+stage, the fingerprint of its last successful run and the digests of the
+files it wrote. A stage is skipped when its fingerprint matches and its
+outputs are still on disk unchanged. Because downstream stages hash
+upstream *outputs*, a stage that re-runs but produces the same output does
+not invalidate the stages after it.
+
+File digests are memoized by (size, mtime_ns), so unchanged multi-GB dumps
+are not re-read on every run.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+MANIFEST = 'manifest.json'
+_CHUNK = 1024 * 1024
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class StageCache:
+    """Fingerprints and the manifest of the last successful stage runs."""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.cache_dir / MANIFEST
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as file:
+                self.manifest = json.load(file)
+        except (FileNotFoundError, ValueError):
+            self.manifest = {}
+        self.manifest.setdefault('stages', {})
+        self.manifest.setdefault('files', {})
+
+    def file_digest(self, path):
+        """sha256 of a file's contents, or None if it does not exist."""
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        if os.path.isdir(path):
+            # A directory input (e.g. a normalized audit store) hashes its files
+            digest = hashlib.sha256()
+            for name in sorted(os.listdir(path)):
+                digest.update(f"{name}:{self.file_digest(os.path.join(path, name))}\n".encode('utf-8'))
+            return digest.hexdigest()
+        entry = self.manifest['files'].get(path)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['sha256']
+        digest = _hash_file(path)
+        self.manifest['files'][path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest}
+        return digest
+
+    def fingerprint(self, params, inputs=(), upstream=()):
+        """Fingerprint of a stage from its params (JSON-able), input files and upstream stages."""
+        payload = {
+            'params': params,
+            'inputs': {str(path): self.file_digest(path) for path in inputs},
+            'upstream': {name: self.output_digest(name) for name in upstream},
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def output_digest(self, stage):
+        """Digest of the outputs a stage last recorded (None if it never succeeded)."""
+        entry = self.manifest['stages'].get(stage)
+        if entry is None:
+            return None
+        return hashlib.sha256(json.dumps(entry['outputs'], sort_keys=True).encode('utf-8')).hexdigest()
+
+    def is_fresh(self, stage, fingerprint):
+        entry = self.manifest['stages'].get(stage)
+        if fingerprint is None or entry is None or entry['fingerprint'] != fingerprint:
+            return False
+        return all(self.file_digest(path) == digest for path, digest in entry['outputs'].items())
+
+    def record(self, stage, fingerprint, outputs):
+        """
+        Remember a successful run. A stage recorded with a None fingerprint
+        (e.g. a live DB query) always re-runs, but its output digests still
+        let unchanged results keep the downstream stages cached.
+        """
+        self.manifest['stages'][stage] = {
+            'fingerprint': fingerprint,
+            'outputs': {os.path.abspath(path): self.file_digest(path) for path in outputs},
+        }
+        self.save()
+
+    def forget(self, stage):
+        if self.manifest['stages'].pop(stage, None) is not None:
+            self.save()
+
+    def save(self):
+        tmp_path = f'{self.manifest_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.manifest, file, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
@@ -0,0 +1,392 @@
+"""
+Date orderings of stale_secrets_detailed.csv.
+
+Every date column is parsed once into integer keys (microseconds of the
+wall-clock time with any UTC offset dropped, not applied), and each
+ordering is a permutation of row numbers built from those keys. The
+orderings can be written as full CSV copies or, in index-view mode, as
+compact binary row-order files next to a byte-offset index of the base CSV.
+
+A stale_secrets_detailed.scol input is memory-mapped instead of parsed;
+write_detailed_table() stores the date keys next to the string columns so
+sorting it parses no dates at all.
+
+For inputs larger than memory, ExternalSort sorts runs that fit a
+memory budget, spills them to temporary files together with their keys and
+k-way merges them with heapq.merge, which keeps equal keys in run order so
+the result matches the in-memory stable sort.
+"""
+
+import csv
+import heapq
+import io
+import json
+import os
+import tempfile
+from array import array
+from datetime import datetime
+from pathlib import Path
+
+from common.columnar import INT64, STR, TableWriter, is_columnar, open_table
+
+SORT_FIELDNAMES = ['SecretName', 'LastAccessedDate', 'LastChangedDate',
+                   'Tags', 'VersionId', 'VersionStages', 'VersionCreatedDate']
+
+SORT_CONFIGS = [
+    {
+        'field': 'LastAccessedDate',
+        'output_file': 'stale_secrets_by_last_accessed.csv',
+        'index_file': 'stale_secrets_by_last_accessed.idx',
+        'description': 'Last Accessed Date'
+    },
+    {
+        'field': 'LastChangedDate',
+        'output_file': 'stale_secrets_by_last_changed.csv',
+        'index_file': 'stale_secrets_by_last_changed.idx',
+        'description': 'Last Changed Date'
+    },
+    {
+        'field': 'VersionCreatedDate',
+        'output_file': 'stale_secrets_by_version_created.csv',
+        'index_file': 'stale_secrets_by_version_created.idx',
+        'description': 'Version Created Date'
+    }
+]
+
+DEFAULT_MEMORY_BUDGET_MB = 256
+# Rough size of one row tuple and its strings, on top of the characters
+ROW_OVERHEAD_BYTES = 500
+# Runs merged at once; more runs are merged in several passes
+MERGE_FAN_IN = 64
+
+# Name of the precomputed int64 key column of a date field in .scol files
+KEY_SUFFIX = '.key'
+
+INDEX_MANIFEST = 'stale_secrets_index.json'
+OFFSETS_SUFFIX = '.offsets'
+
+_EPOCH = datetime(1, 1, 1)
+_MISSING = {'NEVER', 'N/A', ''}
+
+
+def datetime_key(dt):
+    """Integer that orders like the naive datetime dt."""
+    delta = dt - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+# 'Never', 'N/A' and unparsable dates sort as 1900-01-01, i.e. at the bottom
+MISSING_DATE_KEY = datetime_key(datetime(1900, 1, 1))
+
+
+def date_key(date_str):
+    """Integer sort key of an ISO date string; 'Never', 'N/A' and bad values sort last."""
+    if not date_str or date_str.strip().upper() in _MISSING:
+        return MISSING_DATE_KEY
+    try:
+        dt = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+    except Exception:
+        return MISSING_DATE_KEY
+    # Offsets are dropped, not applied: dates compare by their wall-clock time
+    return datetime_key(dt.replace(tzinfo=None))
+
+
+class SortColumns:
+    """Rows in SORT_FIELDNAMES order plus one int64 key column per date field."""
+
+    def __init__(self, fields):
+        self.rows = []
+        # Start of every row in the base file, then its end (index-view mode only)
+        self.offsets = array('Q')
+        self.keys = {field: array('q') for field in fields}
+        # The mapped .scol table the rows and keys are read from, if any
+        self.table = None
+        self._key_columns = [(SORT_FIELDNAMES.index(field), self.keys[field]) for field in fields]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def append(self, row):
+        self.rows.append(row)
+        for index, column in self._key_columns:
+            column.append(date_key(row[index]))
+
+    def order(self, field, top=None):
+        """
+        Row numbers by descending date; ties keep file order like sorted(reverse=True).
+
+        With top, only the first `top` row numbers are computed (with a heap).
+        """
+        keys = self.keys[field]
+        if top is not None:
+            return heapq.nlargest(top, range(len(keys)), key=keys.__getitem__)
+        return sorted(range(len(keys)), key=keys.__getitem__, reverse=True)
+
+
+class _TableRows:
+    """Rows of a mapped .scol table as SORT_FIELDNAMES tuples, decoded on access."""
+
+    def __init__(self, table):
+        self._columns = [table.column(name) if name in table else None for name in SORT_FIELDNAMES]
+        self._rows = table.num_rows
+
+    def __len__(self):
+        return self._rows
+
+    def __getitem__(self, index):
+        return tuple(column[index] if column is not None else '' for column in self._columns)
+
+
+class DetailedTableWriter(TableWriter):
+    """TableWriter of detailed rows (SORT_FIELDNAMES tuples) that adds a key column per date field."""
+
+    def __init__(self, output_path):
+        self._key_indexes = [SORT_FIELDNAMES.index(config['field']) for config in SORT_CONFIGS]
+        columns = ([(name, STR) for name in SORT_FIELDNAMES]
+                   + [(config['field'] + KEY_SUFFIX, INT64) for config in SORT_CONFIGS])
+        super().__init__(output_path, columns, {'kind': 'stale_secrets_detailed'})
+
+    def append(self, row):
+        super().append(tuple(row) + tuple(date_key(row[index]) for index in self._key_indexes))
+
+
+def write_detailed_table(output_path, rows):
+    """Write detailed rows (an iterable of SORT_FIELDNAMES tuples) as .scol, streaming them."""
+    with DetailedTableWriter(output_path) as table:
+        table.extend(rows)
+
+
+def _read_table_columns(input_path, fields):
+    """SortColumns over a mapped table; stored key columns are used as they are."""
+    table = open_table(input_path)
+    columns = SortColumns([])
+    columns.table = table
+    columns.rows = _TableRows(table)
+    for field in fields:
+        if field + KEY_SUFFIX in table:
+            columns.keys[field] = table.column(field + KEY_SUFFIX)
+        else:
+            index = SORT_FIELDNAMES.index(field)
+            columns.keys[field] = array('q', (date_key(row[index]) for row in table.iter_rows(SORT_FIELDNAMES)))
+    return columns
+
+
+def _iter_lines_with_offsets(file, positions):
+    """Decode a binary file line by line, recording the offset after each line."""
+    position = file.tell()
+    for line in file:
+        position += len(line)
+        positions.append(position)
+        yield line.decode('utf-8')
+
+
+def read_sort_columns(input_path, fields=None, with_offsets=False):
+    """
+    Read the detailed CSV once into SortColumns.
+
+    Values are normalized to SORT_FIELDNAMES (missing columns are ''). With
+    with_offsets the byte offset of every row is kept for index-view mode.
+    A .scol input is mapped rather than read.
+    """
+    fields = fields or [config['field'] for config in SORT_CONFIGS]
+    if is_columnar(input_path):
+        # Row numbers address a table directly, no byte offsets are needed
+        return _read_table_columns(input_path, fields)
+    columns = SortColumns(fields)
+    if with_offsets:
+        file = open(input_path, 'rb')
+        positions = [0]
+        lines = _iter_lines_with_offsets(file, positions)
+    else:
+        file = open(input_path, 'r', newline='', encoding='utf-8')
+        lines = file
+    with file:
+        reader = csv.reader(lines)
+        header = next(reader, [])
+        indexes = [header.index(name) if name in header else None for name in SORT_FIELDNAMES]
+        row_start = positions[-1] if with_offsets else 0
+        for row in reader:
+            if with_offsets:
+                # A row may span several lines (quoted newlines): it ends at the last line read
+                columns.offsets.append(row_start)
+                row_start = positions[-1]
+            columns.append(tuple(row[i] if i is not None and i < len(row) else ''
+                                 for i in indexes))
+        if with_offsets:
+            columns.offsets.append(row_start)
+    return columns
+
+
+def write_sorted_csv(columns, order, output_path):
+    rows = columns.rows
+    with open(output_path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(SORT_FIELDNAMES)
+        writer.writerows(rows[i] for i in order)
+
+
+def write_index_view(columns, orders, input_path, output_dir, top=None):
+    """
+    Write <input>.offsets (byte offset of every base row), one .idx file of
+    uint32 row numbers per ordering and a JSON manifest tying them together.
+    """
+    output_dir = Path(output_dir)
+    offsets_path = None
+    if not is_columnar(input_path):
+        offsets_path = output_dir / (Path(input_path).name + OFFSETS_SUFFIX)
+        with open(offsets_path, 'wb') as file:
+            columns.offsets.tofile(file)
+
+    manifest = {
+        'base': os.path.abspath(input_path),
+        'base_size': os.path.getsize(input_path),
+        'rows': len(columns),
+        'offsets': offsets_path.name if offsets_path else None,
+        'top': top,
+        'orderings': {},
+    }
+    for config in SORT_CONFIGS:
+        field = config['field']
+        if field not in orders:
+            continue
+        index = array('I', orders[field])
+        with open(output_dir / config['index_file'], 'wb') as file:
+            index.tofile(file)
+        manifest['orderings'][field] = config['index_file']
+
+    manifest_path = output_dir / INDEX_MANIFEST
+    with open(manifest_path, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=2)
+    return manifest_path
+
+
+def _read_array(path, typecode):
+    values = array(typecode)
+    with open(path, 'rb') as file:
+        values.frombytes(file.read())
+    return values
+
+
+def iter_index_view(manifest_path, field):
+    """Yield the base CSV rows, as dicts keyed by its header, in the stored order of field."""
+    manifest_path = Path(manifest_path)
+    with open(manifest_path, encoding='utf-8') as file:
+        manifest = json.load(file)
+    if os.path.getsize(manifest['base']) != manifest['base_size']:
+        raise ValueError(f"{manifest['base']} changed since the index was written")
+
+    order = _read_array(manifest_path.parent / manifest['orderings'][field], 'I')
+    if manifest['offsets'] is None:
+        with open_table(manifest['base']) as table:
+            rows = _TableRows(table)
+            for row_number in order:
+                yield dict(zip(SORT_FIELDNAMES, rows[row_number]))
+        return
+
+    offsets = _read_array(manifest_path.parent / manifest['offsets'], 'Q')
+    with open(manifest['base'], 'rb') as base:
+        header = next(csv.reader([base.readline().decode('utf-8')]))
+        for row_number in order:
+            start, end = offsets[row_number], offsets[row_number + 1]
+            base.seek(start)
+            data = base.read(end - start).decode('utf-8')
+            row = next(csv.reader(io.StringIO(data, newline='')))
+            yield dict(zip(header, row))
+
+
+def iter_normalized_rows(input_path):
+    """Stream the detailed CSV (or .scol) as tuples in SORT_FIELDNAMES order."""
+    if is_columnar(input_path):
+        with open_table(input_path) as table:
+            yield from table.iter_rows(SORT_FIELDNAMES)
+        return
+    with open(input_path, 'r', newline='', encoding='utf-8') as file:
+        reader = csv.reader(file)
+        header = next(reader, [])
+        indexes = [header.index(name) if name in header else None for name in SORT_FIELDNAMES]
+        for row in reader:
+            yield tuple(row[i] if i is not None and i < len(row) else '' for i in indexes)
+
+
+def _write_run(path, keyed_rows):
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        for key, row in keyed_rows:
+            writer.writerow((key,) + row)
+
+
+def _iter_run(path):
+    with open(path, 'r', newline='', encoding='utf-8') as file:
+        for record in csv.reader(file):
+            yield int(record[0]), tuple(record[1:])
+
+
+def _merge_runs(paths):
+    """Descending merge; on equal keys earlier runs (earlier rows) come first."""
+    return heapq.merge(*(_iter_run(path) for path in paths),
+                       key=lambda keyed_row: keyed_row[0], reverse=True)
+
+
+class ExternalSort:
+    """
+    Sort the detailed CSV by every field in fields without holding it in memory.
+
+    Used as a context manager that returns (row count, {field: iterator of
+    rows in descending date order}); the iterators read the spilled runs, so
+    they must be consumed inside the with block.
+    """
+
+    def __init__(self, input_path, fields, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB,
+                 temp_dir=None):
+        self.input_path = input_path
+        self.fields = fields
+        self.budget = memory_budget_mb * 1024 * 1024
+        self.temp_dir = temp_dir
+        self.runs = {field: [] for field in fields}
+
+    def __enter__(self):
+        self._tmp = tempfile.TemporaryDirectory(prefix='stale_sort_', dir=self.temp_dir)
+        work_dir = Path(self._tmp.name)
+        key_indexes = [(field, SORT_FIELDNAMES.index(field)) for field in self.fields]
+
+        count = 0
+        run = []
+        run_bytes = 0
+        for row in iter_normalized_rows(self.input_path):
+            count += 1
+            run.append(row)
+            run_bytes += sum(map(len, row)) + ROW_OVERHEAD_BYTES
+            if run_bytes >= self.budget:
+                self._spill(work_dir, run, key_indexes)
+                run = []
+                run_bytes = 0
+        if run or not count:
+            self._spill(work_dir, run, key_indexes)
+
+        ordered = {}
+        for field in self.fields:
+            runs = self.runs[field]
+            # Merge in passes so no more than MERGE_FAN_IN run files are open at once
+            passes = 0
+            while len(runs) > MERGE_FAN_IN:
+                merged = []
+                for start in range(0, len(runs), MERGE_FAN_IN):
+                    path = work_dir / f'{field}-pass{passes}-{start}'
+                    _write_run(path, _merge_runs(runs[start:start + MERGE_FAN_IN]))
+                    merged.append(path)
+                runs = merged
+                passes += 1
+            ordered[field] = (row for _, row in _merge_runs(runs))
+        return count, ordered
+
+    def _spill(self, work_dir, run, key_indexes):
+        for field, index in key_indexes:
+            keyed = [(date_key(row[index]), row) for row in run]
+            # sort() is stable, so equal dates keep file order within the run
+            keyed.sort(key=lambda keyed_row: keyed_row[0], reverse=True)
+            path = work_dir / f'{field}-run{len(self.runs[field])}'
+            _write_run(path, keyed)
+            self.runs[field].append(path)
+
+    def __exit__(self, *exc_info):
+        self._tmp.cleanup()
@@ -0,0 +1,305 @@
+"""
+Persistent state for incremental stale detection.
+
+A SQLite database keeps what the previous run saw:
+
+    inventory   the AWS Key Vault secret names
+    refs        (source, name) for every DB folder reference
+    ref_counts  name -> number of DB folders referencing it
+    stale       the current stale names (inventory names with no ref_counts row)
+    runs        one summary row per run
+    files       (source, size, mtime_ns, sha256) of the key_vault_secrets
+                file each source's stored set was last diffed from
+
+A run applies per-source deltas (names added and removed since the last
+run). Only the touched names are re-evaluated, so a run with delta files
+costs time proportional to what changed instead of to the size of the
+inventory. Diffing full key_vault_secrets files instead skips every file
+that is unchanged since it was last applied; a changed file is read once
+and diffed inside SQLite, so it costs a pass over that file.
+"""
+
+import csv
+import hashlib
+import os
+import sqlite3
+import time
+
+from common.secret_sets import iter_secret_names
+
+INVENTORY_SOURCE = 'aws_key_vault'
+ADDED = 'added'
+REMOVED = 'removed'
+DELTA_FIELDNAMES = ['change', 'key_vault_secret_name']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS inventory (name TEXT PRIMARY KEY) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS refs (
+    source TEXT NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (source, name)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ref_counts (name TEXT PRIMARY KEY, count INTEGER NOT NULL) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS stale (name TEXT PRIMARY KEY) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    finished_at TEXT NOT NULL,
+    inventory INTEGER NOT NULL,
+    stale INTEGER NOT NULL,
+    newly_stale INTEGER NOT NULL,
+    no_longer_stale INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    source TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+_CHUNK = 1024 * 1024
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Delta:
+    """
+    Names added to and removed from one source since the last run.
+
+    file_version is (size, mtime_ns, sha256) of the full file the delta was
+    diffed from, or None for a delta file.
+    """
+
+    def __init__(self, added=(), removed=(), file_version=None):
+        self.added = set(added)
+        self.removed = set(removed) - self.added
+        self.file_version = file_version
+
+    def __len__(self):
+        return len(self.added) + len(self.removed)
+
+
+def read_delta_csv(path):
+    """Read a delta CSV with DELTA_FIELDNAMES columns (change is 'added' or 'removed')."""
+    added, removed = set(), set()
+    with open(path, 'r', newline='', encoding='utf-8') as file:
+        for line_number, row in enumerate(csv.DictReader(file), start=2):
+            change = row['change'].strip().lower()
+            name = row['key_vault_secret_name'].strip()
+            if change == ADDED:
+                added.add(name)
+            elif change == REMOVED:
+                removed.add(name)
+            else:
+                raise ValueError(f"{path}:{line_number}: unknown change {row['change']!r}")
+    return Delta(added, removed)
+
+
+class IncrementalResult:
+    """What one run changed."""
+
+    def __init__(self):
+        self.newly_stale = []
+        self.no_longer_stale = []
+        self.changes_by_source = {}
+        self.inventory = 0
+        self.stale = 0
+        self.first_run = False
+
+
+class StateStore:
+    """Reference sets, inventory and stale set of the last run."""
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(_SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def is_empty(self):
+        return self.connection.execute('SELECT COUNT(*) FROM runs').fetchone()[0] == 0
+
+    def names(self, source):
+        """The stored set of a source (INVENTORY_SOURCE for the AWS inventory)."""
+        if source == INVENTORY_SOURCE:
+            cursor = self.connection.execute('SELECT name FROM inventory')
+        else:
+            cursor = self.connection.execute('SELECT name FROM refs WHERE source = ?', (source,))
+        return {name for (name,) in cursor}
+
+    def _stored_query(self, source):
+        if source == INVENTORY_SOURCE:
+            return 'SELECT name FROM inventory', ()
+        return 'SELECT name FROM refs WHERE source = ?', (source,)
+
+    def snapshot_delta(self, source, path, file_version=None):
+        """Delta between a full key_vault_secrets file of a source and the stored set."""
+        db = self.connection
+        db.execute('CREATE TEMP TABLE IF NOT EXISTS snapshot (name TEXT PRIMARY KEY) WITHOUT ROWID')
+        db.execute('DELETE FROM temp.snapshot')
+        db.executemany('INSERT OR IGNORE INTO temp.snapshot (name) VALUES (?)',
+                       ((name,) for name in iter_secret_names(path)))
+        stored, params = self._stored_query(source)
+        added = [name for (name,) in db.execute(f'SELECT name FROM temp.snapshot EXCEPT {stored}', params)]
+        removed = [name for (name,) in db.execute(f'{stored} EXCEPT SELECT name FROM temp.snapshot', params)]
+        db.execute('DELETE FROM temp.snapshot')
+        return Delta(added, removed, file_version)
+
+    def changed_file_version(self, source, path):
+        """
+        (size, mtime_ns, sha256) of path, or None if it is the file last applied for source.
+
+        An unchanged size and mtime skip the read; a touched file with the
+        same contents is recognised by its sha256.
+        """
+        stat = os.stat(path)
+        stored = self.connection.execute(
+            'SELECT size, mtime_ns, sha256 FROM files WHERE source = ?', (source,)).fetchone()
+        if stored and stored[:2] == (stat.st_size, stat.st_mtime_ns):
+            return None
+        digest = _hash_file(path)
+        if stored and stored[2] == digest:
+            with self.connection:
+                self.connection.execute('UPDATE files SET size = ?, mtime_ns = ? WHERE source = ?',
+                                        (stat.st_size, stat.st_mtime_ns, source))
+            return None
+        return stat.st_size, stat.st_mtime_ns, digest
+
+    def snapshot_deltas(self, paths):
+        """{source: Delta} for the files in {source: path} that changed since they were last applied."""
+        deltas = {}
+        for source, path in paths.items():
+            version = self.changed_file_version(source, path)
+            if version is not None:
+                deltas[source] = self.snapshot_delta(source, path, version)
+        return deltas
+
+    def stale_names(self):
+        return [name for (name,) in self.connection.execute('SELECT name FROM stale ORDER BY name')]
+
+    def active_by_source(self):
+        """Active (referenced and inventoried) secret count per DB source."""
+        return dict(self.connection.execute(
+            'SELECT refs.source, COUNT(*) FROM refs JOIN inventory ON inventory.name = refs.name '
+            'GROUP BY refs.source'
+        ))
+
+    def count(self, table):
+        return self.connection.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+    def apply(self, deltas):
+        """
+        Apply {source: Delta} in one transaction and re-evaluate the touched names.
+
+        Returns an IncrementalResult.
+        """
+        result = IncrementalResult()
+        result.first_run = self.is_empty()
+        if result.first_run:
+            removing = sorted(source for source, delta in deltas.items() if delta.removed)
+            if removing:
+                raise ValueError(f"the state store is empty, nothing to remove from: {', '.join(removing)}; "
+                                 "load full key_vault_secrets files or 'added' rows first")
+            return self._initial_load(deltas, result)
+        touched = set()
+        with self.connection:
+            db = self.connection
+            for source, delta in deltas.items():
+                result.changes_by_source[source] = (len(delta.added), len(delta.removed))
+                touched |= delta.added
+                touched |= delta.removed
+                if source == INVENTORY_SOURCE:
+                    db.executemany('DELETE FROM inventory WHERE name = ?',
+                                   ((name,) for name in delta.removed))
+                    db.executemany('INSERT OR IGNORE INTO inventory (name) VALUES (?)',
+                                   ((name,) for name in delta.added))
+                    continue
+                self._apply_refs(source, delta)
+            self._record_files(deltas)
+
+            was_stale = set()
+            now_stale = set()
+            for name in touched:
+                if db.execute('SELECT 1 FROM stale WHERE name = ?', (name,)).fetchone():
+                    was_stale.add(name)
+                if (db.execute('SELECT 1 FROM inventory WHERE name = ?', (name,)).fetchone()
+                        and not db.execute('SELECT 1 FROM ref_counts WHERE name = ?', (name,)).fetchone()):
+                    now_stale.add(name)
+            result.newly_stale = sorted(now_stale - was_stale)
+            result.no_longer_stale = sorted(was_stale - now_stale)
+            db.executemany('DELETE FROM stale WHERE name = ?', ((name,) for name in result.no_longer_stale))
+            db.executemany('INSERT INTO stale (name) VALUES (?)', ((name,) for name in result.newly_stale))
+
+            self._record_run(result)
+        return result
+
+    def _initial_load(self, deltas, result):
+        """Bulk-load an empty store; every stale name is newly stale."""
+        with self.connection:
+            db = self.connection
+            for source, delta in deltas.items():
+                result.changes_by_source[source] = (len(delta.added), 0)
+                if source == INVENTORY_SOURCE:
+                    db.executemany('INSERT OR IGNORE INTO inventory (name) VALUES (?)',
+                                   ((name,) for name in delta.added))
+                else:
+                    db.executemany('INSERT OR IGNORE INTO refs (source, name) VALUES (?, ?)',
+                                   ((source, name) for name in delta.added))
+            self._record_files(deltas)
+            db.execute('DELETE FROM ref_counts')
+            db.execute('INSERT INTO ref_counts (name, count) SELECT name, COUNT(*) FROM refs GROUP BY name')
+            db.execute('DELETE FROM stale')
+            db.execute('INSERT INTO stale (name) SELECT name FROM inventory '
+                       'WHERE name NOT IN (SELECT name FROM ref_counts)')
+            result.newly_stale = self.stale_names()
+            self._record_run(result)
+        return result
+
+    def _record_files(self, deltas):
+        """Remember which file each source's set now matches (none after a delta file)."""
+        db = self.connection
+        for source, delta in deltas.items():
+            if delta.file_version is None:
+                db.execute('DELETE FROM files WHERE source = ?', (source,))
+            else:
+                db.execute('INSERT OR REPLACE INTO files (source, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)',
+                           (source, *delta.file_version))
+
+    def _record_run(self, result):
+        result.inventory = self.count('inventory')
+        result.stale = self.count('stale')
+        self.connection.execute(
+            'INSERT INTO runs (finished_at, inventory, stale, newly_stale, no_longer_stale) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (time.strftime('%Y-%m-%dT%H:%M:%S%z'), result.inventory, result.stale,
+             len(result.newly_stale), len(result.no_longer_stale)),
+        )
+
+    def _apply_refs(self, source, delta):
+        db = self.connection
+        for name in delta.removed:
+            if db.execute('DELETE FROM refs WHERE source = ? AND name = ?', (source, name)).rowcount:
+                db.execute('UPDATE ref_counts SET count = count - 1 WHERE name = ?', (name,))
+                db.execute('DELETE FROM ref_counts WHERE name = ? AND count <= 0', (name,))
+        for name in delta.added:
+            if db.execute('INSERT OR IGNORE INTO refs (source, name) VALUES (?, ?)',
+                          (source, name)).rowcount:
+                db.execute('INSERT INTO ref_counts (name, count) VALUES (?, 1) '
+                           'ON CONFLICT (name) DO UPDATE SET count = count + 1', (name,))
+
+
+def open_state_store(path):
+    return StateStore(path)
@@ -0,0 +1,67 @@
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from common.audit_store import audit_csv_to_store, is_audit_store, open_audit_store, write_audit_csv
+from common.columnar import SUFFIX, csv_to_table, is_columnar, open_table, write_csv
+from common.stale_sort import KEY_SUFFIX, iter_normalized_rows, write_detailed_table
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Convert between CSV and the columnar .scol intermediate format."
+    )
+    parser.add_argument('input', help="A .csv file to convert to .scol, or a .scol file or "
+                                      "normalized audit store to export as CSV")
+    parser.add_argument('output', nargs='?', default=None,
+                        help="Default: the input path with the other extension")
+    parser.add_argument('--columns', default=None,
+                        help="Comma-separated columns to export (.scol to CSV only)")
+    parser.add_argument('--normalize', action='store_true',
+                        help="Write an audit CSV as a normalized audit store directory")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    source = Path(args.input)
+    if is_audit_store(source):
+        output = args.output or source.with_suffix('.csv')
+        with open_audit_store(source) as store:
+            write_audit_csv(store, output)
+            print(f"Exported {store.num_versions} rows of {source} to {output}")
+        return
+
+    if args.normalize:
+        output = Path(args.output or source.with_suffix(''))
+        secrets, versions, tags = audit_csv_to_store(source, output)
+        print(f"Normalized {versions} rows of {source} into {output} "
+              f"({secrets} secrets, {tags} distinct tags)")
+        return
+
+    if is_columnar(source):
+        output = args.output or source.with_suffix('.csv')
+        with open_table(source) as table:
+            if args.columns:
+                names = args.columns.split(',')
+            else:
+                # Precomputed sort keys are not meant for humans
+                names = [name for name in table.column_names if not name.endswith(KEY_SUFFIX)]
+            write_csv(table, output, names)
+            print(f"Exported {table.num_rows} rows of {source} to {output}")
+        return
+
+    output = Path(args.output or source.with_suffix(SUFFIX))
+    if source.name.startswith('stale_secrets_detailed'):
+        # Keeps the precomputed date keys sort_stale_secrets.py reads
+        write_detailed_table(output, iter_normalized_rows(source))
+    else:
+        csv_to_table(source, output)
+    with open_table(output) as table:
+        print(f"Converted {table.num_rows} rows of {source} to {output}")
+
+
+if __name__ == '__main__':
+    main()
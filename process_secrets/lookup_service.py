@@ -0,0 +1,161 @@
+import argparse
+import json
+import os
+import socketserver
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR))
+
+from common.lookup_index import DEFAULT_POLL_INTERVAL, IndexReloader, LookupIndex
+from common.pipeline import AWS_SOURCE
+from common.sources import DB_FOLDERS
+
+# Largest accepted POST body (about 100k names per batch)
+MAX_BODY_BYTES = 8 * 1024 * 1024
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Serve 'is this secret referenced, and where?' lookups from an in-memory "
+                    "index that reloads when the inputs change."
+    )
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix-socket', default=None, metavar='PATH',
+                        help="Listen on a Unix socket instead of TCP")
+    parser.add_argument('--input-format', choices=['csv', 'scol'], default='csv',
+                        help="Format of the key_vault_secrets files")
+    parser.add_argument('--audit', default=None,
+                        help="Audit for the version dates: CSV, .scol or a normalized store "
+                             "(default: aws_key_vault/secrets_full_audit.csv if present)")
+    parser.add_argument('--interval', type=float, default=DEFAULT_POLL_INTERVAL,
+                        help="Seconds between checks of the input files")
+    parser.add_argument('--quiet', action='store_true', help="Do not log every request")
+    return parser.parse_args()
+
+
+def input_paths(base_dir, input_format='csv'):
+    """The key_vault_secrets file of AWS_SOURCE and every DB folder."""
+    return {source: base_dir / source / f'key_vault_secrets.{input_format}'
+            for source in [AWS_SOURCE] + DB_FOLDERS}
+
+
+class LookupHandler(BaseHTTPRequestHandler):
+    """
+    GET  /lookup/NAME             one secret
+    GET  /lookup?name=A&name=B    several secrets
+    POST /lookup {"names": [...]} a batch
+    GET  /status                  index generation, load time and counts
+    """
+
+    def address_string(self):
+        # Unix socket clients have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        # One index per request, even if a reload swaps it meanwhile
+        index = self.server.reloader.index
+        if url.path == '/status':
+            reloader = self.server.reloader
+            self._send(200, {'generation': reloader.generation, 'loaded_at': index.loaded_at,
+                             'reload_errors': reloader.reload_errors, 'counts': index.counts})
+        elif url.path.startswith('/lookup/'):
+            self._send(200, index.lookup(unquote(url.path[len('/lookup/'):])))
+        elif url.path == '/lookup':
+            names = parse_qs(url.query).get('name', [])
+            if not names:
+                self._send(400, {'error': "expected ?name=NAME (repeatable)"})
+                return
+            self._send(200, {'results': index.lookup_many(names)})
+        else:
+            self._send(404, {'error': f"unknown path {url.path}"})
+
+    def do_POST(self):
+        if urlsplit(self.path).path != '/lookup':
+            self._send(404, {'error': f"unknown path {self.path}"})
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_BYTES:
+            self._send(413, {'error': f"body larger than {MAX_BODY_BYTES} bytes"})
+            return
+        try:
+            names = json.loads(self.rfile.read(length))['names']
+            if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+                raise ValueError
+        except (ValueError, KeyError, TypeError):
+            self._send(400, {'error': 'expected a JSON body {"names": [...]}'})
+            return
+        self._send(200, {'results': self.server.reloader.index.lookup_many(names)})
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(reloader, host='127.0.0.1', port=8765, unix_socket=None, quiet=False):
+    """An HTTP server answering lookups from reloader.index (TCP, or a Unix socket)."""
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.unlink(unix_socket)
+        server = UnixHTTPServer(unix_socket, LookupHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), LookupHandler)
+    server.reloader = reloader
+    server.quiet = quiet
+    return server
+
+
+def main():
+    args = parse_args()
+    paths = input_paths(BASE_DIR, args.input_format)
+    audit_path = args.audit
+    if audit_path is None:
+        default_audit = BASE_DIR / 'aws_key_vault' / 'secrets_full_audit.csv'
+        audit_path = default_audit if default_audit.exists() else None
+    watched = list(paths.values()) + ([audit_path] if audit_path else [])
+
+    print("=" * 80)
+    print("Starting Secret Lookup Service")
+    print("=" * 80)
+    print()
+    try:
+        reloader = IndexReloader(lambda: LookupIndex(paths, audit_path), watched, args.interval)
+    except FileNotFoundError as e:
+        raise SystemExit(f"Error: {e}; run the extractors first")
+    print(f"Loaded index: {reloader.index.counts}")
+    print(f"Watching {len(watched)} input files every {args.interval:g}s")
+
+    server = make_server(reloader, args.host, args.port, args.unix_socket, args.quiet)
+    reloader.start()
+    where = args.unix_socket or f"http://{args.host}:{server.server_address[1]}"
+    print(f"Listening on {where}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        reloader.stop()
+        if args.unix_socket and os.path.exists(args.unix_socket):
+            os.unlink(args.unix_socket)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+import argparse
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR))
+sys.path.insert(0, str(BASE_DIR / 'stale_secrets'))
+
+from common.pipeline import AWS_SOURCE, PHASE1_SOURCES, run_extractions
+from common.secret_sets import read_secrets_from_csv
+from common.snapshot_history import Snapshot, open_snapshot_history
+from common.sources import SOURCES
+from common.stage_cache import StageCache
+from common.stale_sort import SORT_CONFIGS
+from detect_stale_secrets import detect_stale_secrets
+from detect_stale_secrets_detailed import detect_stale_secrets_detailed
+from sort_stale_secrets import sort_stale_secrets
+
+STALE_DIR = BASE_DIR / 'stale_secrets'
+# Extraction -> detection -> detailed detection -> sort
+STAGES = ['extract', 'detect', 'detailed', 'sort']
+
+
+def parse_key_values(values, option):
+    """Parse repeated NAME=VALUE options into a dict."""
+    parsed = {}
+    for value in values:
+        name, sep, rest = value.partition('=')
+        if not sep or name not in PHASE1_SOURCES:
+            raise SystemExit(f"{option} expects SOURCE=VALUE with SOURCE one of {PHASE1_SOURCES}")
+        parsed[name] = rest
+    return parsed
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Run the extraction, detection and sort stages, skipping stages whose "
+                    "inputs are unchanged since their last run."
+    )
+    parser.add_argument('--timeout', type=float, default=None,
+                        help="Seconds each source may take (default: no limit)")
+    parser.add_argument('--source-timeout', action='append', default=[], metavar='SOURCE=SECONDS')
+    parser.add_argument('--dsn', action='append', default=[], metavar='SOURCE=DSN',
+                        help="Query a DB directly instead of reading its psql log")
+    parser.add_argument('--org', action='append', default=[], metavar='SOURCE=ORG')
+    parser.add_argument('--aws-input', default='secrets_full_audit.csv',
+                        help="Audit or names-only inventory CSV in aws_key_vault/")
+    parser.add_argument('--write-intermediate', action='store_true',
+                        help="Also write each source's key_vault_secrets.csv")
+    parser.add_argument('--allow-partial', action='store_true',
+                        help="Run detection even if a source failed (its references count as missing)")
+    parser.add_argument('--through', choices=STAGES, default='sort',
+                        help="Last stage to run (default: sort)")
+    parser.add_argument('--cache-dir', default=str(BASE_DIR / '.pipeline_cache'),
+                        help="Stage manifest and cached reference sets")
+    parser.add_argument('--force', action='store_true',
+                        help="Re-run every stage even if it is up to date")
+    parser.add_argument('--history-db', default=None, metavar='PATH',
+                        help="Append this run's inventory, reference sets and stale set to a "
+                             "snapshot history (see stale_secrets/snapshot_history.py)")
+    parser.add_argument('--history-label', default='', help="Note stored with the history entry")
+    return parser.parse_args()
+
+
+def code_digest(cache):
+    """One digest over the pipeline's code, so editing it invalidates the cache."""
+    paths = sorted(BASE_DIR.glob('common/*.py')) + sorted(STALE_DIR.glob('*.py'))
+    return cache.fingerprint('code', paths)
+
+
+def extraction_stage(cache, name, options, code):
+    """Return (fingerprint, output paths) of one source's extraction."""
+    folder = BASE_DIR / name
+    if name == AWS_SOURCE:
+        inputs = [folder / options['aws_input']]
+        intermediate = [folder / 'key_vault_secrets.csv', folder / 'non_uuid_secret_names.csv']
+    else:
+        inputs = [folder / SOURCES[name].input_file]
+        intermediate = [folder / SOURCES[name].output_file]
+    outputs = [references_path(cache, name)]
+    if options['write_intermediate']:
+        outputs += intermediate
+    if name in options['dsns']:
+        # A live database cannot be fingerprinted; the stage always re-runs
+        return None, outputs
+    params = {'stage': name, 'code': code, 'write_intermediate': options['write_intermediate']}
+    return cache.fingerprint(params, inputs), outputs
+
+
+def references_path(cache, name):
+    return cache.cache_dir / f'{name}.refs'
+
+
+def write_references(path, names):
+    with open(path, 'w', encoding='utf-8') as file:
+        file.writelines(name + '\n' for name in sorted(names))
+
+
+def read_references(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        return {line.rstrip('\n') for line in file}
+
+
+def record_history(path, label, load_references, stale_secrets):
+    """Append the run's sets to the snapshot history."""
+    snapshot = Snapshot(load_references(AWS_SOURCE),
+                        {name: load_references(name) for name in PHASE1_SOURCES if name != AWS_SOURCE},
+                        stale_secrets)
+    with open_snapshot_history(path) as history:
+        run_id, changes = history.record(snapshot, label)
+        previous = history.latest_runs(2)
+    changed = sum(added + removed for added, removed in changes.values())
+    print(f"Snapshot history: recorded run {run_id} in {path} ({changed} membership changes)")
+    if len(previous) == 2:
+        print(f"  Diff with the previous run: python3 stale_secrets/snapshot_history.py "
+              f"--history {path} diff {previous[0]} {previous[1]}")
+    print()
+
+
+def run_stage(cache, name, fingerprint, outputs, force, run):
+    """Run a stage unless it is up to date; returns its result or None when skipped."""
+    if not force and cache.is_fresh(name, fingerprint):
+        print(f"Stage {name}: up to date, skipped")
+        print()
+        return None
+    result = run()
+    cache.record(name, fingerprint, outputs)
+    return result
+
+
+def main():
+    args = parse_args()
+    options = {
+        'aws_input': args.aws_input,
+        'dsns': parse_key_values(args.dsn, '--dsn'),
+        'orgs': parse_key_values(args.org, '--org'),
+        'write_intermediate': args.write_intermediate,
+    }
+    timeouts = {name: float(seconds)
+                for name, seconds in parse_key_values(args.source_timeout, '--source-timeout').items()}
+    stages = STAGES[:STAGES.index(args.through) + 1]
+    cache = StageCache(args.cache_dir)
+    code = code_digest(cache)
+
+    print("=" * 80)
+    print("Phase 1: Concurrent Data Extraction")
+    print("=" * 80)
+    extractions = {name: extraction_stage(cache, name, options, code) for name in PHASE1_SOURCES}
+    pending = [name for name, (fingerprint, _) in extractions.items()
+               if args.force or not cache.is_fresh(f'extract:{name}', fingerprint)]
+    references, summaries, errors = {}, {}, {}
+    if pending:
+        references, summaries, errors = run_extractions(
+            BASE_DIR, sources=pending, options=options, timeout=args.timeout, timeouts=timeouts
+        )
+    for name in PHASE1_SOURCES:
+        fingerprint, outputs = extractions[name]
+        if name in errors:
+            cache.forget(f'extract:{name}')
+            print(f"  {name}: FAILED - {errors[name]}")
+        elif name in references:
+            write_references(references_path(cache, name), references[name])
+            cache.record(f'extract:{name}', fingerprint, outputs)
+            summary = summaries[name]
+            print(f"  {name}: {summary['references']} references from {summary['rows']} rows "
+                  f"({summary['seconds']}s)")
+        else:
+            print(f"  {name}: up to date, skipped")
+    print()
+
+    if errors and (AWS_SOURCE in errors or not args.allow_partial):
+        print("Stale detection skipped: a missing reference set would make its secrets look stale.")
+        return 1
+    if 'detect' not in stages:
+        return 0
+
+    def load_references(name):
+        # Sources skipped above are only read back when a later stage needs them
+        if name not in references and name not in errors:
+            references[name] = read_references(references_path(cache, name))
+        return references.get(name, set())
+
+    def detect():
+        db_secrets_by_folder = {name: load_references(name)
+                                for name in PHASE1_SOURCES if name != AWS_SOURCE}
+        return detect_stale_secrets(load_references(AWS_SOURCE), db_secrets_by_folder)
+
+    # A partial run's outputs are never reused
+    cacheable = not errors
+    stale_output = STALE_DIR / 'stale_secrets.csv'
+    fingerprint = cache.fingerprint({'stage': 'detect', 'code': code},
+                                    upstream=[f'extract:{name}' for name in PHASE1_SOURCES])
+    stale_secrets = run_stage(cache, 'detect', fingerprint if cacheable else None,
+                              [stale_output], args.force, detect)
+
+    if args.history_db:
+        if errors:
+            print("Snapshot history not updated: a partial run would record missing references as removed")
+        else:
+            record_history(args.history_db, args.history_label, load_references,
+                           stale_secrets if stale_secrets is not None else read_secrets_from_csv(stale_output))
+
+    if 'detailed' in stages:
+        audit_path = BASE_DIR / AWS_SOURCE / args.aws_input
+        detailed_output = STALE_DIR / 'stale_secrets_detailed.csv'
+        fingerprint = cache.fingerprint({'stage': 'detailed', 'code': code}, [audit_path], ['detect'])
+
+        def detailed():
+            stale_uuids = stale_secrets if stale_secrets is not None else read_secrets_from_csv(stale_output)
+            detect_stale_secrets_detailed(audit_path=audit_path, stale_uuids=stale_uuids)
+
+        run_stage(cache, 'detailed', fingerprint if cacheable else None,
+                  [detailed_output], args.force, detailed)
+
+    if 'sort' in stages:
+        fingerprint = cache.fingerprint({'stage': 'sort', 'code': code}, upstream=['detailed'])
+        run_stage(cache, 'sort', fingerprint if cacheable else None,
+                  [STALE_DIR / config['output_file'] for config in SORT_CONFIGS],
+                  args.force, sort_stale_secrets)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common.aws_secrets import DEFAULT_REGION, DEFAULT_WORKERS, create_secretsmanager_client
+from common.deletion import (
+    DEFAULT_RATE,
+    DEFAULT_RECOVERY_WINDOW_DAYS,
+    DELETED,
+    DRY_RUN,
+    FAILED,
+    MAX_RECOVERY_WINDOW_DAYS,
+    MIN_RECOVERY_WINDOW_DAYS,
+    NOT_FOUND,
+    REFERENCED,
+    DeletionJournal,
+    ReferenceGuard,
+    delete_candidates,
+    read_candidates,
+)
+from common.sources import DB_FOLDERS
+
+def parse_args():
+    script_dir = Path(__file__).parent
+    parser = argparse.ArgumentParser(
+        description="Delete stale secret candidates from AWS Secrets Manager, resumably."
+    )
+    parser.add_argument('--candidates', default=None,
+                        help="delete_candidates_list.txt (one name per line) or stale_secrets.csv "
+                             "(default: delete_candidates_list.txt if present, else stale_secrets.csv)")
+    parser.add_argument('--journal', default=str(script_dir / 'delete_stale_secrets.journal.jsonl'),
+                        help="Append-only JSON lines journal; names it records as deleted are skipped")
+    parser.add_argument('--recovery-window-days', type=int, default=DEFAULT_RECOVERY_WINDOW_DAYS,
+                        help="Days (7-30) before Secrets Manager removes a deleted secret for good")
+    parser.add_argument('--force-delete-without-recovery', action='store_true',
+                        help="Delete immediately, with no recovery window")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Check every candidate against the references but delete nothing")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE,
+                        help="Delete calls per second across all workers")
+    parser.add_argument('--burst', type=float, default=None,
+                        help="Delete calls allowed back to back (default: --rate)")
+    parser.add_argument('--input-format', choices=['csv', 'scol'], default='csv',
+                        help="Format of the DB folders' key_vault_secrets files used for the re-check")
+    parser.add_argument('--region', default=DEFAULT_REGION)
+    parser.add_argument('--profile', default=None)
+    parser.add_argument('--endpoint-url', default=None)
+    parser.add_argument('--quiet', action='store_true',
+                        help="Print counts instead of every kept or failed secret")
+    args = parser.parse_args()
+    if not args.force_delete_without_recovery and not (
+            MIN_RECOVERY_WINDOW_DAYS <= args.recovery_window_days <= MAX_RECOVERY_WINDOW_DAYS):
+        parser.error(f"--recovery-window-days must be between {MIN_RECOVERY_WINDOW_DAYS} "
+                     f"and {MAX_RECOVERY_WINDOW_DAYS}")
+    if args.candidates is None:
+        candidates = script_dir / 'delete_candidates_list.txt'
+        args.candidates = str(candidates if candidates.exists() else script_dir / 'stale_secrets.csv')
+    return args
+
+def print_summary(stats, quiet=False):
+    print("Summary:")
+    print(f"  Already deleted in an earlier run: {stats['skipped']}")
+    if stats[DRY_RUN]:
+        print(f"  Would delete: {len(stats[DRY_RUN])}")
+    print(f"  Deleted: {len(stats[DELETED])}")
+    print(f"  Already gone: {len(stats[NOT_FOUND])}")
+    print(f"  Kept (referenced again): {len(stats[REFERENCED])}")
+    print(f"  Failed: {len(stats[FAILED])}")
+    print(f"  Throttled calls: {stats['throttled_calls']}")
+    print()
+    if quiet:
+        return
+    for name, sources in sorted(stats[REFERENCED].items()):
+        print(f"  kept {name}: referenced by {', '.join(sources)}")
+    for name, error in sorted(stats[FAILED].items()):
+        print(f"  failed {name}: {error}")
+
+def main():
+    args = parse_args()
+    base_dir = Path(__file__).parent.parent
+
+    print("=" * 80)
+    print("Deleting Stale Secrets" + (" (dry run)" if args.dry_run else ""))
+    print("=" * 80)
+    print()
+
+    candidates = read_candidates(args.candidates)
+    print(f"Loaded {len(candidates)} candidates from: {args.candidates}")
+    # Without every reference set an in-use secret could look unreferenced
+    try:
+        guard = ReferenceGuard({folder: base_dir / folder / f'key_vault_secrets.{args.input_format}'
+                                for folder in DB_FOLDERS})
+    except FileNotFoundError as e:
+        raise SystemExit(f"Error: {e}; run the DB extractors first")
+    mode = ("force delete without recovery" if args.force_delete_without_recovery
+            else f"{args.recovery_window_days}-day recovery window")
+    print(f"Mode: {mode}, {args.workers} workers, at most {args.rate:g} deletes/s")
+    print(f"Journal: {args.journal}")
+    print()
+
+    client = None if args.dry_run else create_secretsmanager_client(
+        args.region, args.endpoint_url, args.profile)
+    with DeletionJournal(args.journal) as journal:
+        stats = delete_candidates(
+            client, candidates, journal, guard,
+            recovery_window_days=args.recovery_window_days,
+            force=args.force_delete_without_recovery, dry_run=args.dry_run,
+            workers=args.workers, rate=args.rate, burst=args.burst,
+        )
+
+    print_summary(stats, args.quiet)
+    if stats[FAILED]:
+        print("Re-run the same command to retry the failed secrets; deleted ones are skipped.")
+    return 1 if stats[FAILED] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,42 +1,39 @@
+import argparse
 import csv
 import os
+import sys
 from pathlib import Path
 
-def read_secrets_from_csv(csv_path):
-    """Read secret names from a CSV file and return as a set."""
-    secrets = set()
-    try:
-        with open(csv_path, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                secret_name = row.get('key_vault_secret_name', '').strip()
-                if secret_name:
-                    secrets.add(secret_name)
-        print(f"Loaded {len(secrets)} secrets from {csv_path}")
-    except FileNotFoundError:
-        print(f"Warning: File not found - {csv_path}")
-    except Exception as e:
-        print(f"Error reading {csv_path}: {e}")
-    return secrets
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-def detect_stale_secrets():
+from common.attribution import attribute, print_overlap_matrix, write_overlap_matrix
+from common.metrics import StageMetrics, add_metrics_arguments, stage_metrics
+from common.pipeline import AWS_SOURCE
+from common.secret_sets import BACKENDS, empty_secret_set, read_secrets_from_csv
+from common.sources import DB_FOLDERS
+
+def detect_stale_secrets(aws_secrets=None, db_secrets_by_folder=None, backend='set',
+                         input_format='csv', overlap_matrix=False, metrics=None, quiet=False):
     """
     Detect stale secrets that exist in AWS Key Vault but not in any DB folders.
+
+    run_pipeline.py passes the extracted sets in directly; otherwise they are
+    read from the key_vault_secrets.csv (or .scol) files with the given set backend.
+    With overlap_matrix, every count comes from one bitmask pass over all
+    sources, which also yields source_overlap_matrix.csv.
+    Counters and parse/compute/io timings are recorded on metrics.
     """
+    if metrics is None:
+        metrics = StageMetrics('detect_stale_secrets')
     # Get the base directory (process_secrets folder)
     script_dir = Path(__file__).parent
     base_dir = script_dir.parent
     
     # Path to AWS Key Vault secrets
-    aws_csv_path = base_dir / 'aws_key_vault' / 'key_vault_secrets.csv'
+    aws_csv_path = base_dir / 'aws_key_vault' / f'key_vault_secrets.{input_format}'
     
     # Paths to DB folder secrets
-    db_folders = [
-        'choreo_app_db',
-        'choreo_cloud_manager_db',
-        'choreo_configuration_service_db',
-        'choreo_rudder_db'
-    ]
+    db_folders = list(db_secrets_by_folder) if db_secrets_by_folder is not None else DB_FOLDERS
     
     print("=" * 80)
     print("Starting Stale Secrets Detection")
@@ -44,29 +41,49 @@ def detect_stale_secrets():
     print()
     
     # Read AWS Key Vault secrets
-    print(f"Reading AWS Key Vault secrets from: {aws_csv_path}")
-    aws_secrets = read_secrets_from_csv(aws_csv_path)
+    if aws_secrets is None:
+        print(f"Reading AWS Key Vault secrets from: {aws_csv_path}")
+        with metrics.timer('parse'):
+            aws_secrets = read_secrets_from_csv(aws_csv_path, backend)
     print(f"Total AWS Key Vault secrets: {len(aws_secrets)}")
     print()
     
-    # Read all DB folder secrets and combine them
-    all_db_secrets = set()
-    db_secrets_by_folder = {}
-    print("Reading secrets from DB folders:")
-    for folder in db_folders:
-        db_csv_path = base_dir / folder / 'key_vault_secrets.csv'
-        print(f"  - {folder}")
-        db_secrets = read_secrets_from_csv(db_csv_path)
-        db_secrets_by_folder[folder] = db_secrets
-        all_db_secrets.update(db_secrets)
+    # Read all DB folder secrets
+    if db_secrets_by_folder is None:
+        db_secrets_by_folder = {}
+        print("Reading secrets from DB folders:")
+        for folder in db_folders:
+            db_csv_path = base_dir / folder / f'key_vault_secrets.{input_format}'
+            print(f"  - {folder}")
+            with metrics.timer('parse'):
+                db_secrets_by_folder[folder] = read_secrets_from_csv(db_csv_path, backend)
+
+    with metrics.timer('compute'):
+        attribution = None
+        if overlap_matrix:
+            # One pass over every source; stale and active counts come from the masks
+            attribution = attribute({AWS_SOURCE: aws_secrets,
+                                     **{folder: db_secrets_by_folder[folder] for folder in db_folders}})
+            # The histogram of distinct masks is built once and feeds every count
+            histogram = attribution.histogram()
+            matrix = attribution.overlap_matrix(histogram)
+            db_secret_count = attribution.count_any(db_folders, histogram)
+            stale_secrets = attribution.names_with([AWS_SOURCE], excluded=db_folders)
+            active_by_folder = dict(zip(db_folders, matrix[0][1:]))
+        else:
+            all_db_secrets = empty_secret_set(backend)
+            for folder in db_folders:
+                all_db_secrets.update(db_secrets_by_folder[folder])
+            db_secret_count = len(all_db_secrets)
+            # Find stale secrets (in AWS but not in any DB)
+            stale_secrets = aws_secrets - all_db_secrets
+            active_by_folder = {folder: len(aws_secrets & db_secrets_by_folder[folder])
+                                for folder in db_folders}
     
     print()
-    print(f"Total unique secrets across all DB folders: {len(all_db_secrets)}")
+    print(f"Total unique secrets across all DB folders: {db_secret_count}")
     print()
     
-    # Find stale secrets (in AWS but not in any DB)
-    stale_secrets = aws_secrets - all_db_secrets
-    
     print("=" * 80)
     print(f"Detection Complete: Found {len(stale_secrets)} stale secrets")
     print("=" * 80)
@@ -74,7 +91,7 @@ def detect_stale_secrets():
     
     # Write stale secrets to CSV
     output_path = script_dir / 'stale_secrets.csv'
-    with open(output_path, 'w', newline='', encoding='utf-8') as file:
+    with metrics.timer('io'), open(output_path, 'w', newline='', encoding='utf-8') as file:
         writer = csv.writer(file)
         writer.writerow(['key_vault_secret_name'])
         for secret in sorted(stale_secrets):
@@ -86,21 +103,29 @@ def detect_stale_secrets():
     # Print summary statistics
     print("Summary:")
     print(f"  AWS Key Vault secrets: {len(aws_secrets)}")
-    print(f"  DB folder secrets: {len(all_db_secrets)}")
+    print(f"  DB folder secrets: {db_secret_count}")
     print(f"  Stale secrets: {len(stale_secrets)}")
-    print(f"  Active secrets: {len(aws_secrets & all_db_secrets)}")
+    print(f"  Active secrets: {len(aws_secrets) - len(stale_secrets)}")
     print()
     
     # Print active secret count for each DB folder
     print("Active secrets by DB folder:")
     for folder in db_folders:
-        db_secrets = db_secrets_by_folder[folder]
-        active_count = len(aws_secrets & db_secrets)
-        print(f"  {folder}: {active_count} active secrets")
+        print(f"  {folder}: {active_by_folder[folder]} active secrets")
     print()
+
+    if attribution is not None:
+        matrix_path = script_dir / 'source_overlap_matrix.csv'
+        with metrics.timer('io'):
+            write_overlap_matrix(attribution, matrix_path, matrix)
+        print_overlap_matrix(attribution, matrix)
+        print(f"Overlap matrix saved to: {matrix_path}")
+        print()
     
+    metrics.set(rows_in=len(aws_secrets), rows_out=len(stale_secrets))
+
     # Print first 10 stale secrets as examples
-    if stale_secrets:
+    if stale_secrets and not quiet:
         print("Sample stale secrets (first 10):")
         for i, secret in enumerate(sorted(stale_secrets)[:10], 1):
             print(f"  {i}. {secret}")
@@ -110,4 +135,17 @@ def detect_stale_secrets():
     return stale_secrets
 
 if __name__ == '__main__':
-    stale_secrets = detect_stale_secrets()
+    parser = argparse.ArgumentParser(description="Detect stale AWS Key Vault secrets.")
+    parser.add_argument('--backend', choices=BACKENDS, default='set',
+                        help="'compact' stores UUIDs as sorted 128-bit integers to cut memory")
+    parser.add_argument('--input-format', choices=['csv', 'scol'], default='csv',
+                        help="Read the key_vault_secrets.scol files written with --format scol")
+    parser.add_argument('--overlap-matrix', action='store_true',
+                        help="Attribute every secret to its sources in one bitmask pass and write "
+                             "source_overlap_matrix.csv")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    with stage_metrics('detect_stale_secrets', args) as metrics:
+        stale_secrets = detect_stale_secrets(backend=args.backend, input_format=args.input_format,
+                                             overlap_matrix=args.overlap_matrix,
+                                             metrics=metrics, quiet=args.quiet)
@@ -1,181 +1,224 @@
+import argparse
 import csv
 import os
+import sys
+import time
 from pathlib import Path
-from collections import defaultdict
 
-def read_secrets_from_csv(csv_path):
-    """Read secret names from a CSV file and return as a set."""
-    secrets = set()
-    try:
-        with open(csv_path, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                secret_name = row.get('key_vault_secret_name', '').strip()
-                if secret_name:
-                    secrets.add(secret_name)
-        print(f"Loaded {len(secrets)} secrets from {csv_path}")
-    except FileNotFoundError:
-        print(f"Warning: File not found - {csv_path}")
-    except Exception as e:
-        print(f"Error reading {csv_path}: {e}")
-    return secrets
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common.attribution import Attribution, print_overlap_matrix, write_overlap_matrix, write_provenance
+from common.aws_refs import iter_audit_rows
+from common.aws_secrets import AUDIT_FIELDNAMES
+from common.metrics import StageMetrics, add_metrics_arguments, stage_metrics
+from common.pipeline import AWS_SOURCE
+from common.secret_sets import BACKENDS, empty_secret_set, read_secrets_from_csv
+from common.sources import DB_FOLDERS
+from common.stale_sort import DetailedTableWriter
+
+def read_stale_audit_rows(csv_path, stale_uuids, metrics=None):
+    """
+    Stream the full audit CSV once and keep only the rows of stale UUIDs.
+
+    Returns {uuid: [row tuple, ...]} with the versions in file order, so
+    memory grows with the stale set rather than with the audit file.
+    The number of rows scanned is recorded as rows_in on metrics.
+    """
+    rows_by_uuid = {}
+    total_rows = 0
 
-def read_full_audit_csv(csv_path):
-    """Read the full audit CSV and organize by UUID (SecretName is the UUID)."""
-    secrets_by_uuid = defaultdict(list)
-    
     try:
-        with open(csv_path, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                uuid = row.get('SecretName', '').strip()
-                if uuid:
-                    # Store the full row data
-                    secrets_by_uuid[uuid].append({
-                        'SecretName': uuid,
-                        'LastAccessedDate': row.get('LastAccessedDate', ''),
-                        'LastChangedDate': row.get('LastChangedDate', ''),
-                        'Tags': row.get('Tags', ''),
-                        'VersionId': row.get('VersionId', ''),
-                        'VersionStages': row.get('VersionStages', ''),
-                        'VersionCreatedDate': row.get('VersionCreatedDate', '')
-                    })
-        
-        print(f"Loaded {len(secrets_by_uuid)} unique UUIDs from full audit CSV")
+        for row in iter_audit_rows(csv_path, stale_uuids):
+            total_rows += 1
+            if row[0] in stale_uuids:
+                rows_by_uuid.setdefault(row[0], []).append(row)
+
+        if metrics is not None:
+            metrics.set(rows_in=total_rows)
+        print(f"Scanned {total_rows} audit rows, kept {sum(map(len, rows_by_uuid.values()))} "
+              f"rows for {len(rows_by_uuid)} stale UUIDs")
     except FileNotFoundError:
         print(f"Error: File not found - {csv_path}")
     except Exception as e:
         print(f"Error reading full audit CSV: {e}")
-    
-    return secrets_by_uuid
 
-def detect_stale_secrets_detailed():
+    return rows_by_uuid
+
+def detect_stale_secrets_detailed(backend='set', input_format='csv', output_format='csv',
+                                  audit_path=None, stale_uuids=None, provenance=False,
+                                  metrics=None, quiet=False):
     """
     Detect stale secrets with detailed information from secrets_full_audit.csv.
+
+    input_format / output_format 'scol' read and write the columnar files;
+    audit_path overrides the audit (CSV, .scol or normalized audit store).
+    run_pipeline.py passes the stale set in directly instead of re-reading
+    the key_vault_secrets files. With provenance, the sources are attributed
+    in one bitmask pass that also writes secrets_provenance.csv (every AWS
+    secret with a 0/1 column per source) and source_overlap_matrix.csv.
+    Counters and parse/compute/io timings are recorded on metrics.
     """
+    if metrics is None:
+        metrics = StageMetrics('detect_stale_secrets_detailed')
     # Get the base directory (process_secrets folder)
     script_dir = Path(__file__).parent
     base_dir = script_dir.parent
     
     # Path to full audit CSV
-    full_audit_csv_path = base_dir / 'aws_key_vault' / 'secrets_full_audit.csv'
+    full_audit_csv_path = audit_path or base_dir / 'aws_key_vault' / f'secrets_full_audit.{input_format}'
     
     # Path to AWS Key Vault secrets (UUIDs)
-    aws_csv_path = base_dir / 'aws_key_vault' / 'key_vault_secrets.csv'
+    aws_csv_path = base_dir / 'aws_key_vault' / f'key_vault_secrets.{input_format}'
     
     # Paths to DB folder secrets
-    db_folders = [
-        'choreo_app_db',
-        'choreo_cloud_manager_db',
-        'choreo_configuration_service_db',
-        'choreo_rudder_db'
-    ]
+    db_folders = DB_FOLDERS
     
     print("=" * 80)
     print("Starting Detailed Stale Secrets Detection")
     print("=" * 80)
     print()
     
-    # Read full audit data
+    attribution = None
+    if stale_uuids is None or provenance:
+        # Read AWS Key Vault secrets (UUIDs)
+        print(f"Reading AWS Key Vault UUIDs from: {aws_csv_path}")
+        with metrics.timer('parse'):
+            aws_secrets = read_secrets_from_csv(aws_csv_path, backend)
+        print(f"Total AWS Key Vault UUIDs: {len(aws_secrets)}")
+        print()
+    
+        # Read all DB folder secrets and combine them (or attribute them to their folders)
+        all_db_secrets = empty_secret_set(backend)
+        if provenance:
+            attribution = Attribution([AWS_SOURCE] + db_folders)
+            attribution.add(AWS_SOURCE, aws_secrets)
+        print("Reading secrets from DB folders:")
+        for folder in db_folders:
+            db_csv_path = base_dir / folder / f'key_vault_secrets.{input_format}'
+            print(f"  - {folder}")
+            with metrics.timer('parse'):
+                db_secrets = read_secrets_from_csv(db_csv_path, backend)
+            with metrics.timer('compute'):
+                if attribution is not None:
+                    attribution.add(folder, db_secrets)
+                else:
+                    all_db_secrets.update(db_secrets)
+        with metrics.timer('compute'):
+            if attribution is not None:
+                # The histogram of distinct masks is built once and feeds every count
+                histogram = attribution.histogram()
+                matrix = attribution.overlap_matrix(histogram)
+                db_secret_count = attribution.count_any(db_folders, histogram)
+            else:
+                db_secret_count = len(all_db_secrets)
+    
+        print()
+        print(f"Total unique secrets across all DB folders: {db_secret_count}")
+        print()
+    
+        # Find stale UUIDs (in AWS but not in any DB)
+        with metrics.timer('compute'):
+            if attribution is not None:
+                stale_uuids = attribution.names_with([AWS_SOURCE], excluded=db_folders)
+            else:
+                stale_uuids = aws_secrets - all_db_secrets
+    
+        print("=" * 80)
+        print(f"Detection Complete: Found {len(stale_uuids)} stale secrets")
+        print("=" * 80)
+        print()
+    
+    # Only the stale UUIDs' audit rows are kept while streaming the audit file
+    stale_names = set(stale_uuids)
     print(f"Reading full audit data from: {full_audit_csv_path}")
-    secrets_by_uuid = read_full_audit_csv(full_audit_csv_path)
-    print()
-    
-    # Read AWS Key Vault secrets (UUIDs)
-    print(f"Reading AWS Key Vault UUIDs from: {aws_csv_path}")
-    aws_secrets = read_secrets_from_csv(aws_csv_path)
-    print(f"Total AWS Key Vault UUIDs: {len(aws_secrets)}")
+    with metrics.timer('parse'):
+        rows_by_uuid = read_stale_audit_rows(full_audit_csv_path, stale_names, metrics)
     print()
-    
-    # Read all DB folder secrets and combine them
-    all_db_secrets = set()
-    print("Reading secrets from DB folders:")
-    for folder in db_folders:
-        db_csv_path = base_dir / folder / 'key_vault_secrets.csv'
-        print(f"  - {folder}")
-        db_secrets = read_secrets_from_csv(db_csv_path)
-        all_db_secrets.update(db_secrets)
-    
-    print()
-    print(f"Total unique secrets across all DB folders: {len(all_db_secrets)}")
-    print()
-    
-    # Find stale UUIDs (in AWS but not in any DB)
-    stale_uuids = aws_secrets - all_db_secrets
-    
-    print("=" * 80)
-    print(f"Detection Complete: Found {len(stale_uuids)} stale secrets")
-    print("=" * 80)
-    print()
-    
-    # Prepare detailed stale secrets data
-    detailed_stale_secrets = []
+
+    # Write detailed stale secrets, sorted by SecretName for consistency
+    output_path = script_dir / f'stale_secrets_detailed.{output_format}'
     uuids_with_audit_data = 0
     uuids_without_audit_data = 0
-    
-    for uuid in stale_uuids:
-        if uuid in secrets_by_uuid:
-            uuids_with_audit_data += 1
-            # Get all versions for this UUID
-            versions = secrets_by_uuid[uuid]
-            # Add each version as a separate row
-            for version in versions:
-                detailed_stale_secrets.append({
-                    'SecretName': version['SecretName'],
-                    'LastAccessedDate': version['LastAccessedDate'],
-                    'LastChangedDate': version['LastChangedDate'],
-                    'Tags': version['Tags'],
-                    'VersionId': version['VersionId'],
-                    'VersionStages': version['VersionStages'],
-                    'VersionCreatedDate': version['VersionCreatedDate']
-                })
-        else:
-            uuids_without_audit_data += 1
-            # UUID not found in audit data - add with minimal info
-            detailed_stale_secrets.append({
-                'SecretName': uuid,
-                'LastAccessedDate': 'N/A',
-                'LastChangedDate': 'N/A',
-                'Tags': 'N/A',
-                'VersionId': 'N/A',
-                'VersionStages': 'N/A',
-                'VersionCreatedDate': 'N/A'
-            })
-    
-    # Write detailed stale secrets to CSV
-    output_path = script_dir / 'stale_secrets_detailed.csv'
-    with open(output_path, 'w', newline='', encoding='utf-8') as file:
-        fieldnames = ['SecretName', 'LastAccessedDate', 'LastChangedDate', 
-                     'Tags', 'VersionId', 'VersionStages', 'VersionCreatedDate']
-        writer = csv.DictWriter(file, fieldnames=fieldnames)
-        writer.writeheader()
-        
-        # Sort by SecretName for consistency
-        detailed_stale_secrets.sort(key=lambda x: x['SecretName'])
-        writer.writerows(detailed_stale_secrets)
+    total_output_rows = 0
+    sample_rows = []
+    io_start = time.perf_counter()
+    if output_format == 'scol':
+        # Columns are spilled to temporary files as rows arrive
+        output = DetailedTableWriter(output_path)
+        write_rows = output.extend
+    else:
+        output = open(output_path, 'w', newline='', encoding='utf-8')
+        writer = csv.writer(output)
+        writer.writerow(AUDIT_FIELDNAMES)
+        write_rows = writer.writerows
+
+    with output:
+        for uuid in sorted(stale_names):
+            versions = rows_by_uuid.pop(uuid, None)
+            if versions:
+                uuids_with_audit_data += 1
+            else:
+                uuids_without_audit_data += 1
+                # UUID not found in audit data - add with minimal info
+                versions = [(uuid,) + ('N/A',) * 6]
+            write_rows(versions)
+            total_output_rows += len(versions)
+            if len(sample_rows) < 5:
+                sample_rows.extend(versions[:5 - len(sample_rows)])
+    metrics.add_time('io', time.perf_counter() - io_start)
+    metrics.set(rows_out=total_output_rows)
     
     print(f"Detailed stale secrets saved to: {output_path}")
     print()
+
+    if attribution is not None:
+        provenance_path = script_dir / 'secrets_provenance.csv'
+        matrix_path = script_dir / 'source_overlap_matrix.csv'
+        with metrics.timer('io'):
+            write_provenance(attribution, aws_secrets, provenance_path, stale_source=AWS_SOURCE)
+            write_overlap_matrix(attribution, matrix_path, matrix)
+        print_overlap_matrix(attribution, matrix)
+        print(f"Secret provenance saved to: {provenance_path}")
+        print(f"Overlap matrix saved to: {matrix_path}")
+        print()
     
     # Print summary statistics
     print("Summary:")
     print(f"  Total stale UUIDs: {len(stale_uuids)}")
     print(f"  UUIDs with audit data: {uuids_with_audit_data}")
     print(f"  UUIDs without audit data: {uuids_without_audit_data}")
-    print(f"  Total rows in output (including all versions): {len(detailed_stale_secrets)}")
+    print(f"  Total rows in output (including all versions): {total_output_rows}")
     print()
     
     # Print first 5 stale secrets as examples with details
-    if detailed_stale_secrets:
+    if sample_rows and not quiet:
         print("Sample stale secrets (first 5):")
-        for i, secret in enumerate(detailed_stale_secrets[:5], 1):
-            print(f"\n  {i}. Secret Name (UUID): {secret['SecretName']}")
-            print(f"     Last Accessed: {secret['LastAccessedDate']}")
-            print(f"     Last Changed: {secret['LastChangedDate']}")
-            print(f"     Version Stage: {secret['VersionStages']}")
+        for i, secret in enumerate(sample_rows, 1):
+            print(f"\n  {i}. Secret Name (UUID): {secret[0]}")
+            print(f"     Last Accessed: {secret[1]}")
+            print(f"     Last Changed: {secret[2]}")
+            print(f"     Version Stage: {secret[5]}")
         
-        if len(detailed_stale_secrets) > 5:
-            print(f"\n  ... and {len(detailed_stale_secrets) - 5} more rows")
+        if total_output_rows > 5:
+            print(f"\n  ... and {total_output_rows - 5} more rows")
 
 if __name__ == '__main__':
-    detailed_stale_secrets = detect_stale_secrets_detailed()
+    parser = argparse.ArgumentParser(description="Detect stale AWS Key Vault secrets with audit details.")
+    parser.add_argument('--backend', choices=BACKENDS, default='set',
+                        help="'compact' stores UUIDs as sorted 128-bit integers to cut memory")
+    parser.add_argument('--input-format', choices=['csv', 'scol'], default='csv',
+                        help="Read key_vault_secrets.scol / secrets_full_audit.scol inputs")
+    parser.add_argument('--output-format', choices=['csv', 'scol'], default='csv',
+                        help="scol writes stale_secrets_detailed.scol with precomputed date keys")
+    parser.add_argument('--audit', default=None,
+                        help="Audit to join: CSV, .scol or a normalized audit store directory")
+    parser.add_argument('--provenance', action='store_true',
+                        help="Also write secrets_provenance.csv and source_overlap_matrix.csv "
+                             "from a single bitmask pass over all sources")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    with stage_metrics('detect_stale_secrets_detailed', args) as metrics:
+        detailed_stale_secrets = detect_stale_secrets_detailed(
+            backend=args.backend, input_format=args.input_format, output_format=args.output_format,
+            audit_path=args.audit, provenance=args.provenance, metrics=metrics, quiet=args.quiet,
+        )
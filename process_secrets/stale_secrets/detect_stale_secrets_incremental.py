@@ -0,0 +1,132 @@
+import argparse
+import csv
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common.sources import DB_FOLDERS
+from common.state_store import (
+    INVENTORY_SOURCE,
+    open_state_store,
+    read_delta_csv,
+)
+
+SOURCES = [INVENTORY_SOURCE] + DB_FOLDERS
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Detect stale secrets incrementally from a persistent state store."
+    )
+    parser.add_argument('--state', default=None,
+                        help="SQLite state file (default: stale_secrets/stale_state.sqlite)")
+    parser.add_argument('--delta', action='append', default=[], metavar='SOURCE=PATH',
+                        help="Delta CSV, the fastest input for daily runs (change,key_vault_secret_name with change 'added' or "
+                             "'removed') for one source; only the given sources change (repeatable). "
+                             f"Sources: {', '.join(SOURCES)}")
+    parser.add_argument('--input-format', choices=['csv', 'scol'], default='csv',
+                        help="Without --delta, diff the key_vault_secrets files changed since the "
+                             "last run against the state")
+    args = parser.parse_args()
+    deltas = {}
+    for spec in args.delta:
+        source, _, path = spec.partition('=')
+        if source not in SOURCES or not path:
+            parser.error(f"--delta expects SOURCE=PATH with SOURCE in {', '.join(SOURCES)}: {spec}")
+        deltas[source] = path
+    args.delta = deltas
+    return args
+
+def collect_deltas(store, base_dir, delta_paths, input_format):
+    """Read the given delta files, or diff the changed source files against the store."""
+    if delta_paths:
+        return {source: read_delta_csv(path) for source, path in delta_paths.items()}
+
+    paths = {}
+    for source in SOURCES:
+        path = base_dir / source / f'key_vault_secrets.{input_format}'
+        if not path.exists():
+            # A missing file must not look like every reference was removed
+            print(f"Warning: File not found - {path} (keeping the stored state of {source})")
+            continue
+        paths[source] = path
+    deltas = store.snapshot_deltas(paths)
+    unchanged = [source for source in paths if source not in deltas]
+    if unchanged:
+        print(f"Unchanged since the last run: {', '.join(unchanged)}")
+    return deltas
+
+def write_changes(output_path, result):
+    with open(output_path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(['change', 'key_vault_secret_name'])
+        writer.writerows(('newly_stale', name) for name in result.newly_stale)
+        writer.writerows(('no_longer_stale', name) for name in result.no_longer_stale)
+
+def main():
+    args = parse_args()
+    script_dir = Path(__file__).parent
+    base_dir = script_dir.parent
+    state_path = args.state or script_dir / 'stale_state.sqlite'
+
+    print("=" * 80)
+    print("Starting Incremental Stale Secrets Detection")
+    print("=" * 80)
+    print()
+
+    start = time.perf_counter()
+    with open_state_store(state_path) as store:
+        deltas = collect_deltas(store, base_dir, args.delta, args.input_format)
+        try:
+            result = store.apply(deltas)
+        except ValueError as e:
+            raise SystemExit(f"Error: {e}")
+        stale_names = store.stale_names()
+        active_by_source = store.active_by_source()
+
+    stale_output = script_dir / 'stale_secrets.csv'
+    with open(stale_output, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(['key_vault_secret_name'])
+        writer.writerows([name] for name in stale_names)
+    changes_output = script_dir / 'stale_secrets_changes.csv'
+    write_changes(changes_output, result)
+
+    print("Changes applied:")
+    for source, (added, removed) in result.changes_by_source.items():
+        print(f"  {source}: +{added} -{removed}")
+    print()
+
+    print("=" * 80)
+    print(f"Detection Complete: Found {result.stale} stale secrets "
+          f"in {time.perf_counter() - start:.2f}s")
+    print("=" * 80)
+    print()
+
+    print(f"State store: {state_path}" + (" (first run)" if result.first_run else ""))
+    print(f"Stale secrets saved to: {stale_output}")
+    print(f"Changes since the last run saved to: {changes_output}")
+    print()
+
+    print("Summary:")
+    print(f"  AWS Key Vault secrets: {result.inventory}")
+    print(f"  Stale secrets: {result.stale}")
+    print(f"  Newly stale: {len(result.newly_stale)}")
+    print(f"  No longer stale: {len(result.no_longer_stale)}")
+    print()
+
+    print("Active secrets by DB folder:")
+    for folder in DB_FOLDERS:
+        print(f"  {folder}: {active_by_source.get(folder, 0)} active secrets")
+    print()
+
+    if result.newly_stale and not result.first_run:
+        print("Newly stale secrets (first 10):")
+        for i, secret in enumerate(result.newly_stale[:10], 1):
+            print(f"  {i}. {secret}")
+        if len(result.newly_stale) > 10:
+            print(f"  ... and {len(result.newly_stale) - 10} more")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+import argparse
+import csv
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common.metrics import StageMetrics, add_metrics_arguments, stage_metrics
+from common.secret_sets import read_secrets_from_csv
+from common.sources import DB_FOLDERS
+
+def read_tagged_secrets_from_csv(csv_path):
+    """Read a region-tagged key_vault_secrets.csv into {(region, account): set of names}."""
+    secrets_by_target = defaultdict(set)
+    try:
+        with open(csv_path, 'r', encoding='utf-8') as file:
+            reader = csv.DictReader(file)
+            for row in reader:
+                secret_name = row.get('key_vault_secret_name', '').strip()
+                if secret_name:
+                    target = (row.get('region') or 'unknown', row.get('account') or 'default')
+                    secrets_by_target[target].add(secret_name)
+        total = sum(len(s) for s in secrets_by_target.values())
+        print(f"Loaded {total} secrets in {len(secrets_by_target)} region/account targets from {csv_path}")
+    except FileNotFoundError:
+        print(f"Warning: File not found - {csv_path}")
+    except Exception as e:
+        print(f"Error reading {csv_path}: {e}")
+    return secrets_by_target
+
+def detect_stale_secrets_multi_region(base_dir=None, metrics=None, quiet=False):
+    """
+    Detect stale secrets per region/account target of a merged AWS inventory.
+
+    The DB reference sets are loaded once and compared against every target.
+    base_dir is the process_secrets folder (default: this script's parent).
+    Counters, the cross-target totals and parse/compute/io timings are
+    recorded on metrics.
+    """
+    if metrics is None:
+        metrics = StageMetrics('detect_stale_secrets_multi_region')
+    base_dir = Path(base_dir) if base_dir is not None else Path(__file__).parent.parent
+    script_dir = base_dir / 'stale_secrets'
+
+    # Region-tagged output of extract_aws_key_vault_secret_refs.py on a --target scan
+    aws_csv_path = base_dir / 'aws_key_vault' / 'key_vault_secrets.csv'
+
+    db_folders = DB_FOLDERS
+
+    print("=" * 80)
+    print("Starting Multi-Region Stale Secrets Detection")
+    print("=" * 80)
+    print()
+
+    print(f"Reading AWS Key Vault secrets from: {aws_csv_path}")
+    with metrics.timer('parse'):
+        aws_secrets_by_target = read_tagged_secrets_from_csv(aws_csv_path)
+    print()
+
+    all_db_secrets = set()
+    db_secrets_by_folder = {}
+    print("Reading secrets from DB folders:")
+    for folder in db_folders:
+        db_csv_path = base_dir / folder / 'key_vault_secrets.csv'
+        print(f"  - {folder}")
+        with metrics.timer('parse'):
+            db_secrets = read_secrets_from_csv(db_csv_path)
+        db_secrets_by_folder[folder] = db_secrets
+        all_db_secrets.update(db_secrets)
+
+    print()
+    print(f"Total unique secrets across all DB folders: {len(all_db_secrets)}")
+    print()
+
+    with metrics.timer('compute'):
+        stale_by_target = {}
+        for target in sorted(aws_secrets_by_target):
+            stale_by_target[target] = aws_secrets_by_target[target] - all_db_secrets
+
+    output_path = script_dir / 'stale_secrets_by_region.csv'
+    with metrics.timer('io'), open(output_path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(['key_vault_secret_name', 'region', 'account'])
+        for (region, account), stale_secrets in stale_by_target.items():
+            for secret in sorted(stale_secrets):
+                writer.writerow([secret, region, account])
+
+    print(f"Stale secrets saved to: {output_path}")
+    print()
+
+    # Per region summary
+    for (region, account), stale_secrets in stale_by_target.items():
+        aws_secrets = aws_secrets_by_target[(region, account)]
+        print(f"Region {region} (account {account}):")
+        print(f"  AWS Key Vault secrets: {len(aws_secrets)}")
+        print(f"  Stale secrets: {len(stale_secrets)}")
+        print(f"  Active secrets: {len(aws_secrets) - len(stale_secrets)}")
+        if not quiet:
+            for folder in db_folders:
+                active_count = len(aws_secrets & db_secrets_by_folder[folder])
+                print(f"    {folder}: {active_count} active secrets")
+        print()
+
+    # Cross region summary
+    with metrics.timer('compute'):
+        all_aws_secrets = set().union(*aws_secrets_by_target.values())
+        all_stale_secrets = set().union(*stale_by_target.values())
+        target_count = defaultdict(int)
+        for aws_secrets in aws_secrets_by_target.values():
+            for secret in aws_secrets:
+                target_count[secret] += 1
+        in_several_targets = sum(1 for count in target_count.values() if count > 1)
+    stale_rows = sum(len(s) for s in stale_by_target.values())
+
+    print("Across all regions:")
+    print(f"  Region/account targets: {len(aws_secrets_by_target)}")
+    print(f"  Distinct AWS Key Vault secrets: {len(all_aws_secrets)}")
+    print(f"  Secrets present in more than one target: {in_several_targets}")
+    print(f"  Stale rows (secret x target): {stale_rows}")
+    print(f"  Distinct stale secrets: {len(all_stale_secrets)}")
+    print(f"  Distinct active secrets: {len(all_aws_secrets) - len(all_stale_secrets)}")
+
+    metrics.set(rows_in=sum(len(s) for s in aws_secrets_by_target.values()), rows_out=stale_rows,
+                targets=len(aws_secrets_by_target), distinct_secrets=len(all_aws_secrets),
+                in_several_targets=in_several_targets, distinct_stale=len(all_stale_secrets))
+
+    return stale_by_target
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Detect stale AWS Key Vault secrets per region/account target.")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    with stage_metrics('detect_stale_secrets_multi_region', args) as metrics:
+        stale_by_target = detect_stale_secrets_multi_region(metrics=metrics, quiet=args.quiet)
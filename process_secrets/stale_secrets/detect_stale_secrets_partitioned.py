@@ -0,0 +1,93 @@
+import argparse
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common.partitioned import DEFAULT_MEMORY_BUDGET_MB, detect_stale_partitioned
+from common.sources import DB_FOLDERS
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Detect stale secrets out of core by hash-partitioning the inputs into buckets."
+    )
+    parser.add_argument('--memory-budget-mb', type=int, default=DEFAULT_MEMORY_BUDGET_MB,
+                        help="Memory the bucket workers may use together (picks the bucket count)")
+    parser.add_argument('--buckets', type=int, default=None,
+                        help="Number of buckets (default: derived from --memory-budget-mb)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes (default: all CPUs)")
+    parser.add_argument('--work-dir', default=None,
+                        help="Directory for the bucket files (default: a temporary directory)")
+    parser.add_argument('--no-detailed', action='store_true',
+                        help="Only write stale_secrets.csv")
+    parser.add_argument('--input-format', choices=['csv', 'scol'], default='csv',
+                        help="Read key_vault_secrets.scol / secrets_full_audit.scol inputs")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    script_dir = Path(__file__).parent
+    base_dir = script_dir.parent
+
+    input_name = f'key_vault_secrets.{args.input_format}'
+    aws_csv_path = base_dir / 'aws_key_vault' / input_name
+    full_audit_csv_path = base_dir / 'aws_key_vault' / f'secrets_full_audit.{args.input_format}'
+    db_csv_paths = {folder: base_dir / folder / input_name for folder in DB_FOLDERS}
+    stale_output = script_dir / 'stale_secrets.csv'
+    detailed_output = None if args.no_detailed else script_dir / 'stale_secrets_detailed.csv'
+
+    print("=" * 80)
+    print("Starting Partitioned Stale Secrets Detection")
+    print("=" * 80)
+    print()
+
+    for path in [aws_csv_path] + list(db_csv_paths.values()):
+        if not path.exists():
+            print(f"Warning: File not found - {path}")
+
+    work_dir = Path(args.work_dir or tempfile.mkdtemp(prefix='stale_buckets_'))
+    work_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        buckets, totals = detect_stale_partitioned(
+            aws_csv_path, db_csv_paths, work_dir, stale_output,
+            audit_csv_path=full_audit_csv_path, detailed_output=detailed_output,
+            buckets=args.buckets, workers=args.workers, memory_budget_mb=args.memory_budget_mb,
+        )
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"Partitioned inputs into {buckets} buckets")
+    print()
+    print("=" * 80)
+    print(f"Detection Complete: Found {totals['stale']} stale secrets")
+    print("=" * 80)
+    print()
+
+    print(f"Stale secrets saved to: {stale_output}")
+    if detailed_output is not None:
+        print(f"Detailed stale secrets saved to: {detailed_output}")
+    print()
+
+    print("Summary:")
+    print(f"  AWS Key Vault secrets: {totals['aws']}")
+    print(f"  DB folder secrets: {totals['db']}")
+    print(f"  Stale secrets: {totals['stale']}")
+    print(f"  Active secrets: {totals['active']}")
+    if detailed_output is not None:
+        print(f"  UUIDs with audit data: {totals['with_audit']}")
+        print(f"  UUIDs without audit data: {totals['without_audit']}")
+        print(f"  Total rows in detailed output (including all versions): {totals['rows']}")
+    print()
+
+    print("Active secrets by DB folder:")
+    for folder, active_count in totals['active_by_folder'].items():
+        print(f"  {folder}: {active_count} active secrets")
+
+if __name__ == '__main__':
+    main()
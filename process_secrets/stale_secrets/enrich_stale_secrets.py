@@ -0,0 +1,95 @@
+import argparse
+import csv
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common.audit_collector import fetch_version_rows, read_inventory_csv
+from common.aws_secrets import (
+    AUDIT_FIELDNAMES,
+    DEFAULT_REGION,
+    DEFAULT_WORKERS,
+    create_secretsmanager_client,
+)
+from common.secret_sets import read_secrets_from_csv
+
+def parse_args():
+    script_dir = Path(__file__).parent
+    parser = argparse.ArgumentParser(
+        description="Phase 2 of lazy detection: fetch version history for stale secrets only."
+    )
+    parser.add_argument('--stale-input', default=str(script_dir / 'stale_secrets.csv'),
+                        help="Output of detect_stale_secrets.py")
+    parser.add_argument('--inventory',
+                        default=str(script_dir.parent / 'aws_key_vault' / 'secrets_inventory.csv'),
+                        help="Names-only inventory from collect_secrets_from_aws_key_vault.py --names-only")
+    parser.add_argument('--output', default=str(script_dir / 'stale_secrets_detailed.csv'))
+    parser.add_argument('--region', default=DEFAULT_REGION)
+    parser.add_argument('--profile', default=None)
+    parser.add_argument('--endpoint-url', default=None)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    return parser.parse_args()
+
+def enrich_stale_secrets(client, stale_input, inventory_path, output_path, workers=DEFAULT_WORKERS):
+    """
+    Write stale_secrets_detailed.csv by fetching versions for the stale secrets only.
+    """
+    print("=" * 80)
+    print("Enriching Stale Secrets with Version History")
+    print("=" * 80)
+    print()
+
+    print(f"Reading stale secrets from: {stale_input}")
+    stale_uuids = read_secrets_from_csv(stale_input)
+    print(f"Reading secret inventory from: {inventory_path}")
+    inventory = read_inventory_csv(inventory_path)
+    print(f"Loaded {len(inventory)} secrets from inventory")
+    print()
+
+    metadata_by_name = {name: inventory[name] for name in stale_uuids if name in inventory}
+    print(f"Fetching versions for {len(metadata_by_name)} of {len(inventory)} secrets...")
+    rows_by_name, errors = fetch_version_rows(client, metadata_by_name, workers=workers)
+    for name, error in errors.items():
+        print(f"Error: could not list versions of {name}: {error}")
+    print()
+
+    # Same layout as detect_stale_secrets_detailed.py: all versions, N/A when unknown
+    detailed_stale_secrets = []
+    uuids_without_audit_data = 0
+    for uuid in sorted(stale_uuids):
+        if uuid in rows_by_name:
+            detailed_stale_secrets.extend(rows_by_name[uuid])
+        elif uuid in metadata_by_name:
+            detailed_stale_secrets.append(list(metadata_by_name[uuid]) + ['N/A', 'N/A', 'N/A'])
+        else:
+            uuids_without_audit_data += 1
+            detailed_stale_secrets.append([uuid] + ['N/A'] * 6)
+
+    with open(output_path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(AUDIT_FIELDNAMES)
+        writer.writerows(detailed_stale_secrets)
+
+    print(f"Detailed stale secrets saved to: {output_path}")
+    print()
+
+    print("Summary:")
+    print(f"  Total stale UUIDs: {len(stale_uuids)}")
+    print(f"  UUIDs with audit data: {len(rows_by_name)}")
+    print(f"  UUIDs without audit data: {uuids_without_audit_data}")
+    print(f"  UUIDs whose version lookup failed: {len(errors)}")
+    print(f"  Total rows in output (including all versions): {len(detailed_stale_secrets)}")
+    if inventory:
+        skipped = len(inventory) - len(metadata_by_name)
+        print(f"  Version lookups skipped: {skipped} of {len(inventory)} "
+              f"({skipped / len(inventory):.1%})")
+
+    return errors
+
+if __name__ == '__main__':
+    args = parse_args()
+    client = create_secretsmanager_client(args.region, args.endpoint_url, args.profile)
+    errors = enrich_stale_secrets(client, args.stale_input, args.inventory, args.output,
+                                  workers=args.workers)
+    sys.exit(1 if errors else 0)
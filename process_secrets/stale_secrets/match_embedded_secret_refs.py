@@ -0,0 +1,111 @@
+import argparse
+import csv
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common.multi_pattern import DEFAULT_MIN_LENGTH, EmbeddedNameMatcher
+from common.secret_sets import iter_secret_names
+from common.sources import DB_FOLDERS
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Find AWS secret names (UUID and non-UUID) embedded in DB reference values."
+    )
+    parser.add_argument('--source', action='append', default=[], metavar='SOURCE=PATH',
+                        help="Reference CSV (key_vault_secret_name column) to scan; repeatable "
+                             "(default: every DB folder's key_vault_secrets.csv)")
+    parser.add_argument('--min-length', type=int, default=DEFAULT_MIN_LENGTH,
+                        help="Ignore AWS names shorter than this (they match almost anywhere)")
+    parser.add_argument('--output', default=None,
+                        help="Default: embedded_secret_matches.csv in this directory")
+    return parser.parse_args()
+
+def read_aws_names(aws_dir):
+    """UUID names from key_vault_secrets.csv and non-UUID names from non_uuid_secret_names.csv."""
+    names = set()
+    for path, column in [(aws_dir / 'key_vault_secrets.csv', 'key_vault_secret_name'),
+                         (aws_dir / 'non_uuid_secret_names.csv', 'SecretName')]:
+        if not path.exists():
+            print(f"Warning: File not found - {path}")
+            continue
+        before = len(names)
+        names.update(iter_secret_names(path, column))
+        print(f"Loaded {len(names) - before} AWS secret names from {path}")
+    return names
+
+def main():
+    args = parse_args()
+    script_dir = Path(__file__).parent
+    base_dir = script_dir.parent
+    output_path = Path(args.output) if args.output else script_dir / 'embedded_secret_matches.csv'
+
+    if args.source:
+        sources = {}
+        for spec in args.source:
+            name, sep, path = spec.partition('=')
+            if not sep:
+                raise SystemExit(f"--source expects SOURCE=PATH: {spec}")
+            sources[name] = Path(path)
+    else:
+        sources = {folder: base_dir / folder / 'key_vault_secrets.csv' for folder in DB_FOLDERS}
+
+    print("=" * 80)
+    print("Matching AWS Secret Names Embedded in DB References")
+    print("=" * 80)
+    print()
+
+    aws_names = read_aws_names(base_dir / 'aws_key_vault')
+    start = time.perf_counter()
+    matcher = EmbeddedNameMatcher(aws_names, args.min_length)
+    print(f"Indexed {len(matcher.uuid_names)} UUID names and "
+          f"{len(matcher.automaton or ())} other names in {time.perf_counter() - start:.2f}s "
+          f"({matcher.skipped} names shorter than {args.min_length} skipped)")
+    print()
+
+    matched_names = set()
+    summary = {}
+    with open(output_path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(['source', 'reference', 'secret_name'])
+        for source, path in sources.items():
+            if not path.exists():
+                print(f"Warning: File not found - {path}")
+                continue
+            start = time.perf_counter()
+            references = matched_references = 0
+            source_names = set()
+            for reference in iter_secret_names(path):
+                references += 1
+                found = matcher.match(reference)
+                if found:
+                    matched_references += 1
+                    source_names |= found
+                    writer.writerows((source, reference, name) for name in sorted(found))
+            matched_names |= source_names
+            summary[source] = (references, matched_references, len(source_names),
+                               time.perf_counter() - start)
+
+    print("Summary:")
+    for source, (references, matched_references, names, seconds) in summary.items():
+        print(f"  {source}: {matched_references} of {references} references contain "
+              f"{names} AWS secret names ({seconds:.2f}s)")
+    print(f"  AWS secret names found in any reference: {len(matched_names)}")
+    print()
+
+    stale_path = script_dir / 'stale_secrets.csv'
+    if stale_path.exists():
+        embedded_stale = sorted(set(iter_secret_names(stale_path)) & matched_names)
+        print(f"Stale secrets that appear embedded in a reference: {len(embedded_stale)}")
+        for i, name in enumerate(embedded_stale[:10], 1):
+            print(f"  {i}. {name}")
+        if len(embedded_stale) > 10:
+            print(f"  ... and {len(embedded_stale) - 10} more")
+        print()
+
+    print(f"Matches saved to: {output_path}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+import argparse
+import csv
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common.pipeline import AWS_SOURCE
+from common.secret_sets import iter_secret_names
+from common.snapshot_history import Snapshot, open_snapshot_history
+from common.sources import DB_FOLDERS
+
+def parse_args():
+    script_dir = Path(__file__).parent
+    parser = argparse.ArgumentParser(
+        description="Record pipeline runs in the snapshot history and diff any two of them."
+    )
+    parser.add_argument('--history', default=str(script_dir / 'snapshot_history.sqlite'),
+                        help="SQLite history file (run_pipeline.py --history-db writes the same format)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record = commands.add_parser('record', help="Append the current key_vault_secrets files and "
+                                                "stale_secrets.csv as a run")
+    record.add_argument('--label', default='', help="Free-form note stored with the run")
+    record.add_argument('--stale', default=str(script_dir / 'stale_secrets.csv'))
+    record.add_argument('--input-format', choices=['csv', 'scol'], default='csv')
+
+    commands.add_parser('runs', help="List the recorded runs")
+
+    diff = commands.add_parser('diff', help="What changed between two runs (default: the last two)")
+    diff.add_argument('from_run', nargs='?', type=int)
+    diff.add_argument('to_run', nargs='?', type=int)
+    diff.add_argument('--output', default=None,
+                      help="Also write change,source,key_vault_secret_name rows to this CSV")
+    diff.add_argument('--quiet', action='store_true', help="Print counts only")
+    args = parser.parse_args()
+    if args.command == 'diff' and (args.from_run is None) != (args.to_run is None):
+        parser.error("diff takes two run ids or none")
+    return args
+
+def read_snapshot(base_dir, stale_path, input_format='csv'):
+    """Snapshot of the current key_vault_secrets files; sources without a file are left out."""
+    inventory_path = base_dir / AWS_SOURCE / f'key_vault_secrets.{input_format}'
+    inventory = set(iter_secret_names(inventory_path))
+    references = {}
+    for folder in DB_FOLDERS:
+        path = base_dir / folder / f'key_vault_secrets.{input_format}'
+        if not path.exists():
+            # Keeps the source's previous references instead of recording them all as removed
+            print(f"Warning: File not found - {path} (not recorded)")
+            continue
+        references[folder] = set(iter_secret_names(path))
+    return Snapshot(inventory, references, iter_secret_names(stale_path))
+
+def record(history, args, base_dir):
+    for path in [base_dir / AWS_SOURCE / f'key_vault_secrets.{args.input_format}', Path(args.stale)]:
+        if not path.exists():
+            raise SystemExit(f"Error: File not found - {path}")
+    snapshot = read_snapshot(base_dir, Path(args.stale), args.input_format)
+    run_id, changes = history.record(snapshot, args.label)
+    print(f"Recorded run {run_id}: {len(snapshot.inventory)} inventory, {len(snapshot.stale)} stale")
+    for (kind, source), (added, removed) in changes.items():
+        print(f"  {kind + (':' + source if source else ''):<40} +{added} -{removed}")
+
+def list_runs(history):
+    runs = history.runs()
+    if not runs:
+        print("No runs recorded")
+    for run_id, recorded_at, label, counts in runs:
+        sizes = ', '.join(f"{name}={count}" for name, count in counts.items())
+        print(f"  {run_id:>4}  {recorded_at}  {sizes}" + (f"  ({label})" if label else ""))
+
+def print_names(title, names, quiet):
+    print(f"{title}: {len(names)}")
+    if quiet:
+        return
+    for name in names[:10]:
+        print(f"  {name}")
+    if len(names) > 10:
+        print(f"  ... and {len(names) - 10} more")
+
+def diff(history, args):
+    if args.from_run is None:
+        latest = history.latest_runs(2)
+        if len(latest) < 2:
+            raise SystemExit("Error: need at least two recorded runs")
+        args.from_run, args.to_run = latest
+    start = time.perf_counter()
+    try:
+        result = history.diff(args.from_run, args.to_run)
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+    print(f"Changes from run {result.from_run} to run {result.to_run} "
+          f"({time.perf_counter() - start:.3f}s):")
+    print()
+    print_names("Newly stale", result.newly_stale, args.quiet)
+    print_names("Resurrected (stale, now referenced again)", result.resurrected, args.quiet)
+    print_names("Deleted from the inventory", result.deleted, args.quiet)
+    print_names("Added to the inventory", result.added, args.quiet)
+    for source in DB_FOLDERS:
+        new = result.new_references.get(source, [])
+        removed = result.removed_references.get(source, [])
+        if new or removed:
+            print(f"References in {source}: +{len(new)} -{len(removed)}")
+    if args.output:
+        with open(args.output, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(['change', 'source', 'key_vault_secret_name'])
+            writer.writerows(result.rows())
+        print()
+        print(f"Changes saved to: {args.output}")
+
+def main():
+    args = parse_args()
+    base_dir = Path(__file__).parent.parent
+    with open_snapshot_history(args.history) as history:
+        if args.command == 'record':
+            record(history, args, base_dir)
+        elif args.command == 'runs':
+            list_runs(history)
+        else:
+            diff(history, args)
+
+if __name__ == '__main__':
+    main()
@@ -1,45 +1,54 @@
+import argparse
 import csv
+import sys
+import time
 from pathlib import Path
-from datetime import datetime
 
-def parse_date(date_str):
-    """Parse date string and return datetime object for sorting. Handle 'Never' and 'N/A' cases."""
-    if not date_str or date_str.strip().upper() in ['NEVER', 'N/A', '']:
-        # Return a very old date for 'Never' or 'N/A' so they appear at the bottom when sorted descending
-        return datetime(1900, 1, 1)
-    
-    try:
-        # Parse ISO format dates and remove timezone info for comparison
-        dt = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-        # Return naive datetime (without timezone) for consistent comparison
-        return dt.replace(tzinfo=None)
-    except Exception:
-        # If parsing fails, return old date
-        return datetime(1900, 1, 1)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-def sort_stale_secrets():
+from common.metrics import StageMetrics, add_metrics_arguments, stage_metrics
+from common.stale_sort import (
+    DEFAULT_MEMORY_BUDGET_MB,
+    SORT_CONFIGS,
+    SORT_FIELDNAMES,
+    ExternalSort,
+    read_sort_columns,
+    write_index_view,
+    write_sorted_csv,
+)
+
+def sort_stale_secrets(input_file=None, output_dir=None, index_view=False, top=None,
+                       metrics=None, quiet=False):
     """
     Sort stale_secrets_detailed.csv by different date fields and create separate output files.
+
+    Dates are parsed once into integer key columns and every ordering is a
+    permutation of row numbers. With index_view, only compact row-order
+    index files are written next to a byte-offset index of the input; top
+    limits every ordering to its first N rows (computed with a heap).
+    metrics (a StageMetrics) receives the row counts and parse / sort / io
+    times; quiet skips the top entries of every ordering.
     """
+    if metrics is None:
+        metrics = StageMetrics('sort_stale_secrets')
     script_dir = Path(__file__).parent
-    input_file = script_dir / 'stale_secrets_detailed.csv'
+    input_file = Path(input_file) if input_file else script_dir / 'stale_secrets_detailed.csv'
+    output_dir = Path(output_dir) if output_dir else script_dir
     
     print("=" * 80)
     print("Sorting Stale Secrets by Date Fields")
     print("=" * 80)
     print()
     
-    # Read the input CSV
+    # Read the input CSV, parsing every date column once
     print(f"Reading from: {input_file}")
-    secrets = []
     
     try:
-        with open(input_file, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                secrets.append(row)
+        with metrics.timer('parse'):
+            columns = read_sort_columns(input_file, with_offsets=index_view)
+        metrics.set(rows_in=len(columns), rows_out=0)
         
-        print(f"Loaded {len(secrets)} secret records")
+        print(f"Loaded {len(columns)} secret records")
         print()
     except FileNotFoundError:
         print(f"Error: File not found - {input_file}")
@@ -49,69 +58,153 @@ def sort_stale_secrets():
         print(f"Error reading file: {e}")
         return
     
-    if not secrets:
+    if not len(columns):
         print("No secrets found in the input file.")
         return
     
     # Define the sort configurations
-    sort_configs = [
-        {
-            'field': 'LastAccessedDate',
-            'output_file': 'stale_secrets_by_last_accessed.csv',
-            'description': 'Last Accessed Date'
-        },
-        {
-            'field': 'LastChangedDate',
-            'output_file': 'stale_secrets_by_last_changed.csv',
-            'description': 'Last Changed Date'
-        },
-        {
-            'field': 'VersionCreatedDate',
-            'output_file': 'stale_secrets_by_version_created.csv',
-            'description': 'Version Created Date'
-        }
-    ]
+    sort_configs = SORT_CONFIGS
+    orders = {}
     
     # Sort and save for each configuration
     for config in sort_configs:
         field = config['field']
-        output_file = script_dir / config['output_file']
         description = config['description']
         
         print(f"Sorting by {description} (descending)...")
         
-        # Sort by the date field in descending order (most recent first)
-        sorted_secrets = sorted(
-            secrets,
-            key=lambda x: parse_date(x.get(field, '')),
-            reverse=True
-        )
+        # Row numbers by the date key in descending order (most recent first)
+        with metrics.timer('sort'):
+            order = columns.order(field, top)
+        orders[field] = order
+        metrics.counters['rows_out'] += len(order)
         
-        # Write to output file
-        with open(output_file, 'w', newline='', encoding='utf-8') as file:
-            fieldnames = ['SecretName', 'LastAccessedDate', 'LastChangedDate', 
-                         'Tags', 'VersionId', 'VersionStages', 'VersionCreatedDate']
-            writer = csv.DictWriter(file, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(sorted_secrets)
-        
-        print(f"  ✓ Saved to: {output_file}")
+        if not index_view:
+            output_file = output_dir / config['output_file']
+            with metrics.timer('io'):
+                write_sorted_csv(columns, order, output_file)
+            print(f"  ✓ Saved to: {output_file}")
         
         # Show top 3 entries
+        if quiet:
+            print()
+            continue
         print(f"  Top 3 entries by {description}:")
-        for i, secret in enumerate(sorted_secrets[:3], 1):
-            date_value = secret.get(field, 'N/A')
-            secret_name = secret.get('SecretName', 'N/A')
+        for i, row_number in enumerate(order[:3], 1):
+            secret = dict(zip(SORT_FIELDNAMES, columns.rows[row_number]))
+            date_value = secret[field]
+            secret_name = secret['SecretName']
             print(f"    {i}. {secret_name[:40]}... - {date_value}")
         print()
     
+    if index_view:
+        with metrics.timer('io'):
+            manifest_path = write_index_view(columns, orders, input_file, output_dir, top)
+        print(f"Index view saved to: {manifest_path}")
+        print()
+    
     print("=" * 80)
     print("Sorting Complete!")
     print("=" * 80)
     print()
     print("Output files created:")
     for config in sort_configs:
+        output_name = config['index_file'] if index_view else config['output_file']
+        print(f"  - {output_name} (sorted by {config['description']})")
+
+def sort_stale_secrets_external(input_file=None, output_dir=None,
+                                memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, top=None,
+                                metrics=None, quiet=False):
+    """
+    Same outputs as sort_stale_secrets(), for inputs larger than memory.
+
+    Sorted runs of at most memory_budget_mb are spilled to temporary files
+    and k-way merged into each output file. Reading, sorting and spilling
+    the runs is timed as 'runs', merging and writing the outputs as 'merge'.
+    """
+    if metrics is None:
+        metrics = StageMetrics('sort_stale_secrets')
+    script_dir = Path(__file__).parent
+    input_file = Path(input_file) if input_file else script_dir / 'stale_secrets_detailed.csv'
+    output_dir = Path(output_dir) if output_dir else script_dir
+
+    print("=" * 80)
+    print("Sorting Stale Secrets by Date Fields (external merge sort)")
+    print("=" * 80)
+    print()
+
+    print(f"Reading from: {input_file}")
+    if not input_file.exists():
+        print(f"Error: File not found - {input_file}")
+        print("Please run detect_stale_secrets_detailed.py first to generate the input file.")
+        return
+
+    fields = [config['field'] for config in SORT_CONFIGS]
+    start = time.perf_counter()
+    with ExternalSort(input_file, fields, memory_budget_mb, temp_dir=output_dir) as (count, ordered):
+        metrics.add_time('runs', time.perf_counter() - start)
+        metrics.set(rows_in=count, rows_out=0)
+        print(f"Loaded {count} secret records")
+        print()
+        if not count:
+            print("No secrets found in the input file.")
+            return
+
+        for config in SORT_CONFIGS:
+            field = config['field']
+            output_file = output_dir / config['output_file']
+            description = config['description']
+
+            print(f"Merging sorted runs by {description} (descending)...")
+            top_rows = []
+            with metrics.timer('merge'), open(output_file, 'w', newline='', encoding='utf-8') as file:
+                writer = csv.writer(file)
+                writer.writerow(SORT_FIELDNAMES)
+                for written, row in enumerate(ordered[field]):
+                    if top is not None and written >= top:
+                        break
+                    writer.writerow(row)
+                    metrics.counters['rows_out'] += 1
+                    if written < 3:
+                        top_rows.append(dict(zip(SORT_FIELDNAMES, row)))
+
+            print(f"  ✓ Saved to: {output_file}")
+            if quiet:
+                print()
+                continue
+            print(f"  Top 3 entries by {description}:")
+            for i, secret in enumerate(top_rows, 1):
+                print(f"    {i}. {secret['SecretName'][:40]}... - {secret[field]}")
+            print()
+
+    print("=" * 80)
+    print("Sorting Complete!")
+    print("=" * 80)
+    print()
+    print("Output files created:")
+    for config in SORT_CONFIGS:
         print(f"  - {config['output_file']} (sorted by {config['description']})")
 
 if __name__ == '__main__':
-    sort_stale_secrets()
+    parser = argparse.ArgumentParser(description="Sort stale_secrets_detailed.csv by date fields.")
+    parser.add_argument('--input', default=None, help="Default: stale_secrets_detailed.csv")
+    parser.add_argument('--output-dir', default=None, help="Default: this script's directory")
+    parser.add_argument('--index-view', action='store_true',
+                        help="Write binary row-order index files instead of three CSV copies")
+    parser.add_argument('--top', type=int, default=None,
+                        help="Keep only the N most recent rows of every ordering")
+    parser.add_argument('--external', action='store_true',
+                        help="External merge sort for inputs larger than memory")
+    parser.add_argument('--memory-budget-mb', type=int, default=DEFAULT_MEMORY_BUDGET_MB,
+                        help="Size of the sorted runs in --external mode")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    if args.external and args.index_view:
+        parser.error("--index-view needs the rows in memory; it cannot be combined with --external")
+    with stage_metrics('sort_stale_secrets', args) as metrics:
+        if args.external:
+            sort_stale_secrets_external(args.input, args.output_dir, args.memory_budget_mb, args.top,
+                                        metrics=metrics, quiet=args.quiet)
+        else:
+            sort_stale_secrets(args.input, args.output_dir, args.index_view, args.top,
+                               metrics=metrics, quiet=args.quiet)
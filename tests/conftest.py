@@ -0,0 +1,19 @@
+import csv
+import os
+import sys
+
+import pytest
+
+# The scripts under process_secrets/ import the shared helpers as ``common``.
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "process_secrets"))
+
+
+@pytest.fixture
+def write_names():
+    """Write a key_vault_secrets CSV: a key_vault_secret_name header and one name per row."""
+    def write(path, names):
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(["key_vault_secret_name"])
+            writer.writerows([name] for name in names)
+    return write
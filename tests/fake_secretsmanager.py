@@ -0,0 +1,98 @@
+"""In-process stand-in for the Secrets Manager API used by the tests."""
+
+import threading
+from datetime import datetime, timezone
+
+
+class FakeClientError(Exception):
+    def __init__(self, code, message=''):
+        super().__init__(code)
+        self.response = {'Error': {'Code': code, 'Message': message}}
+
+
+class FakeSecretsManager:
+    """Serves list-secrets/list-secret-version-ids/delete-secret from a dict, with paging and throttling."""
+
+    def __init__(self, secrets, page_size=2, throttle_every=0, list_secrets_limit=None):
+        # secrets: {name: {'versions': [...], 'tags': {...}, 'last_accessed': datetime|None}}
+        self.secrets = secrets
+        self.names = sorted(secrets)
+        self.page_size = page_size
+        self.throttle_every = throttle_every
+        # Simulates a crash: list_secrets raises once it has been called this many times
+        self.list_secrets_limit = list_secrets_limit
+        self.calls = {'list_secrets': 0, 'list_secret_version_ids': 0, 'delete_secret': 0}
+        # Names scheduled for deletion -> recovery window in days (None when forced)
+        self.deleted = {}
+        # Simulates a crash: delete_secret raises once it has been called this many times
+        self.delete_limit = None
+        self.version_calls = []
+        self._lock = threading.Lock()
+        self._count = 0
+
+    def _maybe_throttle(self):
+        with self._lock:
+            self._count += 1
+            if self.throttle_every and self._count % self.throttle_every == 0:
+                raise FakeClientError('ThrottlingException')
+
+    def list_secrets(self, MaxResults=100, NextToken=None):
+        self._maybe_throttle()
+        if self.list_secrets_limit is not None and self.calls['list_secrets'] >= self.list_secrets_limit:
+            raise ConnectionError("connection reset")
+        self.calls['list_secrets'] += 1
+        start = int(NextToken) if NextToken else 0
+        names = self.names[start:start + min(MaxResults, self.page_size)]
+        response = {'SecretList': [self._describe(name) for name in names]}
+        if start + len(names) < len(self.names):
+            response['NextToken'] = str(start + len(names))
+        return response
+
+    def list_secret_version_ids(self, SecretId, MaxResults=100, NextToken=None):
+        self._maybe_throttle()
+        with self._lock:
+            self.calls['list_secret_version_ids'] += 1
+            self.version_calls.append(SecretId)
+        if SecretId not in self.secrets:
+            raise FakeClientError('ResourceNotFoundException')
+        versions = []
+        for version_id, stages in self.secrets[SecretId].get('versions', []):
+            versions.append({
+                'VersionId': version_id,
+                'VersionStages': stages,
+                'CreatedDate': datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+            })
+        return {'Versions': versions}
+
+    def delete_secret(self, SecretId, RecoveryWindowInDays=None, ForceDeleteWithoutRecovery=False):
+        self._maybe_throttle()
+        with self._lock:
+            if self.delete_limit is not None and self.calls['delete_secret'] >= self.delete_limit:
+                raise ConnectionError("connection reset")
+            self.calls['delete_secret'] += 1
+            if RecoveryWindowInDays is not None and ForceDeleteWithoutRecovery:
+                raise FakeClientError('InvalidParameterException')
+            if SecretId not in self.secrets:
+                raise FakeClientError('ResourceNotFoundException')
+            if SecretId in self.deleted:
+                raise FakeClientError('InvalidRequestException',
+                                      "You can't perform this operation on the secret because "
+                                      "it was marked for deletion.")
+            if ForceDeleteWithoutRecovery:
+                del self.secrets[SecretId]
+                self.names.remove(SecretId)
+                self.deleted[SecretId] = None
+            else:
+                self.deleted[SecretId] = RecoveryWindowInDays or 30
+        return {'Name': SecretId}
+
+    def _describe(self, name):
+        secret = self.secrets[name]
+        entry = {'Name': name}
+        if secret.get('last_accessed'):
+            entry['LastAccessedDate'] = secret['last_accessed']
+        if secret.get('last_changed'):
+            entry['LastChangedDate'] = secret['last_changed']
+        if secret.get('tags'):
+            entry['Tags'] = [{'Key': k, 'Value': v} for k, v in secret['tags'].items()]
+        return entry
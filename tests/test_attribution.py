@@ -0,0 +1,33 @@
+"""Tests for the bitmask source attribution engine."""
+
+import csv
+
+from common.attribution import attribute, write_provenance
+
+
+def test_masks_matrix_and_stale_set_come_from_one_pass(tmp_path):
+    sources = {
+        "aws": {"a", "b", "c", "d"},
+        "app": {"a", "b", "x"},
+        "rudder": {"b", "c"},
+    }
+    attribution = attribute(sources)
+
+    assert attribution.sources_of(attribution.mask("b")) == ["aws", "app", "rudder"]
+    assert attribution.mask("missing") == 0
+    assert attribution.names_with(["aws"], excluded=["app", "rudder"]) == {"d"}
+    assert attribution.count_any(["app", "rudder"]) == 4
+    histogram = attribution.histogram()
+    assert attribution.count_any(["app", "rudder"], histogram) == 4
+    assert attribution.overlap_matrix(histogram) == attribution.overlap_matrix()
+    # Same numbers as pairwise set intersections
+    assert attribution.overlap_matrix() == [
+        [len(sources[i] & sources[j]) for j in sources] for i in sources
+    ]
+
+    write_provenance(attribution, sources["aws"], tmp_path / "provenance.csv", stale_source="aws")
+    with open(tmp_path / "provenance.csv", newline="", encoding="utf-8") as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == ["SecretName", "aws", "app", "rudder", "Stale"]
+    assert rows[1:] == [["a", "1", "1", "0", "0"], ["b", "1", "1", "1", "0"],
+                        ["c", "1", "0", "1", "0"], ["d", "1", "0", "0", "1"]]
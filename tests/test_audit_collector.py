@@ -0,0 +1,162 @@
+"""Tests for the concurrent AWS audit collector against a stubbed Secrets Manager."""
+
+import csv
+from datetime import datetime, timezone
+
+import pytest
+
+from common.audit_collector import (
+    collect_full_audit,
+    collect_inventory,
+    collect_targets,
+    fetch_version_rows,
+    read_inventory_csv,
+)
+from common.aws_secrets import AUDIT_FIELDNAMES, AdaptiveThrottle
+from fake_secretsmanager import FakeSecretsManager
+
+
+def _secrets(count=7):
+    secrets = {}
+    for i in range(count):
+        secrets[f"secret-{i:02d}"] = {
+            'versions': [(f"v{i}-1", ['AWSCURRENT']), (f"v{i}-0", ['AWSPREVIOUS'])],
+            'tags': {'env': 'prod', 'team': 'choreo'} if i % 2 else {},
+            'last_accessed': datetime(2025, 6, 1, tzinfo=timezone.utc) if i % 3 else None,
+        }
+    return secrets
+
+
+def _no_sleep(_):
+    pass
+
+
+def _read_rows(path):
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def test_collects_every_page_and_version(tmp_path):
+    stub = FakeSecretsManager(_secrets(), page_size=2)
+    output = tmp_path / "secrets_full_audit.csv"
+
+    stats = collect_full_audit(stub, output, workers=3, throttle=AdaptiveThrottle(sleep=_no_sleep))
+
+    rows = _read_rows(output)
+    assert stats['secrets'] == 7 and stats['rows'] == 14
+    assert stub.calls['list_secrets'] == 4
+    assert {row['SecretName'] for row in rows} == set(stub.names)
+    assert list(rows[0].keys()) == AUDIT_FIELDNAMES
+
+
+def test_row_format_matches_shell_script(tmp_path):
+    stub = FakeSecretsManager({'abc': _secrets(2)['secret-01']})
+    output = tmp_path / "secrets_full_audit.csv"
+
+    collect_full_audit(stub, output, throttle=AdaptiveThrottle(sleep=_no_sleep))
+
+    lines = output.read_text().splitlines()
+    assert lines[0] == ",".join(AUDIT_FIELDNAMES)
+    assert lines[1] == (
+        '"abc","2025-06-01T00:00:00+00:00","N/A","env=prod; team=choreo",'
+        '"v1-1","AWSCURRENT","2025-01-02T03:04:05+00:00"'
+    )
+
+
+def test_throttled_calls_are_retried(tmp_path):
+    stub = FakeSecretsManager(_secrets(), page_size=3, throttle_every=4)
+    throttle = AdaptiveThrottle(sleep=_no_sleep)
+    output = tmp_path / "secrets_full_audit.csv"
+
+    stats = collect_full_audit(stub, output, workers=2, throttle=throttle)
+
+    assert stats['secrets'] == 7 and not stats['failed']
+    assert throttle.throttled_calls > 0
+    assert len(_read_rows(output)) == 14
+
+
+def test_resume_after_crash_skips_completed_secrets(tmp_path):
+    secrets = _secrets(9)
+    output = tmp_path / "secrets_full_audit.csv"
+    checkpoint = tmp_path / "audit.checkpoint.json"
+
+    crashing = FakeSecretsManager(secrets, page_size=2, list_secrets_limit=3)
+    try:
+        collect_full_audit(crashing, output, workers=2, checkpoint_path=checkpoint,
+                           checkpoint_every=1, throttle=AdaptiveThrottle(sleep=_no_sleep))
+    except ConnectionError:
+        pass
+    else:
+        raise AssertionError("the stub should have crashed the scan")
+    assert checkpoint.exists()
+    written_before = {row['SecretName'] for row in _read_rows(output)}
+
+    stub = FakeSecretsManager(secrets, page_size=2)
+    stats = collect_full_audit(stub, output, workers=2, checkpoint_path=checkpoint,
+                               resume=True, throttle=AdaptiveThrottle(sleep=_no_sleep))
+
+    rows = _read_rows(output)
+    assert stats['resumed']
+    assert sorted((r['SecretName'], r['VersionId']) for r in rows) == sorted(
+        (name, version) for name in secrets for version, _ in secrets[name]['versions']
+    )
+    assert written_before and not written_before & set(stub.version_calls)
+    assert not checkpoint.exists()
+
+
+def test_resume_without_the_output_file_is_an_error(tmp_path):
+    output = tmp_path / "secrets_full_audit.csv"
+    checkpoint = tmp_path / "audit.checkpoint.json"
+    crashing = FakeSecretsManager(_secrets(9), page_size=2, list_secrets_limit=3)
+    with pytest.raises(ConnectionError):
+        collect_full_audit(crashing, output, checkpoint_path=checkpoint, checkpoint_every=1,
+                           throttle=AdaptiveThrottle(sleep=_no_sleep))
+    output.unlink()
+
+    with pytest.raises(ValueError, match="missing"):
+        collect_full_audit(FakeSecretsManager(_secrets(9)), output, checkpoint_path=checkpoint,
+                           resume=True, throttle=AdaptiveThrottle(sleep=_no_sleep))
+
+
+def test_lazy_mode_fetches_versions_for_requested_secrets_only(tmp_path):
+    stub = FakeSecretsManager(_secrets(), page_size=3)
+    inventory_path = tmp_path / "secrets_inventory.csv"
+    full_path = tmp_path / "secrets_full_audit.csv"
+
+    collect_inventory(stub, inventory_path, throttle=AdaptiveThrottle(sleep=_no_sleep))
+    assert stub.calls['list_secret_version_ids'] == 0
+
+    inventory = read_inventory_csv(inventory_path)
+    stale = {name: inventory[name] for name in ('secret-01', 'secret-04')}
+    rows_by_name, errors = fetch_version_rows(stub, stale, throttle=AdaptiveThrottle(sleep=_no_sleep))
+
+    assert not errors
+    assert sorted(stub.version_calls) == ['secret-01', 'secret-04']
+    collect_full_audit(FakeSecretsManager(_secrets()), full_path,
+                       throttle=AdaptiveThrottle(sleep=_no_sleep))
+    expected = [list(row.values()) for row in _read_rows(full_path) if row['SecretName'] == 'secret-01']
+    assert rows_by_name['secret-01'] == expected
+
+
+def test_multi_target_scan_tags_rows_and_isolates_failures(tmp_path):
+    stubs = {
+        'eu-west-2': FakeSecretsManager(_secrets(3)),
+        'us-east-1': FakeSecretsManager(_secrets(2)),
+    }
+
+    def client_factory(region, profile):
+        if profile == 'broken':
+            raise RuntimeError("no credentials")
+        return stubs[region]
+
+    output = tmp_path / "secrets_inventory.csv"
+    targets = [('eu-west-2', None), ('us-east-1', 'prod'), ('eu-west-2', 'broken')]
+    results = collect_targets(targets, output, client_factory, names_only=True)
+
+    rows = _read_rows(output)
+    assert 'error' in results[('eu-west-2', 'broken')]
+    assert results[('eu-west-2', None)]['secrets'] == 3
+    assert sorted((r['Region'], r['Account']) for r in rows) == (
+        [('eu-west-2', 'default')] * 3 + [('us-east-1', 'prod')] * 2
+    )
+    assert stubs['us-east-1'].calls['list_secret_version_ids'] == 0
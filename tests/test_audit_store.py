@@ -0,0 +1,66 @@
+"""Tests for the normalized audit store."""
+
+import csv
+
+from common.audit_store import audit_csv_to_store, open_audit_store, store_size, write_audit_csv
+from common.aws_refs import iter_audit_rows, read_aws_secret_refs
+from common.aws_secrets import AUDIT_FIELDNAMES
+
+UUID_A = "11111111-1111-1111-1111-111111111111"
+UUID_B = "22222222-2222-2222-2222-222222222222"
+LONG_TAGS = ";".join(f"tag{i}=value-{i}" for i in range(20))
+
+
+def _write_audit(path, versions=30):
+    rows = []
+    for name in (UUID_A, UUID_B, "mediation-api"):
+        for i in range(versions):
+            stage = "AWSCURRENT" if i == 0 else "AWSPREVIOUS"
+            rows.append([name, "Never", "2025-01-01T00:00:00+00:00", LONG_TAGS, f"v{i}", stage,
+                         f"2024-01-{i % 28 + 1:02d}T00:00:00+00:00"])
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(AUDIT_FIELDNAMES)
+        writer.writerows(rows)
+    return rows
+
+
+def test_round_trip_dedups_secret_fields_and_tags(tmp_path):
+    rows = _write_audit(tmp_path / "audit.csv")
+    assert audit_csv_to_store(tmp_path / "audit.csv", tmp_path / "store") == (3, len(rows), 1)
+    assert store_size(tmp_path / "store") < (tmp_path / "audit.csv").stat().st_size / 2
+
+    with open_audit_store(tmp_path / "store") as store:
+        assert [list(row) for row in store.iter_rows()] == rows
+        write_audit_csv(store, tmp_path / "export.csv")
+    assert (tmp_path / "export.csv").read_bytes() == (tmp_path / "audit.csv").read_bytes()
+
+
+def test_interleaved_secrets_round_trip(tmp_path):
+    rows = _write_audit(tmp_path / "audit.csv", versions=2)
+    # A secret whose versions are not adjacent gets a second secret row
+    rows = [rows[0], rows[2], rows[1]]
+    with open(tmp_path / "audit.csv", "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(AUDIT_FIELDNAMES)
+        writer.writerows(rows)
+
+    assert audit_csv_to_store(tmp_path / "audit.csv", tmp_path / "store") == (3, 3, 1)
+    with open_audit_store(tmp_path / "store") as store:
+        assert [list(row) for row in store.iter_rows()] == rows
+
+
+def test_loaders_join_only_what_they_need(tmp_path):
+    _write_audit(tmp_path / "audit.csv", versions=3)
+    audit_csv_to_store(tmp_path / "audit.csv", tmp_path / "store")
+
+    assert list(iter_audit_rows(tmp_path / "store")) == list(iter_audit_rows(tmp_path / "audit.csv"))
+    filtered = list(iter_audit_rows(tmp_path / "store", {UUID_B}))
+    assert [row[4] for row in filtered] == ["v0", "v1", "v2"]
+    assert {row[0] for row in filtered} == {UUID_B}
+
+    from_csv = read_aws_secret_refs(tmp_path / "audit.csv")
+    from_store = read_aws_secret_refs(tmp_path / "store")
+    assert from_store.valid_secrets == from_csv.valid_secrets == [UUID_A, UUID_B]
+    assert from_store.invalid_secrets == from_csv.invalid_secrets
+    assert from_store.skipped_non_current == from_csv.skipped_non_current
@@ -0,0 +1,40 @@
+"""Tests for the synthetic benchmark data generator and the baseline comparison."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+from common.aws_refs import read_aws_secret_refs
+from common.extraction import extract_references
+from common.sources import SOURCES
+from generate_synthetic import generate
+from run_benchmarks import compare, measure
+
+
+def test_generated_dumps_parse_and_plant_the_expected_stale_set(tmp_path):
+    manifest = generate(tmp_path, 500, seed=7)
+    again = generate(tmp_path / "again", 500, seed=7)
+    assert again["counts"] == manifest["counts"]
+    assert (tmp_path / "choreo_rudder_db" / "38516-8.log").read_bytes() == \
+        (tmp_path / "again" / "choreo_rudder_db" / "38516-8.log").read_bytes()
+
+    aws = read_aws_secret_refs(tmp_path / "aws_key_vault" / "secrets_full_audit.csv")
+    assert aws.total_rows == manifest["counts"]["audit_rows"]
+    references = set()
+    for name, spec in SOURCES.items():
+        result = extract_references(spec, tmp_path / name / spec.input_file, False)
+        assert result.rows_in == manifest["counts"][name]
+        references |= result.references()
+    assert len(aws.references() - references) == manifest["counts"]["stale"]
+
+
+def test_measure_and_regression_thresholds(tmp_path):
+    status, wall, rss = measure([sys.executable, "-c", "x = bytearray(1 << 20)"], tmp_path,
+                                tmp_path / "log")
+    assert status == 0 and wall > 0 and rss > 1
+
+    baseline = {"stage": {"wall_seconds": 1.0, "peak_rss_mb": 100.0}}
+    assert compare({"stage": {"wall_seconds": 1.2, "peak_rss_mb": 110.0}}, baseline, 0.25, 0.2) == []
+    regressions = compare({"stage": {"wall_seconds": 1.5, "peak_rss_mb": 130.0}}, baseline, 0.25, 0.2)
+    assert len(regressions) == 2
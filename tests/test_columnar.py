@@ -0,0 +1,93 @@
+"""Tests for the columnar .scol intermediate format."""
+
+import csv
+
+import pytest
+
+from common import columnar
+from common.aws_refs import iter_audit_rows, read_aws_secret_refs
+from common.columnar import INT64, STR, TableWriter, csv_to_table, open_table, write_csv, write_table
+from common.extraction import extract_references
+from common.secret_sets import read_secrets_from_csv
+from common.sources import SOURCES
+from common.stale_sort import SORT_FIELDNAMES, read_sort_columns, write_detailed_table
+
+from test_extraction import APP_DB_DUMP
+
+AUDIT_ROWS = [
+    ["11111111-1111-1111-1111-111111111111", "Never", "N/A", "team=ü", "v1", "AWSCURRENT", "2025-01-02T00:00:00+00:00"],
+    ["11111111-1111-1111-1111-111111111111", "Never", "N/A", "team=ü", "v0", "AWSPREVIOUS", "2024-01-02T00:00:00+00:00"],
+    ["mediation-api", "2025-03-01T00:00:00+00:00", "N/A", "", "v2", "AWSCURRENT", "2025-02-02T00:00:00+00:00"],
+]
+
+
+def _write_audit_csv(path):
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(SORT_FIELDNAMES)
+        writer.writerows(AUDIT_ROWS)
+
+
+def test_round_trip_and_csv_export(tmp_path):
+    write_table(tmp_path / "t.scol", [("name", STR, ["a", "ü", ""]), ("key", INT64, [3, -1, 2])],
+                {"source": "test"})
+    with open_table(tmp_path / "t.scol") as table:
+        assert table.num_rows == 3
+        assert table.metadata == {"source": "test"}
+        assert list(table.column("name")) == ["a", "ü", ""]
+        assert table.column("name")[1] == "ü"
+        assert list(table.column("key")) == [3, -1, 2]
+        assert list(table.iter_rows(["name", "missing"])) == [("a", ""), ("ü", ""), ("", "")]
+        write_csv(table, tmp_path / "t.csv")
+    assert (tmp_path / "t.csv").read_text(encoding="utf-8").splitlines() == ["name,key", "a,3", "ü,-1", ",2"]
+
+
+def test_table_writer_spills_rows_and_matches_write_table(tmp_path, monkeypatch):
+    monkeypatch.setattr(columnar, "_SPILL_ROWS", 2)
+    rows = [(f"n{i}", "ü" if i == 3 else "", i - 2) for i in range(5)]
+    with TableWriter(tmp_path / "rows.scol", [("name", STR), ("note", STR), ("key", INT64)], {"a": 1}) as table:
+        table.extend(rows)
+    write_table(tmp_path / "columns.scol", [("name", STR, [r[0] for r in rows]), ("note", STR, [r[1] for r in rows]),
+                                            ("key", INT64, [r[2] for r in rows])], {"a": 1})
+
+    assert (tmp_path / "rows.scol").read_bytes() == (tmp_path / "columns.scol").read_bytes()
+    with open_table(tmp_path / "rows.scol") as table:
+        assert list(table.iter_rows(["name", "note", "key"])) == rows
+
+    # An exception discards the table
+    with pytest.raises(RuntimeError):
+        with TableWriter(tmp_path / "failed.scol", [("name", STR)]) as table:
+            table.append(("a",))
+            raise RuntimeError
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["columns.scol", "rows.scol"]
+
+
+def test_extractor_and_loaders_read_scol(tmp_path):
+    (tmp_path / "dump.log").write_text(APP_DB_DUMP)
+    output = tmp_path / "key_vault_secrets.scol"
+    extract_references(SOURCES["choreo_app_db"], tmp_path / "dump.log", output)
+
+    assert read_secrets_from_csv(output) == {
+        "11111111-1111-1111-1111-111111111111", "22222222-2222-2222-2222-222222222222",
+    }
+    assert list(read_secrets_from_csv(output, backend="compact")) == sorted(read_secrets_from_csv(output))
+
+    _write_audit_csv(tmp_path / "audit.csv")
+    csv_to_table(tmp_path / "audit.csv", tmp_path / "audit.scol")
+    assert list(iter_audit_rows(tmp_path / "audit.scol")) == list(iter_audit_rows(tmp_path / "audit.csv"))
+    from_csv = read_aws_secret_refs(tmp_path / "audit.csv")
+    from_scol = read_aws_secret_refs(tmp_path / "audit.scol")
+    assert from_scol.valid_secrets == from_csv.valid_secrets
+    assert from_scol.invalid_secrets == from_csv.invalid_secrets
+
+
+def test_detailed_table_sorts_like_csv(tmp_path):
+    _write_audit_csv(tmp_path / "detailed.csv")
+    write_detailed_table(tmp_path / "detailed.scol", [tuple(row) for row in AUDIT_ROWS])
+
+    from_csv = read_sort_columns(tmp_path / "detailed.csv")
+    from_scol = read_sort_columns(tmp_path / "detailed.scol")
+    for field in ("LastAccessedDate", "VersionCreatedDate"):
+        assert list(from_scol.keys[field]) == list(from_csv.keys[field])
+        assert [from_scol.rows[i] for i in from_scol.order(field)] == \
+            [from_csv.rows[i] for i in from_csv.order(field)]
@@ -0,0 +1,64 @@
+"""Tests for direct DB extraction against SQLite fixtures."""
+
+import sqlite3
+
+import pytest
+
+from common.db_sources import extract_references_from_db, parsename_secret_uuid
+
+ORG = "f5aad5f4-4cac-40df-b0ed-e0c3ca8ae985"
+UUID_A = "aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa"
+UUID_B = "bbbbbbbb-bbbb-bbbb-bbbb-bbbbbbbbbbbb"
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "choreo.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE configuration_value (config_mount_id INT, value_ref TEXT);
+        CREATE TABLE configuration_mount (id INT, component_data_uuid TEXT);
+        CREATE TABLE component_data (uuid TEXT, organization_handle TEXT);
+        CREATE TABLE secrets (vault_id TEXT, name TEXT, organization_id TEXT);
+        CREATE TABLE config_maps (vault_id TEXT, name TEXT, organization_id TEXT);
+    """)
+    conn.executemany("INSERT INTO component_data VALUES (?, ?)",
+                     [("c1", "universityofedinburgh"), ("c2", "other")])
+    conn.executemany("INSERT INTO configuration_mount VALUES (?, ?)", [(1, "c1"), (2, "c2")])
+    conn.executemany("INSERT INTO configuration_value VALUES (?, ?)", [
+        (1, f"kv/{UUID_A}/v1"),
+        (1, ""),
+        (1, None),
+        (2, f"kv/{UUID_B}/v1"),
+    ])
+    conn.executemany("INSERT INTO secrets VALUES (?, ?, ?)", [
+        (UUID_A, "api", ORG), ("not-a-uuid", "x", ORG), (UUID_B, "other-org", "nope"),
+    ])
+    conn.executemany("INSERT INTO config_maps VALUES (?, ?, ?)", [
+        (UUID_A, "api", ORG), (None, "empty", ORG),
+    ])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_parsename_matches_sql_server_semantics():
+    assert parsename_secret_uuid(f"kv/{UUID_A}/v1") == UUID_A
+    assert parsename_secret_uuid("a/b/c/d/e") is None
+
+
+def test_app_db_query_streams_into_reference_set(db_path, tmp_path):
+    output = tmp_path / "key_vault_secrets.csv"
+    result = extract_references_from_db("choreo_app_db", f"sqlite:///{db_path}",
+                                        "universityofedinburgh", output, fetch_size=1)
+
+    assert result.references() == {UUID_A}
+    assert output.read_text().splitlines() == ["key_vault_secret_name", UUID_A]
+
+
+def test_rudder_query_validates_and_counts_duplicates(db_path):
+    result = extract_references_from_db("choreo_rudder_db", str(db_path), ORG, output_path=False)
+
+    assert result.references() == {UUID_A}
+    assert result.duplicates() == {UUID_A: 2}
+    assert result.skipped == 1
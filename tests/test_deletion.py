@@ -0,0 +1,178 @@
+"""Tests for the resumable stale secret deletion executor against a stubbed Secrets Manager."""
+
+import json
+import os
+import time
+
+import pytest
+
+from common.aws_secrets import AdaptiveThrottle
+from common.deletion import (
+    DELETED,
+    DRY_RUN,
+    FAILED,
+    NOT_FOUND,
+    REFERENCED,
+    DeletionJournal,
+    ReferenceGuard,
+    TokenBucket,
+    delete_candidates,
+    read_candidates,
+)
+from fake_secretsmanager import FakeSecretsManager
+
+
+def _no_sleep(_):
+    pass
+
+
+def _stub(count=6, **kwargs):
+    return FakeSecretsManager({f"s{i}": {"versions": []} for i in range(count)}, **kwargs)
+
+
+def _delete(stub, names, journal, **kwargs):
+    kwargs.setdefault("rate", 1000)
+    return delete_candidates(stub, names, journal, workers=3, sleep=_no_sleep,
+                             throttle=AdaptiveThrottle(sleep=_no_sleep), **kwargs)
+
+
+def test_read_candidates_from_list_and_csv(tmp_path, write_names):
+    (tmp_path / "delete_candidates_list.txt").write_text("# reviewed 2026-02-02\ns1\n\ns2\ns1\n")
+    write_names(tmp_path / "stale_secrets.csv", ["s3", "s4"])
+
+    assert read_candidates(tmp_path / "delete_candidates_list.txt") == ["s1", "s2"]
+    assert read_candidates(tmp_path / "stale_secrets.csv") == ["s3", "s4"]
+
+
+def test_deletes_with_recovery_window_and_journals(tmp_path):
+    stub = _stub(throttle_every=4)
+
+    with DeletionJournal(tmp_path / "journal.jsonl") as journal:
+        stats = _delete(stub, ["s0", "s1", "s2", "gone"], journal, recovery_window_days=7)
+
+    assert sorted(stats[DELETED]) == ["s0", "s1", "s2"] and stats[NOT_FOUND] == ["gone"]
+    assert stub.deleted == {"s0": 7, "s1": 7, "s2": 7}
+    assert stats["throttled_calls"] > 0
+    entries = [json.loads(line) for line in (tmp_path / "journal.jsonl").read_text().splitlines()]
+    assert sorted((e["name"], e["status"]) for e in entries) == [
+        ("gone", NOT_FOUND), ("s0", DELETED), ("s1", DELETED), ("s2", DELETED),
+    ]
+
+
+def test_force_delete_removes_immediately(tmp_path):
+    stub = _stub()
+
+    with DeletionJournal(tmp_path / "journal.jsonl") as journal:
+        _delete(stub, ["s0"], journal, force=True)
+
+    assert stub.deleted == {"s0": None} and "s0" not in stub.secrets
+
+
+def test_dry_run_deletes_and_journals_nothing(tmp_path):
+    stub = _stub()
+
+    with DeletionJournal(tmp_path / "journal.jsonl") as journal:
+        stats = _delete(stub, ["s0", "s1"], journal, dry_run=True)
+
+    assert sorted(stats[DRY_RUN]) == ["s0", "s1"]
+    assert stub.calls["delete_secret"] == 0
+    assert not (tmp_path / "journal.jsonl").exists()
+
+
+def test_interrupted_run_resumes_without_repeating_deletes(tmp_path):
+    stub = _stub()
+    stub.delete_limit = 3
+    names = [f"s{i}" for i in range(6)]
+
+    with DeletionJournal(tmp_path / "journal.jsonl") as journal:
+        first = _delete(stub, names, journal, retries=0)
+    assert len(first[DELETED]) == 3 and len(first[FAILED]) == 3
+
+    # A torn last line from a crash mid-write is ignored
+    with open(tmp_path / "journal.jsonl", "a", encoding="utf-8") as file:
+        file.write('{"name": "s')
+    stub.delete_limit = None
+    with DeletionJournal(tmp_path / "journal.jsonl") as journal:
+        second = _delete(stub, names, journal)
+
+    assert second["skipped"] == 3
+    assert sorted(first[DELETED] + second[DELETED]) == names
+    assert stub.calls["delete_secret"] == 6
+    # Entries appended after the torn line are still readable on the next resume
+    assert DeletionJournal(tmp_path / "journal.jsonl").done() == set(names)
+
+
+def test_secret_marked_for_deletion_counts_as_deleted(tmp_path):
+    # The previous run deleted s0 but crashed before journaling it
+    stub = _stub()
+    stub.deleted["s0"] = 30
+
+    with DeletionJournal(tmp_path / "journal.jsonl") as journal:
+        stats = _delete(stub, ["s0"], journal)
+
+    assert stats[DELETED] == ["s0"] and not stats[FAILED]
+
+
+def test_reference_guard_rechecks_changed_files(tmp_path, write_names):
+    app = tmp_path / "app.csv"
+    write_names(app, ["s1"])
+    guard = ReferenceGuard({"choreo_app_db": app})
+    assert guard.sources_of("s1") == ["choreo_app_db"] and guard.sources_of("s2") == []
+
+    # An extractor re-ran while the deletion was under way
+    write_names(app, ["s2"])
+    os.utime(app, ns=(1, 1))
+    assert guard.sources_of("s2") == ["choreo_app_db"]
+    # References never shrink within a run
+    assert guard.sources_of("s1") == ["choreo_app_db"]
+
+
+def test_referenced_candidates_are_kept(tmp_path, write_names):
+    app = tmp_path / "app.csv"
+    write_names(app, ["s1"])
+    stub = _stub()
+
+    with DeletionJournal(tmp_path / "journal.jsonl") as journal:
+        stats = _delete(stub, ["s0", "s1"], journal, guard=ReferenceGuard({"choreo_app_db": app}))
+
+    assert stats[DELETED] == ["s0"] and stats[REFERENCED] == {"s1": ["choreo_app_db"]}
+    assert "s1" not in stub.deleted
+
+
+def test_reference_recheck_follows_the_rate_limit_wait(tmp_path, write_names):
+    app = tmp_path / "app.csv"
+    write_names(app, [])
+    stub = _stub()
+
+    def sleep(seconds):
+        # s1 gains a reference while its delete waits for a token
+        write_names(app, ["s1"])
+        os.utime(app, ns=(1, 1))
+        time.sleep(seconds)
+
+    with DeletionJournal(tmp_path / "journal.jsonl") as journal:
+        stats = delete_candidates(stub, ["s0", "s1"], journal, ReferenceGuard({"choreo_app_db": app}),
+                                  workers=1, rate=50, burst=1, sleep=sleep,
+                                  throttle=AdaptiveThrottle(sleep=_no_sleep))
+
+    assert stats[DELETED] == ["s0"] and stats[REFERENCED] == {"s1": ["choreo_app_db"]}
+
+
+def test_missing_reference_file_is_an_error(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        ReferenceGuard({"choreo_app_db": tmp_path / "missing.csv"})
+
+
+def test_token_bucket_spaces_calls_after_burst():
+    now = [0.0]
+    waits = []
+
+    def sleep(seconds):
+        waits.append(seconds)
+        now[0] += seconds
+
+    bucket = TokenBucket(rate=2, burst=2, clock=lambda: now[0], sleep=sleep)
+    for _ in range(4):
+        bucket.acquire()
+
+    assert waits == [0.5, 0.5]
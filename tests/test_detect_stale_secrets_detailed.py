@@ -0,0 +1,31 @@
+"""Tests for the streaming audit join in detect_stale_secrets_detailed.py."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "process_secrets", "stale_secrets"))
+
+from detect_stale_secrets_detailed import read_stale_audit_rows  # noqa: E402
+
+AUDIT_CSV = (
+    '"SecretName","LastAccessedDate","LastChangedDate","Tags","VersionId","VersionStages","VersionCreatedDate"\n'
+    '"aaa","Never","N/A","","v1","AWSCURRENT","2025-01-01T00:00:00+00:00"\n'
+    '"bbb","2025-02-01T00:00:00+00:00","N/A","team=x","v2","AWSCURRENT","2025-01-02T00:00:00+00:00"\n'
+    '"aaa","Never","N/A","","v0","AWSPREVIOUS","2024-12-01T00:00:00+00:00"\n'
+    '"ccc","Never","N/A"\n'
+)
+
+
+def test_keeps_only_stale_rows_in_file_order(tmp_path):
+    audit = tmp_path / "secrets_full_audit.csv"
+    audit.write_text(AUDIT_CSV)
+
+    rows = read_stale_audit_rows(audit, {"aaa", "ccc", "zzz"})
+
+    assert rows == {
+        "aaa": [
+            ("aaa", "Never", "N/A", "", "v1", "AWSCURRENT", "2025-01-01T00:00:00+00:00"),
+            ("aaa", "Never", "N/A", "", "v0", "AWSPREVIOUS", "2024-12-01T00:00:00+00:00"),
+        ],
+        "ccc": [("ccc", "Never", "N/A", "", "", "", "")],
+    }
@@ -0,0 +1,67 @@
+"""Tests for the per-target detection in detect_stale_secrets_multi_region.py."""
+
+import csv
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "process_secrets", "stale_secrets"))
+
+from common.metrics import StageMetrics  # noqa: E402
+from common.sources import DB_FOLDERS  # noqa: E402
+from detect_stale_secrets_multi_region import detect_stale_secrets_multi_region  # noqa: E402
+
+TAGGED_CSV = (
+    "key_vault_secret_name,region,account\n"
+    "shared-a,eu-west-1,prod\n"
+    "shared-b,eu-west-1,prod\n"
+    "eu-only,eu-west-1,prod\n"
+    "shared-a,us-east-1,prod\n"
+    "shared-b,us-east-1,prod\n"
+    "us-only,us-east-1,prod\n"
+    "shared-a,eu-west-1,staging\n"
+    "staging-1,eu-west-1,staging\n"
+    "legacy,,\n"
+)
+
+DB_NAMES = {
+    "choreo_app_db": ["shared-a"],
+    "choreo_cloud_manager_db": ["staging-1", "not-in-aws"],
+    "choreo_configuration_service_db": [],
+    "choreo_rudder_db": ["eu-only", "shared-a"],
+}
+
+
+def test_detects_stale_secrets_per_target(tmp_path, write_names, capsys):
+    (tmp_path / "aws_key_vault").mkdir()
+    (tmp_path / "aws_key_vault" / "key_vault_secrets.csv").write_text(TAGGED_CSV)
+    (tmp_path / "stale_secrets").mkdir()
+    for folder in DB_FOLDERS:
+        (tmp_path / folder).mkdir()
+        write_names(tmp_path / folder / "key_vault_secrets.csv", DB_NAMES[folder])
+    metrics = StageMetrics("detect_stale_secrets_multi_region")
+
+    stale_by_target = detect_stale_secrets_multi_region(tmp_path, metrics=metrics, quiet=True)
+
+    assert stale_by_target == {
+        ("eu-west-1", "prod"): {"shared-b"},
+        ("eu-west-1", "staging"): set(),
+        ("unknown", "default"): {"legacy"},
+        ("us-east-1", "prod"): {"shared-b", "us-only"},
+    }
+    with open(tmp_path / "stale_secrets" / "stale_secrets_by_region.csv", newline="") as file:
+        rows = list(csv.reader(file))
+    assert rows == [
+        ["key_vault_secret_name", "region", "account"],
+        ["shared-b", "eu-west-1", "prod"],
+        ["legacy", "unknown", "default"],
+        ["shared-b", "us-east-1", "prod"],
+        ["us-only", "us-east-1", "prod"],
+    ]
+    assert metrics.counters == {
+        "rows_in": 9, "rows_out": 4, "targets": 4, "distinct_secrets": 6,
+        "in_several_targets": 2, "distinct_stale": 3,
+    }
+    # --quiet keeps the per-target totals but drops the per-folder breakdown
+    output = capsys.readouterr().out
+    assert "  Stale secrets: 2" in output
+    assert "choreo_rudder_db: " not in output
@@ -0,0 +1,144 @@
+"""Tests for the streaming psql dump extraction engine."""
+
+import csv
+
+from common.extraction import extract_references
+from common.sources import SOURCES
+
+APP_DB_DUMP = """\
+organization_handle  value_ref  secret_uuid  key_vault_name
+-------------------  ---------  -----------  --------------
+uoe  kv/a/11111111-1111-1111-1111-111111111111/x  11111111-1111-1111-1111-111111111111  kv
+uoe  kv/a/22222222-2222-2222-2222-222222222222/x  22222222-2222-2222-2222-222222222222  kv
+
+uoe  kv/a/11111111-1111-1111-1111-111111111111/x  11111111-1111-1111-1111-111111111111  kv
+uoe  short
+(3 rows)
+"""
+
+RUDDER_DUMP = """\
+vault_id                              name      source_table  created_at
+------------------------------------  --------  ------------  ----------
+aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa  api       secrets       2026-01-01
+                                      empty     config_maps   2026-01-01
+aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa  api       config_maps   2026-01-01
+bbbbbbbb-bbbb-bbbb-bbbb-bbbbbbbbbbbb  job       secrets       2026-01-01
+(4 rows)
+"""
+
+CONFIG_DUMP = """\
+value_ref
+---------
+cccccccc-cccc-cccc-cccc-cccccccccccc
+dddddddd-dddd-dddd-dddd-dddddddddddd
+(2 rows)
+"""
+
+
+def _extract(tmp_path, source, dump, **kwargs):
+    input_path = tmp_path / "dump.log"
+    output_path = tmp_path / "key_vault_secrets.csv"
+    input_path.write_text(dump)
+    result = extract_references(SOURCES[source], input_path, output_path, **kwargs)
+    with open(output_path, newline="") as f:
+        rows = list(csv.reader(f))
+    return result, rows
+
+
+def test_app_db_extracts_unique_third_column(tmp_path):
+    result, rows = _extract(tmp_path, "choreo_app_db", APP_DB_DUMP, batch_size=1)
+
+    assert rows == [
+        ["key_vault_secret_name"],
+        ["11111111-1111-1111-1111-111111111111"],
+        ["22222222-2222-2222-2222-222222222222"],
+    ]
+    assert result.extracted == 3 and result.unique == 2 and result.skipped == 1
+    assert result.duplicates() == {"11111111-1111-1111-1111-111111111111": 2}
+
+
+def test_rudder_skips_rows_without_vault_id(tmp_path):
+    result, rows = _extract(tmp_path, "choreo_rudder_db", RUDDER_DUMP)
+
+    assert [r[0] for r in rows[1:]] == [
+        "aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa",
+        "bbbbbbbb-bbbb-bbbb-bbbb-bbbbbbbbbbbb",
+    ]
+    assert result.skipped == 1
+    assert result.duplicates() == {"aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa": 2}
+
+
+def test_config_service_uses_whole_line(tmp_path):
+    result, rows = _extract(tmp_path, "choreo_configuration_service_db", CONFIG_DUMP)
+
+    assert result.references() == {
+        "cccccccc-cccc-cccc-cccc-cccccccccccc",
+        "dddddddd-dddd-dddd-dddd-dddddddddddd",
+    }
+    assert len(rows) == 3
+
+
+def test_in_memory_mode_writes_nothing(tmp_path):
+    input_path = tmp_path / "dump.log"
+    input_path.write_text(CONFIG_DUMP)
+
+    result = extract_references(SOURCES["choreo_configuration_service_db"], input_path, False)
+
+    assert result.unique == 2
+    assert list(tmp_path.iterdir()) == [input_path]
+
+
+def test_parallel_chunks_match_serial_engine(tmp_path):
+    from common.chunked_extraction import extract_references_parallel
+
+    input_path = tmp_path / "dump.log"
+    input_path.write_text(RUDDER_DUMP * 50)
+    serial = extract_references(SOURCES["choreo_rudder_db"], input_path, tmp_path / "serial.csv")
+
+    # Tiny chunks force many newline-aligned ranges
+    parallel = extract_references_parallel(SOURCES["choreo_rudder_db"], input_path,
+                                           tmp_path / "parallel.csv", workers=2, chunk_bytes=100)
+
+    assert list(parallel.counts.items()) == list(serial.counts.items())
+    assert (parallel.rows_in, parallel.skipped) == (serial.rows_in, serial.skipped)
+    assert (tmp_path / "parallel.csv").read_text() == (tmp_path / "serial.csv").read_text()
+
+
+def test_range_parse_reads_in_blocks_smaller_than_lines(tmp_path):
+    import mmap
+
+    from common.chunked_extraction import _iter_blocks
+
+    data = b"short\n" + b"x" * 40 + b"\n\nlast"
+    (tmp_path / "dump.log").write_bytes(data)
+    with open(tmp_path / "dump.log", "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for block_bytes in (1, 8, 1024):
+            blocks = list(_iter_blocks(mm, 0, len(data), block_bytes))
+            assert b"".join(blocks) == data
+            lines = [line for block in blocks for line in block.split(b"\n") if line]
+            assert lines == [b"short", b"x" * 40, b"last"]
+
+
+def test_parallel_splits_unicode_whitespace_like_the_serial_engine(tmp_path):
+    from common.chunked_extraction import extract_references_parallel
+
+    uuid = "33333333-3333-3333-3333-333333333333"
+    dump = APP_DB_DUMP.replace("(3 rows)\n", "") + "".join([
+        # str.split() splits on NBSP and \x1c, bytes.split() does not
+        f"uoe\u00a0kv/a/{uuid}/x\u00a0{uuid}  kv\n",
+        f"uoe  kv/a/{uuid}/x\x1c{uuid}  kv\n",
+        f"uoe  kv/a/{uuid}/x  {uuid}\u00a0\n",
+        # A lone \r ends a line in the serial engine's text mode
+        f"uoe  kv/a/{uuid}/x  {uuid}  kv\ruoe  a  {uuid}  kv\n",
+        "(7 rows)\n",
+    ])
+    input_path = tmp_path / "dump.log"
+    input_path.write_bytes(dump.encode("utf-8"))
+    serial = extract_references(SOURCES["choreo_app_db"], input_path, tmp_path / "serial.csv")
+    parallel = extract_references_parallel(SOURCES["choreo_app_db"], input_path,
+                                           tmp_path / "parallel.csv", workers=1, chunk_bytes=64)
+
+    assert serial.counts[uuid] == 5
+    assert list(parallel.counts.items()) == list(serial.counts.items())
+    assert (parallel.rows_in, parallel.skipped) == (serial.rows_in, serial.skipped)
+    assert (tmp_path / "parallel.csv").read_text() == (tmp_path / "serial.csv").read_text()
@@ -0,0 +1,120 @@
+"""Tests for the in-memory lookup index, its reloader and the HTTP lookup service."""
+
+import http.client
+import json
+import os
+import socket
+import threading
+import urllib.request
+
+from common.lookup_index import ACTIVE, DANGLING, NOT_CHECKED, STALE, UNKNOWN, IndexReloader, LookupIndex
+from lookup_service import make_server
+
+AUDIT_CSV = """\
+SecretName,LastAccessedDate,LastChangedDate,Tags,VersionId,VersionStages,VersionCreatedDate
+"s1","Never","N/A","","v0","AWSPREVIOUS","2024-01-01T00:00:00+00:00"
+"s1","Never","N/A","","v1","AWSCURRENT","2025-01-01T00:00:00+00:00"
+"s2","2025-06-01T00:00:00+00:00","N/A","","v1","AWSCURRENT","2025-02-01T00:00:00+00:00"
+"mediation-api","Never","N/A","","v1","AWSCURRENT","2025-03-01T00:00:00+00:00"
+"""
+
+
+def _inputs(tmp_path, write_names):
+    paths = {"aws_key_vault": tmp_path / "aws.csv", "choreo_app_db": tmp_path / "app.csv",
+             "choreo_rudder_db": tmp_path / "rudder.csv"}
+    write_names(paths["aws_key_vault"], ["s1", "s2", "s3"])
+    write_names(paths["choreo_app_db"], ["s1", "gone"])
+    write_names(paths["choreo_rudder_db"], ["s1"])
+    (tmp_path / "audit.csv").write_text(AUDIT_CSV)
+    return paths, tmp_path / "audit.csv"
+
+
+def test_lookup_states_sources_and_latest_version(tmp_path, write_names):
+    paths, audit = _inputs(tmp_path, write_names)
+    index = LookupIndex(paths, audit)
+
+    s1 = index.lookup("s1")
+    assert s1["state"] == ACTIVE and s1["sources"] == ["choreo_app_db", "choreo_rudder_db"]
+    assert (s1["latest_version_created"], s1["latest_version_stages"]) == (
+        "2025-01-01T00:00:00+00:00", "AWSCURRENT")
+    assert index.lookup("s2")["state"] == STALE
+    assert index.lookup("s2")["last_accessed"] == "2025-06-01T00:00:00+00:00"
+    assert index.lookup("gone")["state"] == DANGLING
+    assert index.lookup("mediation-api")["state"] == NOT_CHECKED
+    assert index.lookup("nope") == {"name": "nope", "state": UNKNOWN, "in_aws_inventory": False,
+                                    "sources": []}
+    assert (index.counts["inventory"], index.counts["stale"], index.counts["choreo_app_db"]) == (3, 2, 2)
+
+
+def test_reloader_swaps_in_a_new_index_once_files_settle(tmp_path, write_names):
+    paths, audit = _inputs(tmp_path, write_names)
+    reloader = IndexReloader(lambda: LookupIndex(paths, audit), list(paths.values()))
+    old_index = reloader.index
+
+    write_names(paths["choreo_app_db"], ["s1", "s2"])
+    os.utime(paths["choreo_app_db"], ns=(1, 1))
+    assert not reloader.check()  # changed, not settled yet
+    assert reloader.check()
+
+    assert reloader.generation == 2
+    assert reloader.index.lookup("s2")["state"] == ACTIVE
+    # Holders of the previous index still see its state
+    assert old_index.lookup("s2")["state"] == STALE
+
+
+def test_failed_reload_keeps_the_current_index(tmp_path, capsys, write_names):
+    paths, audit = _inputs(tmp_path, write_names)
+    reloader = IndexReloader(lambda: LookupIndex(paths, audit), list(paths.values()))
+
+    paths["choreo_rudder_db"].unlink()
+    reloader.check()
+    assert not reloader.check()
+
+    assert reloader.generation == 1 and reloader.reload_errors == 1
+    assert reloader.index.lookup("s1")["sources"] == ["choreo_app_db", "choreo_rudder_db"]
+    assert "reload failed" in capsys.readouterr().out
+
+
+def _serve(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_http_single_and_batch_lookups(tmp_path, write_names):
+    paths, audit = _inputs(tmp_path, write_names)
+    reloader = IndexReloader(lambda: LookupIndex(paths, audit), list(paths.values()))
+    server = make_server(reloader, port=0, quiet=True)
+    _serve(server)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{base}/lookup/s2") as response:
+            assert json.load(response)["state"] == STALE
+        request = urllib.request.Request(f"{base}/lookup", data=json.dumps({"names": ["s1", "x"]}).encode(),
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request) as response:
+            assert [r["state"] for r in json.load(response)["results"]] == [ACTIVE, UNKNOWN]
+        with urllib.request.urlopen(f"{base}/status") as response:
+            assert json.load(response)["generation"] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_unix_socket_lookup(tmp_path, write_names):
+    paths, audit = _inputs(tmp_path, write_names)
+    reloader = IndexReloader(lambda: LookupIndex(paths, audit), list(paths.values()))
+    socket_path = str(tmp_path / "lookup.sock")
+    server = make_server(reloader, unix_socket=socket_path, quiet=True)
+    _serve(server)
+    try:
+        connection = http.client.HTTPConnection("localhost")
+        connection.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.sock.connect(socket_path)
+        connection.request("GET", "/lookup?name=s1&name=gone")
+        results = json.loads(connection.getresponse().read())["results"]
+        connection.close()
+        assert [r["state"] for r in results] == [ACTIVE, DANGLING]
+    finally:
+        server.shutdown()
+        server.server_close()
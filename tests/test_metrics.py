@@ -0,0 +1,87 @@
+"""Tests for per-stage metrics records and the extractors' --metrics-file / --quiet options."""
+
+import json
+
+from common.extraction import extract_references, run_extractor
+from common.metrics import StageMetrics
+from common.sources import SOURCES
+
+RUDDER_DUMP = """\
+vault_id                              name      source_table  created_at
+------------------------------------  --------  ------------  ----------
+aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa  api       secrets       2026-01-01
+                                      empty     config_maps   2026-01-01
+aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa  api       config_maps   2026-01-01
+bbbbbbbb-bbbb-bbbb-bbbb-bbbbbbbbbbbb  job       secrets       2026-01-01
+(4 rows)
+"""
+
+
+def test_stage_metrics_appends_one_json_line(tmp_path):
+    metrics_file = tmp_path / "metrics.jsonl"
+    for rows in (10, 20):
+        with StageMetrics("detect", metrics_file) as metrics:
+            with metrics.timer("compute"):
+                pass
+            metrics.set(rows_in=rows, rows_out=rows // 2)
+
+    records = [json.loads(line) for line in metrics_file.read_text().splitlines()]
+    assert [(r["stage"], r["status"], r["rows_in"], r["rows_out"]) for r in records] == [
+        ("detect", "ok", 10, 5),
+        ("detect", "ok", 20, 10),
+    ]
+    assert set(records[0]["timings"]) == {"compute"}
+    assert records[0]["wall_seconds"] >= records[0]["timings"]["compute"]
+
+
+def test_failed_stage_is_recorded_as_error(tmp_path):
+    metrics_file = tmp_path / "metrics.jsonl"
+    try:
+        with StageMetrics("sort", metrics_file):
+            raise ValueError("bad date")
+    except ValueError:
+        pass
+
+    record = json.loads(metrics_file.read_text())
+    assert record["status"] == "error" and record["error"] == "ValueError: bad date"
+
+
+def test_extraction_splits_parse_and_io_time(tmp_path):
+    input_path = tmp_path / "dump.log"
+    input_path.write_text(RUDDER_DUMP)
+    metrics = StageMetrics("choreo_rudder_db")
+
+    extract_references(SOURCES["choreo_rudder_db"], input_path, tmp_path / "out.csv",
+                       batch_size=1, metrics=metrics)
+
+    assert set(metrics.timings) == {"parse", "io"}
+
+
+def test_run_extractor_records_counters_and_quiet_report(tmp_path, capsys):
+    input_path = tmp_path / "dump.log"
+    input_path.write_text(RUDDER_DUMP)
+    metrics_file = tmp_path / "metrics.jsonl"
+
+    run_extractor(SOURCES["choreo_rudder_db"], [
+        "--input", str(input_path), "--output", str(tmp_path / "out.csv"),
+        "--metrics-file", str(metrics_file), "--quiet",
+    ])
+
+    record = json.loads(metrics_file.read_text())
+    assert record["stage"] == "choreo_rudder_db"
+    assert (record["rows_in"], record["rows_out"], record["duplicates"], record["skipped"]) == (4, 2, 1, 1)
+    output = capsys.readouterr().out
+    assert "1 duplicate" in output
+    assert "-> 2 times" not in output
+
+
+def test_record_includes_worker_process_peak_rss(tmp_path):
+    from concurrent.futures import ProcessPoolExecutor
+
+    metrics_file = tmp_path / "metrics.jsonl"
+    with StageMetrics("partitioned", metrics_file):
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            executor.submit(bytearray, 64 * 1024 * 1024).result()
+
+    record = json.loads(metrics_file.read_text())
+    assert record["children_peak_rss_mb"] >= 64
@@ -0,0 +1,23 @@
+"""Tests for the embedded secret name matcher."""
+
+from common.multi_pattern import AhoCorasick, EmbeddedNameMatcher
+
+UUID_A = "11111111-1111-1111-1111-111111111111"
+
+
+def test_aho_corasick_matches_every_occurrence():
+    automaton = AhoCorasick(["he", "she", "his", "hers"])
+    assert sorted(automaton.iter_matches("ushers")) == [(4, 0), (4, 1), (6, 3)]
+    assert automaton.search("ahishers") == {0, 1, 2, 3}
+    assert automaton.search("xyz") == set()
+
+
+def test_embedded_names_found_inside_tokens():
+    matcher = EmbeddedNameMatcher([UUID_A, "payments-db-password", "api"], min_length=8)
+    assert matcher.skipped == 1
+    assert matcher.match(f"vault://org/11307/{UUID_A}/v2") == {UUID_A}
+    assert matcher.match("ref:payments-db-password#AWSCURRENT") == {"payments-db-password"}
+    assert matcher.match(f"{UUID_A}:payments-db-password") == {UUID_A, "payments-db-password"}
+    # Too short to search for, and near misses do not match
+    assert matcher.match("rapid-api-token") == set()
+    assert matcher.match("11111111-1111-1111-1111-11111111111") == set()
@@ -0,0 +1,62 @@
+"""Tests for the hash-partitioned stale detection."""
+
+import csv
+import random
+import uuid
+
+import pytest
+
+from common.aws_secrets import AUDIT_FIELDNAMES
+from common.partitioned import choose_bucket_count, detect_stale_partitioned
+
+
+def test_partitioned_matches_in_memory_anti_join(tmp_path, write_names):
+    rng = random.Random(7)
+    names = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(300)]
+    write_names(tmp_path / "aws.csv", names)
+    db_paths = {}
+    for i, folder in enumerate(["db_a", "db_b"]):
+        db_paths[folder] = tmp_path / f"{folder}.csv"
+        write_names(db_paths[folder], names[i::3] + [f"only-in-{folder}"])
+
+    audit = tmp_path / "audit.csv"
+    audit_rows = []
+    with open(audit, "w", newline="") as file:
+        writer = csv.writer(file, quoting=csv.QUOTE_ALL)
+        writer.writerow(AUDIT_FIELDNAMES)
+        for i, name in enumerate(names[:-10]):
+            for version in range(1 + i % 2):
+                row = [name, "Never", "N/A", "", f"v{version}", "AWSCURRENT", "2025-01-01"]
+                writer.writerow(row)
+                audit_rows.append(row)
+
+    work_dir = tmp_path / "work"
+    work_dir.mkdir()
+    buckets, totals = detect_stale_partitioned(
+        tmp_path / "aws.csv", db_paths, work_dir, tmp_path / "stale.csv",
+        audit_csv_path=audit, detailed_output=tmp_path / "detailed.csv", buckets=5, workers=2,
+    )
+
+    stale = sorted(set(names) - set(names[0::3]) - set(names[1::3]))
+    assert buckets == 5
+    assert totals["stale"] == len(stale)
+    assert totals["active_by_folder"] == {"db_a": 100, "db_b": 100}
+    assert (tmp_path / "stale.csv").read_text().split() == ["key_vault_secret_name"] + stale
+
+    expected = []
+    for name in stale:
+        rows = [row for row in audit_rows if row[0] == name]
+        expected.extend(rows or [[name] + ["N/A"] * 6])
+    with open(tmp_path / "detailed.csv", newline="") as file:
+        assert list(csv.reader(file)) == [AUDIT_FIELDNAMES] + expected
+
+
+def test_bucket_count_follows_memory_budget(tmp_path):
+    path = tmp_path / "big.csv"
+    path.write_bytes(b"x" * (3 * 1024 * 1024))
+
+    assert choose_bucket_count([path], memory_budget_mb=64) == 1
+    assert choose_bucket_count([path], memory_budget_mb=2, workers=2) == 12
+    # 1 MB shared by 64 workers would take 768 buckets
+    with pytest.raises(ValueError, match="buckets"):
+        choose_bucket_count([path], memory_budget_mb=1, workers=64)
@@ -0,0 +1,69 @@
+"""Tests for the concurrent Phase 1 pipeline runner."""
+
+from common.pipeline import run_extractions
+from test_extraction import APP_DB_DUMP, CONFIG_DUMP, RUDDER_DUMP
+
+AUDIT_CSV = """\
+SecretName,LastAccessedDate,LastChangedDate,Tags,VersionId,VersionStages,VersionCreatedDate
+"11111111-1111-1111-1111-111111111111","Never","N/A","","v1","AWSCURRENT","2025-01-01"
+"11111111-1111-1111-1111-111111111111","Never","N/A","","v0","AWSPREVIOUS","2024-01-01"
+"eeeeeeee-eeee-eeee-eeee-eeeeeeeeeeee","Never","N/A","","v1","AWSCURRENT","2025-01-01"
+"not-a-uuid","Never","N/A","","v1","AWSCURRENT","2025-01-01"
+"""
+
+
+def _write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def test_sources_run_concurrently_and_failures_are_isolated(tmp_path):
+    _write(tmp_path / "aws_key_vault" / "secrets_full_audit.csv", AUDIT_CSV)
+    _write(tmp_path / "choreo_app_db" / "38516-3.log", APP_DB_DUMP)
+    _write(tmp_path / "choreo_configuration_service_db" / "38516-6.log", CONFIG_DUMP)
+    _write(tmp_path / "choreo_rudder_db" / "38516-8.log", RUDDER_DUMP)
+    # choreo_cloud_manager_db has no dump
+
+    references, summaries, errors = run_extractions(tmp_path, timeout=60)
+
+    assert set(errors) == {"choreo_cloud_manager_db"}
+    assert references["aws_key_vault"] == {
+        "11111111-1111-1111-1111-111111111111",
+        "eeeeeeee-eeee-eeee-eeee-eeeeeeeeeeee",
+    }
+    assert summaries["choreo_rudder_db"]["references"] == 2
+    # Nothing is written unless asked for
+    assert not (tmp_path / "choreo_app_db" / "key_vault_secrets.csv").exists()
+
+
+def test_stage_cache_skips_unchanged_stages(tmp_path):
+    from common.stage_cache import StageCache
+
+    source = tmp_path / "dump.log"
+    output = tmp_path / "refs.txt"
+    source.write_text("a\n")
+    output.write_text("a\n")
+
+    cache = StageCache(tmp_path / "cache")
+    extract = cache.fingerprint({"stage": "extract"}, [source])
+    assert not cache.is_fresh("extract", extract)
+    cache.record("extract", extract, [output])
+    detect = cache.fingerprint({"stage": "detect"}, upstream=["extract"])
+    cache.record("detect", detect, [])
+
+    cache = StageCache(tmp_path / "cache")
+    assert cache.is_fresh("extract", cache.fingerprint({"stage": "extract"}, [source]))
+
+    # A changed input re-runs the stage; an identical output keeps downstream fresh
+    source.write_text("a\nnoise\n")
+    extract = cache.fingerprint({"stage": "extract"}, [source])
+    assert not cache.is_fresh("extract", extract)
+    cache.record("extract", extract, [output])
+    assert cache.is_fresh("detect", cache.fingerprint({"stage": "detect"}, upstream=["extract"]))
+
+    output.write_text("a\nb\n")
+    cache.record("extract", extract, [output])
+    assert not cache.is_fresh("detect", cache.fingerprint({"stage": "detect"}, upstream=["extract"]))
+    # Outputs deleted behind the cache's back are not reused
+    output.unlink()
+    assert not cache.is_fresh("extract", extract)
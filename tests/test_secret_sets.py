@@ -0,0 +1,97 @@
+"""Tests for the compact secret set backends."""
+
+import random
+import uuid
+
+import pytest
+
+from common.secret_sets import CompactSecretSet
+
+
+def _names(rng, count):
+    names = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(count)]
+    names += [name.upper() for name in names[:3]]  # not canonical: kept as plain strings
+    names += [f"mediation-api-{i}" for i in range(5)]
+    return names
+
+
+@pytest.fixture
+def name_sets():
+    rng = random.Random(42)
+    shared = _names(rng, 50)
+    aws = set(shared + _names(rng, 30))
+    db = set(shared[:40] + _names(rng, 20))
+    return aws, db
+
+
+def test_compact_set_matches_python_set_semantics(name_sets):
+    aws, db = name_sets
+    compact_aws = CompactSecretSet.from_names(aws, run_size=7)
+    compact_db = CompactSecretSet.from_names(db)
+
+    assert len(compact_aws) == len(aws)
+    assert list(compact_aws - compact_db) == sorted(aws - db)
+    assert list(compact_aws & compact_db) == sorted(aws & db)
+    assert list(compact_aws | compact_db) == sorted(aws | db)
+    assert all(name in compact_aws for name in aws)
+    assert not any(name in compact_aws for name in db - aws)
+
+
+def test_update_merges_in_place(name_sets):
+    aws, db = name_sets
+    source = CompactSecretSet.from_names(aws)
+    merged = CompactSecretSet()
+    merged.update(source)
+    merged.update(db)
+
+    assert list(merged) == sorted(aws | db)
+    assert list(source) == sorted(aws)
+    assert merged.nbytes() == 16 * sum(1 for name in aws | db if name == name.lower() and "-api-" not in name)
+
+
+def test_numpy_set_matches_python_set_semantics(name_sets, tmp_path):
+    pytest.importorskip("numpy")
+    from common.secret_sets import NumpySecretSet, read_secrets_from_csv
+
+    aws, db = name_sets
+    csv_path = tmp_path / "key_vault_secrets.csv"
+    csv_path.write_text("key_vault_secret_name\n" + "\n".join(sorted(aws)) + "\n")
+    numpy_aws = read_secrets_from_csv(csv_path, backend="numpy")
+    numpy_db = NumpySecretSet.from_names(db, chunk_size=7)
+
+    assert len(numpy_aws) == len(aws)
+    assert list(numpy_aws - numpy_db) == sorted(aws - db)
+    assert list(numpy_aws & numpy_db) == sorted(aws & db)
+    assert list(numpy_aws | db) == sorted(aws | db)
+    assert all(name in numpy_aws for name in aws)
+    assert not any(name in numpy_aws for name in db - aws)
+
+
+def test_numpy_set_orders_keys_sharing_their_high_half():
+    pytest.importorskip("numpy")
+    from common.secret_sets import NumpySecretSet
+
+    rng = random.Random(3)
+    # The first 16 hex digits repeat, so only the low 64 bits tell these apart
+    prefix = "0123abcd-0000-1111"
+    low_halves = [f"{rng.getrandbits(64):016x}" for _ in range(40)]
+    shared = [f"{prefix}-{low[:4]}-{low[4:]}" for low in low_halves]
+    near_misses = [shared[0].upper(), shared[1] + "-v2", "0123abcd-0000-1111-zzzz-000000000000"]
+    aws = set(shared[:30] + _names(rng, 20) + near_misses)
+    db = set(shared[20:] + _names(rng, 10) + near_misses[:1])
+
+    # Unsorted input with duplicates
+    numpy_aws = NumpySecretSet.from_names(list(aws)[::-1] + list(aws)[:5], chunk_size=9)
+    numpy_db = NumpySecretSet.from_bytes_lines([name.encode() for name in db])
+
+    assert len(numpy_aws) == len(aws)
+    assert list(numpy_aws - numpy_db) == sorted(aws - db)
+    assert list(numpy_aws & numpy_db) == sorted(aws & db)
+    assert list(numpy_aws | numpy_db) == sorted(aws | db)
+    assert all(name in numpy_aws for name in aws)
+    assert not any(name in numpy_aws for name in db - aws)
+
+    merged = NumpySecretSet()
+    merged.update(numpy_db, numpy_aws)
+    assert list(merged) == sorted(aws | db)
+    assert list(numpy_db) == sorted(db)
@@ -0,0 +1,77 @@
+"""Tests for the delta-encoded snapshot history."""
+
+import random
+
+import pytest
+
+from common.snapshot_history import Snapshot, open_snapshot_history
+
+
+def _snapshot(inventory, app, rudder):
+    return Snapshot(inventory, {"choreo_app_db": app, "choreo_rudder_db": rudder}, inventory - app - rudder)
+
+
+def test_diff_reports_stale_resurrected_deleted_and_new_references(tmp_path):
+    with open_snapshot_history(tmp_path / "history.sqlite") as history:
+        first, _ = history.record(_snapshot({"s1", "s2", "s3", "s4"}, {"s1"}, {"s2"}), "2026/02/02")
+        # s1 loses its reference, s3 gains one, s4 is deleted, s5 is new and unreferenced
+        second, _ = history.record(_snapshot({"s1", "s2", "s3", "s5"}, set(), {"s2", "s3"}))
+
+        diff = history.diff(first, second)
+
+    assert diff.newly_stale == ["s1", "s5"]
+    assert diff.resurrected == ["s3"]
+    assert diff.deleted == ["s4"] and diff.added == ["s5"]
+    assert diff.new_references == {"choreo_rudder_db": ["s3"]}
+    assert diff.removed_references == {"choreo_app_db": ["s1"]}
+    assert ("resurrected", "", "s3") in set(diff.rows())
+
+
+def test_diffs_between_any_two_runs_match_full_snapshots(tmp_path):
+    rng = random.Random(7)
+    names = [f"s{i}" for i in range(60)]
+    snapshots = []
+    with open_snapshot_history(tmp_path / "history.sqlite") as history:
+        inventory = set(rng.sample(names, 40))
+        for _ in range(6):
+            inventory ^= set(rng.sample(names, 5))
+            app = set(rng.sample(sorted(inventory), 10))
+            rudder = set(rng.sample(names, 8))
+            snapshots.append(_snapshot(set(inventory), app, rudder))
+            history.record(snapshots[-1])
+
+        for a in range(len(snapshots)):
+            for b in range(a, len(snapshots)):
+                old, new = snapshots[a], snapshots[b]
+                diff = history.diff(a + 1, b + 1)
+                assert diff.newly_stale == sorted(new.stale - old.stale)
+                assert diff.resurrected == sorted((old.stale - new.stale) & new.inventory)
+                assert diff.deleted == sorted(old.inventory - new.inventory)
+                assert diff.new_references.get("choreo_app_db", []) == sorted(
+                    new.references["choreo_app_db"] - old.references["choreo_app_db"])
+
+
+def test_storage_grows_with_changes_only(tmp_path):
+    inventory = {f"s{i}" for i in range(1000)}
+    with open_snapshot_history(tmp_path / "history.sqlite") as history:
+        history.record(_snapshot(inventory, {"s1"}, set()))
+        rows = history.connection.execute("SELECT COUNT(*) FROM intervals").fetchone()[0]
+
+        history.record(_snapshot(inventory, {"s1"}, set()))
+        assert history.connection.execute("SELECT COUNT(*) FROM intervals").fetchone()[0] == rows
+
+        history.record(_snapshot(inventory | {"new"}, {"s1"}, set()))
+        # One inventory interval and one stale interval for the new name
+        assert history.connection.execute("SELECT COUNT(*) FROM intervals").fetchone()[0] == rows + 2
+        assert [run[3]["inventory"] for run in history.runs()] == [1000, 1000, 1001]
+
+
+def test_diff_rejects_unknown_or_reversed_runs(tmp_path):
+    with open_snapshot_history(tmp_path / "history.sqlite") as history:
+        history.record(_snapshot({"s1"}, set(), set()))
+        history.record(_snapshot({"s1"}, set(), set()))
+        with pytest.raises(ValueError):
+            history.diff(1, 5)
+        with pytest.raises(ValueError):
+            history.diff(2, 1)
+        assert history.latest_runs(2) == [1, 2]
@@ -0,0 +1,83 @@
+"""Tests for the precomputed date-key orderings of sort_stale_secrets.py."""
+
+import csv
+from datetime import datetime
+
+import common.stale_sort as stale_sort
+from common.stale_sort import (
+    SORT_FIELDNAMES,
+    ExternalSort,
+    iter_index_view,
+    read_sort_columns,
+    write_index_view,
+    write_sorted_csv,
+)
+
+DATES = [
+    "2025-03-01T10:00:00+00:00", "Never", "N/A", "", "2025-03-01T10:00:00Z",
+    "2025-03-01T12:00:00+05:00", "not a date", "2024-12-31T23:59:59.999999+00:00",
+    "2025-03-01T10:00:00+00:00", "2026-01-01",
+]
+
+
+def _reference_key(date_str):
+    """The original parse_date() of sort_stale_secrets.py."""
+    if not date_str or date_str.strip().upper() in ['NEVER', 'N/A', '']:
+        return datetime(1900, 1, 1)
+    try:
+        return datetime.fromisoformat(date_str.replace('Z', '+00:00')).replace(tzinfo=None)
+    except Exception:
+        return datetime(1900, 1, 1)
+
+
+def _write_detailed(path):
+    rows = []
+    for i, date in enumerate(DATES):
+        rows.append([f"secret-{i}", date, DATES[-1 - i], "team=a\nteam=b" if i == 3 else "",
+                     f"v{i}", "AWSCURRENT", DATES[(i * 3) % len(DATES)]])
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(SORT_FIELDNAMES)
+        writer.writerows(rows)
+    return [tuple(row) for row in rows]
+
+
+def test_orderings_match_sorted_with_parse_date(tmp_path):
+    rows = _write_detailed(tmp_path / "detailed.csv")
+    columns = read_sort_columns(tmp_path / "detailed.csv")
+
+    for field in ("LastAccessedDate", "LastChangedDate", "VersionCreatedDate"):
+        index = SORT_FIELDNAMES.index(field)
+        expected = sorted(rows, key=lambda row: _reference_key(row[index]), reverse=True)
+        assert [columns.rows[i] for i in columns.order(field)] == expected
+        assert [columns.rows[i] for i in columns.order(field, top=4)] == expected[:4]
+
+    write_sorted_csv(columns, columns.order("LastChangedDate"), tmp_path / "out.csv")
+    with open(tmp_path / "out.csv", newline="") as file:
+        assert len(list(csv.reader(file))) == len(rows) + 1
+
+
+def test_index_view_reads_rows_back_in_order(tmp_path):
+    rows = _write_detailed(tmp_path / "detailed.csv")
+    columns = read_sort_columns(tmp_path / "detailed.csv", with_offsets=True)
+    orders = {"LastAccessedDate": columns.order("LastAccessedDate", top=5)}
+    manifest = write_index_view(columns, orders, tmp_path / "detailed.csv", tmp_path, top=5)
+
+    view = [tuple(row.values()) for row in iter_index_view(manifest, "LastAccessedDate")]
+    assert view == [rows[i] for i in orders["LastAccessedDate"]]
+    assert len(view) == 5
+
+
+def test_external_sort_matches_in_memory_sort(tmp_path, monkeypatch):
+    _write_detailed(tmp_path / "detailed.csv")
+    columns = read_sort_columns(tmp_path / "detailed.csv")
+    # Two rows per run and three runs per merge pass
+    monkeypatch.setattr(stale_sort, "ROW_OVERHEAD_BYTES", 1024 * 1024 // 2)
+    monkeypatch.setattr(stale_sort, "MERGE_FAN_IN", 3)
+
+    fields = ["LastAccessedDate", "VersionCreatedDate"]
+    with ExternalSort(tmp_path / "detailed.csv", fields, memory_budget_mb=1, temp_dir=tmp_path) as (count, ordered):
+        assert count == len(DATES)
+        for field in fields:
+            assert list(ordered[field]) == [columns.rows[i] for i in columns.order(field)]
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["detailed.csv"]
@@ -0,0 +1,78 @@
+"""Tests for the incremental stale detection state store."""
+
+import os
+
+import pytest
+
+from common.state_store import INVENTORY_SOURCE, Delta, open_state_store, read_delta_csv
+
+
+def test_incremental_runs_match_full_recompute(tmp_path):
+    inventory = {f"s{i}" for i in range(10)}
+    app = {"s0", "s1", "s2"}
+    rudder = {"s2", "s3"}
+
+    with open_state_store(tmp_path / "state.sqlite") as store:
+        first = store.apply({INVENTORY_SOURCE: Delta(inventory), "app": Delta(app), "rudder": Delta(rudder)})
+        assert first.first_run
+        assert first.newly_stale == sorted(inventory - app - rudder)
+        assert store.active_by_source() == {"app": 3, "rudder": 2}
+
+        # s2 loses one of its two references and stays active; s3 loses its only one
+        second = store.apply({"rudder": Delta(added={"s4"}, removed={"s2", "s3"}),
+                              INVENTORY_SOURCE: Delta(added={"s10"}, removed={"s9"})})
+        assert not second.first_run
+        assert second.newly_stale == ["s10", "s3"]
+        assert second.no_longer_stale == ["s4", "s9"]
+
+    with open_state_store(tmp_path / "state.sqlite") as store:
+        inventory = (inventory | {"s10"}) - {"s9"}
+        assert store.stale_names() == sorted(inventory - app - {"s4"})
+
+
+def test_snapshot_and_delta_files(tmp_path, write_names):
+    write_names(tmp_path / "app.csv", ["a", "b"])
+    with open(tmp_path / "delta.csv", "w", newline="", encoding="utf-8") as file:
+        file.write("change,key_vault_secret_name\nadded,c\nremoved,a\n")
+
+    with open_state_store(tmp_path / "state.sqlite") as store:
+        store.apply({"app": store.snapshot_delta("app", tmp_path / "app.csv")})
+        delta = read_delta_csv(tmp_path / "delta.csv")
+        assert (delta.added, delta.removed) == ({"c"}, {"a"})
+        store.apply({"app": delta})
+        write_names(tmp_path / "app.csv", ["b", "d"])
+        delta = store.snapshot_delta("app", tmp_path / "app.csv")
+        assert (delta.added, delta.removed) == ({"d"}, {"c"})
+
+
+def test_snapshot_deltas_skip_files_unchanged_since_last_applied(tmp_path, write_names):
+    inventory, app = tmp_path / "aws.csv", tmp_path / "app.csv"
+    write_names(inventory, ["a", "b", "c"])
+    write_names(app, ["a"])
+    paths = {INVENTORY_SOURCE: inventory, "app": app}
+
+    with open_state_store(tmp_path / "state.sqlite") as store:
+        store.apply(store.snapshot_deltas(paths))
+        assert store.snapshot_deltas(paths) == {}
+
+        # Rewritten with the same contents: recognised by its sha256
+        write_names(app, ["a"])
+        os.utime(app, ns=(1, 1))
+        assert store.snapshot_deltas(paths) == {}
+
+        write_names(app, ["b"])
+        deltas = store.snapshot_deltas(paths)
+        assert list(deltas) == ["app"] and (deltas["app"].added, deltas["app"].removed) == ({"b"}, {"a"})
+        result = store.apply(deltas)
+        assert (result.newly_stale, result.no_longer_stale) == (["a"], ["b"])
+
+        # A delta file makes the next snapshot run re-diff that source's file
+        store.apply({"app": Delta(added={"c"})})
+        assert store.snapshot_deltas(paths)["app"].removed == {"c"}
+
+
+def test_first_run_rejects_removals(tmp_path):
+    with open_state_store(tmp_path / "state.sqlite") as store:
+        with pytest.raises(ValueError):
+            store.apply({INVENTORY_SOURCE: Delta(added={"a"}), "app": Delta(removed={"a"})})
+        assert store.is_empty()